@@ -0,0 +1,210 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Grouping of the hits recorded by several channels into acoustic events.
+
+The 'parameters' tables of the channels are read in time order, a slice
+at a time, and merged by time stamp. A hit opens an event and every hit
+within `window` seconds of it belongs to the same event, so the work is
+linear in the number of hits and memory is bounded by the slice size.
+"""
+import numpy as np
+
+from iaes.readers.core import open_file, iter_boards, iter_channels, \
+    PARAMETERS
+from iaes.readers.time_index import TimeIndex
+
+
+# Rows read from each parameters table at a time
+CHUNK_ROWS = 65536
+
+# Name of the events table written below the root group
+EVENTS = 'events'
+
+_hit_dtype = np.dtype([('time_stamp', '<f8'), ('channel', '<i4'),
+                       ('peak', '<f8'), ('block_id', '<i8')])
+
+
+def event_dtype(nchannels):
+    """Return the dtype of the events of `nchannels` channels. Arrival
+    times, peaks and block ids are per channel, NaN (or -1) for the
+    channels that did not record the event.
+    """
+    return np.dtype([('event_id', '<u8'),
+                     ('time', '<f8'),
+                     ('nchannels', '<i2'),
+                     ('arrival', '<f8', (nchannels,)),
+                     ('peak', '<f8', (nchannels,)),
+                     ('block_id', '<i8', (nchannels,))])
+
+
+def channel_tables(h5file, channels=None, name=PARAMETERS):
+    """Return the (label, table) pairs of the parameters tables of a file,
+    optionally restricted to the (board, channel) pairs in `channels`,
+    the label being 'Board/Channel'.
+    """
+    tables = []
+    for board in iter_boards(h5file):
+        for channel in iter_channels(board):
+            pair = (board._v_name, channel._v_name)
+            if channels is not None and pair not in channels:
+                continue
+            if name in channel._v_children:
+                tables.append(('%s/%s' % pair,
+                               h5file.getNode(channel, name)))
+    return tables
+
+
+def _hits(table_ptr, channel, chunk_rows):
+    """Iterate over the hits of a table in time order, by slices."""
+    index = TimeIndex(table_ptr)
+    # looked up once for the whole run: the sorted time stamps of more
+    # channels than the cache of time_index holds would be loaded again
+    # for every slice
+    order = index.sort_order()
+    for start in range(0, table_ptr.nrows, chunk_rows):
+        rows = index.read_sorted(start, start + chunk_rows, order)
+        hits = np.empty((len(rows),), dtype=_hit_dtype)
+        hits['time_stamp'] = rows['time_stamp']
+        hits['channel'] = channel
+        hits['peak'] = rows['peak']
+        hits['block_id'] = rows['block_id']
+        yield hits
+
+
+def _group(hits, window, nchannels, limit):
+    """Group the time ordered hits starting before `limit` into events.
+    Returns the events and the number of hits they used.
+    """
+    t = hits['time_stamp']
+    bounds = []
+    i = 0
+    n = np.searchsorted(t, limit, side='left')
+    while i < n:
+        j = np.searchsorted(t, t[i] + window, side='right')
+        bounds.append((i, j))
+        i = j
+    events = np.zeros((len(bounds),), dtype=event_dtype(nchannels))
+    if not bounds:
+        return events, 0
+    bounds = np.array(bounds)
+    used = hits[:i]
+    which = np.repeat(np.arange(len(bounds)), bounds[:, 1] - bounds[:, 0])
+    # the first hit of each channel in each event: hits are in time order
+    pairs, first = np.unique(which * nchannels + used['channel'],
+                             return_index=True)
+    e, c = pairs // nchannels, pairs % nchannels
+    events['time'] = t[bounds[:, 0]]
+    events['nchannels'] = np.bincount(e, minlength=len(bounds))
+    events['arrival'] = np.nan
+    events['peak'] = np.nan
+    events['block_id'] = -1
+    events['arrival'][e, c] = used['time_stamp'][first]
+    events['peak'][e, c] = used['peak'][first]
+    events['block_id'][e, c] = used['block_id'][first]
+    return events, i
+
+
+def iter_events(tables, window, min_channels=2, chunk_rows=CHUNK_ROWS):
+    """Iterate over arrays of events found in a list of parameters tables.
+
+    Hits within `window` seconds of the first hit of an event belong to
+    it; only the first hit of each channel is kept. Events recorded by
+    fewer than `min_channels` channels are dropped.
+    """
+    nchannels = len(tables)
+    streams = [_hits(table, c, chunk_rows) for c, table in enumerate(tables)]
+    buffers = [np.empty((0,), dtype=_hit_dtype)] * nchannels
+    done = [False] * nchannels
+    carry = np.empty((0,), dtype=_hit_dtype)
+    next_id = 0
+    while True:
+        for c in range(nchannels):
+            if not done[c] and len(buffers[c]) == 0:
+                buffers[c] = next(streams[c], None)
+                if buffers[c] is None:
+                    done[c] = True
+                    buffers[c] = np.empty((0,), dtype=_hit_dtype)
+        live = [c for c in range(nchannels) if not done[c]]
+        if live:
+            # no hit still to be read is earlier than this
+            horizon = min(buffers[c]['time_stamp'][-1] for c in live)
+        else:
+            horizon = np.inf
+
+        parts = [carry]
+        for c in range(nchannels):
+            n = np.searchsorted(buffers[c]['time_stamp'], horizon, 'right')
+            parts.append(buffers[c][:n])
+            buffers[c] = buffers[c][n:]
+        merged = np.concatenate(parts)
+        merged = merged[np.argsort(merged['time_stamp'], kind='mergesort')]
+
+        # an event is complete once its window ends before the horizon
+        limit = horizon - window if live else np.inf
+        events, used = _group(merged, window, nchannels, limit)
+        carry = merged[used:]
+        events = events[events['nchannels'] >= min_channels]
+        events['event_id'] = np.arange(next_id, next_id + len(events))
+        next_id += len(events)
+        if len(events):
+            yield events
+        if not live:
+            break
+
+
+def find_events(filename, window, channels=None, min_channels=2,
+                chunk_rows=CHUNK_ROWS):
+    """Return (labels, events): the 'Board/Channel' label of each column
+    of the per-channel fields and the events of an IAES file.
+    """
+    h5file = open_file(filename, 'r')
+    try:
+        pairs = channel_tables(h5file, channels)
+        labels = [label for label, _ in pairs]
+        chunks = list(iter_events([t for _, t in pairs], window,
+                                  min_channels, chunk_rows))
+    finally:
+        h5file.close()
+    if not chunks:
+        return labels, np.empty((0,), dtype=event_dtype(len(labels)))
+    return labels, np.concatenate(chunks)
+
+
+def extract_events(filename, window, channels=None, min_channels=2,
+                   name=EVENTS, overwrite=False, chunk_rows=CHUNK_ROWS):
+    """Find the events of an IAES file and write them, as they are found,
+    in a table below its root group. Returns the new table path.
+    """
+    h5file = open_file(filename, 'a')
+    try:
+        pairs = channel_tables(h5file, channels)
+        if name in h5file.root._v_children:
+            if not overwrite:
+                raise ValueError('/%s already exists' % name)
+            h5file.removeNode(h5file.root, name)
+        table = h5file.createTable(h5file.root, name,
+                                   event_dtype(len(pairs)),
+                                   title='Events (window %g s)' % window)
+        table.attrs.window = window
+        table.attrs.min_channels = min_channels
+        table.attrs.channels = [label for label, _ in pairs]
+        for events in iter_events([t for _, t in pairs], window,
+                                  min_channels, chunk_rows):
+            table.append(events)
+        table.flush()
+        return table._v_pathname
+    finally:
+        h5file.close()
+
+#EOF
@@ -0,0 +1,174 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Vectorized recomputation of the 'parameters' table (rms, peak, count per
+block) from the waveforms of the 'rowdata' table.
+"""
+import numpy as np
+
+from iaes.analysis.parallel import map_channels
+from iaes.readers.core import open_file, iter_boards, iter_channels, \
+    param_dtype, ROWDATA, PARAMETERS
+from iaes.readers.waveform import scaling, decode
+
+
+# Rows of rowdata processed at once (4096 x f8 waveforms, i.e. 32 MB)
+CHUNK_ROWS = 1024
+
+_count_max = np.iinfo(param_dtype['count']).max
+
+
+def block_features(raw, threshold):
+    """Return (rms, peak, count) for each row of a (nblocks, nsamples)
+    array of waveforms.
+
+    The peak is the largest absolute amplitude and the count the number of
+    positive-going crossings of `threshold` (the classic AE ring-down
+    count), a waveform starting above the threshold counting as one.
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    nsamples = raw.shape[1]
+    rms = np.sqrt(np.einsum('ij,ij->i', raw, raw) / nsamples)
+    peak = np.maximum(raw.max(axis=1), -raw.min(axis=1))
+    above = raw >= threshold
+    count = above[:, 0].astype(np.int64)
+    count += (above[:, 1:] & ~above[:, :-1]).sum(axis=1)
+    return rms, peak, np.minimum(count, _count_max)
+
+
+def compute_parameters(rowdata, threshold, start=0, stop=None,
+                       chunk_rows=CHUNK_ROWS):
+    """Iterate over param_dtype arrays computed from a rowdata table,
+    `chunk_rows` blocks at a time.
+    """
+    if stop is None:
+        stop = rowdata.nrows
+    scale = scaling(rowdata)
+    for lo in range(start, stop, chunk_rows):
+        hi = min(lo + chunk_rows, stop)
+        rows = rowdata.read(lo, hi)
+        params = np.empty((hi - lo,), dtype=param_dtype)
+        params['block_id'] = rows['block_id']
+        params['time_stamp'] = rows['time_stamp']
+        params['rms'], params['peak'], params['count'] = \
+            block_features(decode(rows['raw_data'], scale), threshold)
+        yield params
+
+
+def parameters_name(channel, threshold):
+    """Return 'parameters' if the channel has none yet, otherwise a name
+    recording the threshold, e.g. 'parameters_0_3' for 0.3."""
+    if PARAMETERS not in channel:
+        return PARAMETERS
+    suffix = ('%g' % threshold).replace('.', '_').replace('-', 'm')
+    return '%s_%s' % (PARAMETERS, suffix)
+
+
+def _create_parameters(channel, threshold, name, overwrite):
+    h5file = channel._v_file
+    rowdata = h5file.getNode(channel, ROWDATA)
+    if name is None:
+        name = parameters_name(channel, threshold)
+    if name in channel:
+        if not overwrite:
+            raise ValueError('%s/%s already exists'
+                             % (channel._v_pathname, name))
+        h5file.removeNode(channel, name)
+
+    table = h5file.createTable(channel, name, param_dtype,
+                               title='Parameters (threshold %g)' % threshold,
+                               filters=rowdata.filters,
+                               expectedrows=rowdata.nrows)
+    table.attrs.threshold = threshold
+    table.attrs.source = ROWDATA
+    return table
+
+
+def extract_parameters(channel, threshold, name=None, overwrite=False,
+                       chunk_rows=CHUNK_ROWS):
+    """Compute the parameters of a channel from its rowdata and write them
+    in a param_dtype table next to it, in the same group.
+
+    The file must be open in a writable mode. Returns the new table.
+    """
+    rowdata = channel._v_file.getNode(channel, ROWDATA)
+    table = _create_parameters(channel, threshold, name, overwrite)
+    for params in compute_parameters(rowdata, threshold,
+                                     chunk_rows=chunk_rows):
+        table.append(params)
+    table.flush()
+    return table
+
+
+def write_parameters(channel, params, threshold, name=None,
+                     overwrite=False):
+    """Write already computed parameters next to the rowdata of a channel.
+    """
+    table = _create_parameters(channel, threshold, name, overwrite)
+    table.append(params)
+    table.flush()
+    return table
+
+
+def channel_parameters(channel, threshold, chunk_rows=CHUNK_ROWS):
+    """Return the parameters of a channel computed from its rowdata."""
+    rowdata = channel._v_file.getNode(channel, ROWDATA)
+    chunks = list(compute_parameters(rowdata, threshold,
+                                     chunk_rows=chunk_rows))
+    if not chunks:
+        return np.empty((0,), dtype=param_dtype)
+    return np.concatenate(chunks)
+
+
+def extract_file(filename, threshold, name=None, overwrite=False,
+                 chunk_rows=CHUNK_ROWS, processes=1, progress=None):
+    """Recompute the parameters of every channel of an IAES file. Returns
+    the paths of the tables written.
+
+    With `processes` other than 1 the channels are computed in parallel by
+    map_channels() and the tables written once all of them are done.
+    """
+    computed = None
+    if processes != 1:
+        h5file = open_file(filename, 'r')
+        try:
+            pairs = [(board._v_name, channel._v_name)
+                     for board in iter_boards(h5file)
+                     for channel in iter_channels(board)
+                     if ROWDATA in channel]
+        finally:
+            h5file.close()
+        computed = map_channels(channel_parameters, filename,
+                                args=(threshold, chunk_rows),
+                                processes=processes, progress=progress,
+                                channels=pairs)
+    h5file = open_file(filename, 'a')
+    try:
+        channels = [channel for board in iter_boards(h5file)
+                    for channel in iter_channels(board)
+                    if ROWDATA in channel]
+        paths = []
+        for channel in channels:
+            if computed is None:
+                table = extract_parameters(channel, threshold, name,
+                                           overwrite, chunk_rows)
+            else:
+                key = (filename, channel._v_parent._v_name, channel._v_name)
+                table = write_parameters(channel, computed[key], threshold,
+                                         name, overwrite)
+            paths.append(table._v_pathname)
+        return paths
+    finally:
+        h5file.close()
+
+#EOF
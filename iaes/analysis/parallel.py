@@ -0,0 +1,115 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Process-pool execution of per-channel work across boards, channels and
+files. Every channel is an independent task; each worker process opens
+its own read-only handle on the files it is given and keeps it for the
+following tasks.
+"""
+import multiprocessing
+
+from iaes.readers.core import open_file, iter_boards, iter_channels
+
+
+# Read-only handles opened by the current (worker) process
+_worker_files = {}
+
+
+def _worker_file(filename):
+    h5file = _worker_files.get(filename)
+    if h5file is None or not h5file.isopen:
+        h5file = open_file(filename, 'r')
+        _worker_files[filename] = h5file
+    return h5file
+
+
+def _close_worker_files():
+    for h5file in _worker_files.values():
+        if h5file.isopen:
+            h5file.close()
+    _worker_files.clear()
+
+
+def _run_task(task):
+    func, filename, board, channel, args, kwargs = task
+    h5file = _worker_file(filename)
+    group = h5file.getNode(h5file.getNode(h5file.root, board), channel)
+    return (filename, board, channel), func(group, *args, **kwargs)
+
+
+def channel_tasks(filenames, channels=None):
+    """Return the (filename, board, channel) triples of the given files,
+    optionally restricted to the (board, channel) pairs in `channels`.
+    """
+    if isinstance(filenames, basestring):
+        filenames = [filenames]
+    tasks = []
+    for filename in filenames:
+        h5file = open_file(filename, 'r')
+        try:
+            for board in iter_boards(h5file):
+                for channel in iter_channels(board):
+                    pair = (board._v_name, channel._v_name)
+                    if channels is None or pair in channels:
+                        tasks.append((filename,) + pair)
+        finally:
+            h5file.close()
+    return tasks
+
+
+def map_channels(func, filenames, args=(), kwargs=None, processes=None,
+                 progress=None, channels=None):
+    """Run `func(channel_group, *args, **kwargs)` on every channel of one or
+    more IAES files using a pool of worker processes.
+
+    `func` must be a module level function and its result picklable.
+    `processes` defaults to the number of CPUs, 1 runs everything in the
+    current process. `progress(done, total, key)` is called in the current
+    process as each result arrives. Returns a dictionary mapping
+    (filename, board, channel) to the result of `func`.
+    """
+    if kwargs is None:
+        kwargs = {}
+    tasks = [(func,) + task + (tuple(args), kwargs)
+             for task in channel_tasks(filenames, channels)]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(tasks)))
+
+    results = {}
+    if processes == 1:
+        try:
+            for task in tasks:
+                key, result = _run_task(task)
+                results[key] = result
+                if progress is not None:
+                    progress(len(results), len(tasks), key)
+        finally:
+            _close_worker_files()
+        return results
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for key, result in pool.imap_unordered(_run_task, tasks):
+            results[key] = result
+            if progress is not None:
+                progress(len(results), len(tasks), key)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return results
+
+#EOF
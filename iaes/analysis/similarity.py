@@ -0,0 +1,258 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Search of the hits whose waveform looks like a given one, e.g. repeating
+sources or noise signatures. Every rowdata block is reduced once to a
+short normalized embedding (its envelope or its spectrum, downsampled)
+kept in a sidecar next to the file; a search then only reads these, a
+few hundred bytes per block, and ranks the blocks by cosine similarity
+in vectorized chunks.
+"""
+import numpy as np
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.core import iter_boards, iter_channels, ROWDATA
+from iaes.readers.handle_pool import default_pool
+from iaes.readers.sidecar import sidecar_path, source_stamp, save_npz, \
+    load_npz, stream_npy, load_npy
+from iaes.readers.waveform import scaling, decode, read_raw
+
+
+# Embeddings: downsampled envelope (shape of the hit in time) or
+# downsampled log power spectrum (independent of the arrival time)
+METHODS = ('envelope', 'spectrum')
+
+# Length of the embeddings
+EMBED_SIZE = 64
+
+# Rows of rowdata embedded at once
+CHUNK_ROWS = 256
+
+# Embeddings scored at once during a search
+SEARCH_ROWS = 65536
+
+result_dtype = np.dtype([('row', '<i8'),
+                         ('block_id', '<u8'),
+                         ('score', '<f4')])
+
+
+def _pool_bins(values, size, reduce):
+    """Reduce the (m >= size) columns of a (n, m) array to `size` bins
+    with a ufunc, e.g. np.maximum."""
+    if values.shape[1] < size:
+        raise ValueError('%d values do not fill an embedding of %d'
+                         % (values.shape[1], size))
+    edges = np.linspace(0, values.shape[1], size + 1).astype(int)
+    return reduce.reduceat(values, edges[:-1], axis=1)
+
+
+def embed(raw, method='envelope', size=EMBED_SIZE):
+    """Return the (n, size) float32 embeddings of a (n, nsamples) array of
+    waveforms: zero mean, unit norm, so that their dot product is a
+    cosine similarity independent of the gain.
+    """
+    raw = np.atleast_2d(np.asarray(raw, dtype=np.float64))
+    if method == 'envelope':
+        vectors = _pool_bins(np.abs(raw - raw.mean(axis=1)[:, None]), size,
+                             np.maximum)
+    elif method == 'spectrum':
+        power = np.abs(np.fft.rfft(raw * np.hanning(raw.shape[1]),
+                                   axis=1)) ** 2
+        vectors = np.log(_pool_bins(power[:, 1:], size, np.add) + 1e-12)
+        vectors -= np.log(np.diff(np.linspace(0, power.shape[1] - 1,
+                                              size + 1).astype(int)))
+    else:
+        raise ValueError('unknown method %r (one of %s)'
+                         % (method, ', '.join(METHODS)))
+    vectors -= vectors.mean(axis=1)[:, None]
+    norm = np.sqrt((vectors ** 2).sum(axis=1))
+    vectors /= np.where(norm > 0, norm, 1.0)[:, None]
+    return vectors.astype(np.float32)
+
+
+def top_k(vectors, queries, k, chunk_rows=SEARCH_ROWS, exclude=None):
+    """Return (rows, scores), both (nqueries, k), of the vectors with the
+    highest dot product with each query, best first. `vectors` may be a
+    memory-mapped array: it is read `chunk_rows` at a time. `exclude` is
+    a row left out of the results (e.g. the query block itself).
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    nq = len(queries)
+    best_rows = np.zeros((nq, 0), dtype=np.int64)
+    best_scores = np.zeros((nq, 0), dtype=np.float32)
+    for lo in range(0, len(vectors), chunk_rows):
+        chunk = np.asarray(vectors[lo:lo + chunk_rows])
+        scores = np.dot(queries, chunk.T)
+        if exclude is not None and lo <= exclude < lo + len(chunk):
+            scores[:, exclude - lo] = -np.inf
+        rows = np.arange(lo, lo + len(chunk))
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = scores[np.arange(nq)[:, None], keep]
+            rows = rows[keep]
+        else:
+            rows = np.tile(rows, (nq, 1))
+        best_rows = np.hstack((best_rows, rows))
+        best_scores = np.hstack((best_scores, scores))
+        if best_scores.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_rows = best_rows[np.arange(nq)[:, None], keep]
+            best_scores = best_scores[np.arange(nq)[:, None], keep]
+    order = np.argsort(-best_scores, axis=1, kind='mergesort')
+    best_rows = best_rows[np.arange(nq)[:, None], order]
+    best_scores = best_scores[np.arange(nq)[:, None], order]
+    valid = np.isfinite(best_scores)
+    return [r[v] for r, v in zip(best_rows, valid)], \
+        [s[v] for s, v in zip(best_scores, valid)]
+
+
+class SimilarityIndex(object):
+    """Embeddings of the blocks of a rowdata table, stored as .npy
+    sidecars (validated like the other sidecars against the modification
+    time of the file and the number of rows) and memory-mapped.
+
+    >>> index = SimilarityIndex(table_ptr).load()
+    >>> index.search_row(1234, k=20)['block_id']
+    """
+
+    def __init__(self, table_ptr, method='envelope', size=EMBED_SIZE,
+                 chunk_rows=CHUNK_ROWS):
+        if method not in METHODS:
+            raise ValueError('unknown method %r (one of %s)'
+                             % (method, ', '.join(METHODS)))
+        self.table_ptr = table_ptr
+        self.method = method
+        self.size = size
+        self.chunk_rows = chunk_rows
+        self.vectors = None
+        self.block_ids = None
+
+    def _path(self, suffix):
+        return sidecar_path(self.table_ptr, 'sim.%s%d%s'
+                            % (self.method, self.size, suffix))
+
+    def _load(self):
+        info = load_npz(self._path('.npz'), source_stamp(self.table_ptr))
+        if info is None:
+            return False
+        vectors = load_npy(self._path('.npy'))
+        block_ids = load_npy(self._path('.ids.npy'))
+        if vectors is None or block_ids is None or \
+                len(vectors) != self.table_ptr.nrows:
+            return False
+        self.vectors, self.block_ids = vectors, block_ids
+        return True
+
+    def _chunks(self, field, progress=None):
+        nrows = self.table_ptr.nrows
+        with HDF5_LOCK:
+            scale = scaling(self.table_ptr)
+        for lo in range(0, nrows, self.chunk_rows):
+            hi = min(lo + self.chunk_rows, nrows)
+            with HDF5_LOCK:
+                rows = self.table_ptr.read(lo, hi, field=field)
+            if field == 'raw_data':
+                rows = embed(decode(rows, scale), self.method, self.size)
+            if progress is not None:
+                progress(hi, nrows)
+            yield lo, rows
+
+    def build(self, progress=None):
+        """Compute the embeddings streaming the table in chunks of rows,
+        writing them as sidecars if possible. `progress(done, total)` is
+        called after every chunk.
+        """
+        nrows = self.table_ptr.nrows
+        stamp = source_stamp(self.table_ptr)
+        if stream_npy(self._path('.npy'), np.float32, (nrows, self.size),
+                      self._chunks('raw_data', progress)) and \
+                stream_npy(self._path('.ids.npy'), np.uint64, (nrows,),
+                           self._chunks('block_id')) and \
+                save_npz(self._path('.npz'), stamp=stamp) and self._load():
+            return self
+        # no write access: keep them in memory
+        self.vectors = np.zeros((nrows, self.size), dtype=np.float32)
+        for lo, vectors in self._chunks('raw_data', progress):
+            self.vectors[lo:lo + len(vectors)] = vectors
+        with HDF5_LOCK:
+            self.block_ids = self.table_ptr.col('block_id')
+        return self
+
+    def load(self, build=True, progress=None):
+        """Memory-map the embeddings, computing them first if they are
+        missing or stale and `build` is True. Returns self.
+        """
+        if self.vectors is None or len(self.vectors) != \
+                self.table_ptr.nrows:
+            if not self._load() and build:
+                self.build(progress)
+        return self
+
+    def search(self, raw, k=20, exclude=None):
+        """Return the result_dtype array of the k blocks most similar to
+        a waveform, best first.
+        """
+        self.load()
+        query = embed(raw, self.method, self.size)
+        rows, scores = top_k(self.vectors, query, k, exclude=exclude)
+        return self._results(rows[0], scores[0])
+
+    def search_row(self, row, k=20):
+        """Return the k blocks most similar to the block of a row, itself
+        excluded."""
+        with HDF5_LOCK:
+            raw = read_raw(self.table_ptr, row, row + 1)[0]
+        return self.search(raw, k, exclude=row)
+
+    def _results(self, rows, scores):
+        results = np.zeros((len(rows),), dtype=result_dtype)
+        results['row'] = rows
+        results['block_id'] = self.block_ids[rows]
+        results['score'] = scores
+        return results
+
+
+def search_files(filenames, raw, k=20, channels=None, method='envelope',
+                 size=EMBED_SIZE, pool=None):
+    """Return the k blocks most similar to a waveform among the rowdata
+    tables of several files (e.g. a whole campaign), optionally restricted
+    to some (board, channel) pairs, as a list of (score, filename, table
+    path, row, block_id) best first. Missing embeddings are computed, and
+    stored, on the way.
+    """
+    pool = pool if pool is not None else default_pool()
+    found = []
+    for filename in filenames:
+        h5file = pool.acquire(filename)
+        try:
+            for board in iter_boards(h5file):
+                for channel in iter_channels(board):
+                    pair = (board._v_name, channel._v_name)
+                    if channels is not None and pair not in channels or \
+                            ROWDATA not in channel._v_children:
+                        continue
+                    table = h5file.getNode(channel, ROWDATA)
+                    if table.nrows == 0:
+                        continue
+                    index = SimilarityIndex(table, method, size)
+                    for r in index.search(raw, k):
+                        found.append((float(r['score']), filename,
+                                      table._v_pathname, int(r['row']),
+                                      long(r['block_id'])))
+            found.sort(key=lambda item: -item[0])
+            del found[k:]
+        finally:
+            pool.release(filename)
+    return found
+
+#EOF
@@ -0,0 +1,217 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Spectral features of the hits (peak frequency, centroid, band energies
+and a coarse power spectrum) computed with windowed FFTs over whole
+chunks of rowdata blocks. They are kept, one row per block, in a
+sidecar of the rowdata table of each channel (never in the file itself,
+which may be read-only or an archive) and only the blocks appended since
+are computed on later runs.
+"""
+import numpy as np
+
+from iaes.readers.core import open_file, iter_boards, iter_channels, \
+    ROWDATA
+from iaes.readers.sidecar import sidecar_path, save_npz, load_npz, \
+    stream_npy, load_npy
+from iaes.readers.waveform import scaling, decode
+
+
+# Name of the sidecars of a rowdata table holding its spectral features
+SPECTRAL = 'spectral'
+
+# Rows of rowdata transformed at once
+CHUNK_ROWS = 512
+
+# Used when a channel has no 'sampling_rate' attribute
+SAMPLING_RATE = 1e6
+
+# Edges, in Hz, of the bands whose energy is computed
+BAND_EDGES = (0.0, 100e3, 200e3, 300e3, 400e3, 500e3)
+
+# Bins of the coarse power spectrum kept for display
+SPECTRUM_BINS = 128
+
+
+def spectral_dtype(nbands=len(BAND_EDGES) - 1, nbins=SPECTRUM_BINS):
+    return np.dtype([('block_id', '<u8'),
+                     ('time_stamp', '<f8'),
+                     ('peak_freq', '<f8'),
+                     ('centroid', '<f8'),
+                     ('band_energy', '<f8', (nbands,)),
+                     ('spectrum', '<f4', (nbins,))])
+
+
+def block_spectra(raw, sampling_rate, band_edges=BAND_EDGES,
+                  nbins=SPECTRUM_BINS):
+    """Return (peak_freq, centroid, band_energy, spectrum) for each row of
+    a (nblocks, nsamples) array of waveforms.
+
+    A Hann window is applied before the FFT. The peak frequency and the
+    centroid ignore the DC bin; `spectrum` is the mean power in `nbins`
+    equal frequency bins up to the Nyquist frequency.
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    nsamples = raw.shape[1]
+    power = np.abs(np.fft.rfft(raw * np.hanning(nsamples), axis=1)) ** 2
+    freqs = np.arange(power.shape[1]) * (sampling_rate / float(nsamples))
+
+    ac = power[:, 1:]
+    peak_freq = freqs[1:][np.argmax(ac, axis=1)]
+    total = ac.sum(axis=1)
+    centroid = np.dot(ac, freqs[1:]) / np.where(total > 0, total, 1.0)
+
+    edges = np.searchsorted(freqs, band_edges)
+    band_energy = np.zeros((len(raw), len(band_edges) - 1))
+    for k in range(len(band_edges) - 1):
+        band_energy[:, k] = power[:, edges[k]:edges[k + 1]].sum(axis=1)
+
+    starts = np.linspace(0, power.shape[1], nbins + 1).astype(int)[:-1]
+    spectrum = np.add.reduceat(power, starts, axis=1) / \
+        np.diff(np.append(starts, power.shape[1]))
+    return peak_freq, centroid, band_energy, spectrum
+
+
+def compute_spectral(rowdata, sampling_rate, start=0, stop=None,
+                     band_edges=BAND_EDGES, nbins=SPECTRUM_BINS,
+                     chunk_rows=CHUNK_ROWS):
+    """Iterate over spectral_dtype arrays computed from a rowdata table,
+    `chunk_rows` blocks at a time.
+    """
+    if stop is None:
+        stop = rowdata.nrows
+    dtype = spectral_dtype(len(band_edges) - 1, nbins)
+    scale = scaling(rowdata)
+    for lo in range(start, stop, chunk_rows):
+        hi = min(lo + chunk_rows, stop)
+        rows = rowdata.read(lo, hi)
+        spectral = np.empty((hi - lo,), dtype=dtype)
+        spectral['block_id'] = rows['block_id']
+        spectral['time_stamp'] = rows['time_stamp']
+        spectral['peak_freq'], spectral['centroid'], \
+            spectral['band_energy'], spectral['spectrum'] = \
+            block_spectra(decode(rows['raw_data'], scale), sampling_rate,
+                          band_edges, nbins)
+        yield spectral
+
+
+def channel_sampling_rate(channel):
+    attrs = channel._v_attrs
+    if 'sampling_rate' in attrs._f_list('user'):
+        return float(attrs.sampling_rate)
+    return SAMPLING_RATE
+
+
+def _path(rowdata, suffix):
+    return sidecar_path(rowdata, SPECTRAL + suffix)
+
+
+def _load(rowdata):
+    """Return (features, settings) of the sidecar of a rowdata table, or
+    None if it is missing or was not computed from the first rows of
+    this table.
+    """
+    info = load_npz(_path(rowdata, '.npz'), None)
+    if info is None:
+        return None
+    spectral = load_npy(_path(rowdata, '.npy'))
+    n = int(info['nrows'])
+    if spectral is None or len(spectral) != n or n > rowdata.nrows or \
+            n and rowdata.read(n - 1, n, field='block_id')[0] != \
+            spectral['block_id'][-1]:
+        return None
+    return spectral, info
+
+
+def channel_spectral(channel, band_edges=BAND_EDGES, nbins=SPECTRUM_BINS,
+                     chunk_rows=CHUNK_ROWS, cache=True):
+    """Return the spectral_dtype features of every block of the rowdata
+    of a channel, computing only those not in its sidecar yet. The
+    sidecar is replaced if it was computed with other settings; without
+    write access the features are computed in memory.
+    """
+    rowdata = channel._v_file.getNode(channel, ROWDATA)
+    sampling_rate = channel_sampling_rate(channel)
+    dtype = spectral_dtype(len(band_edges) - 1, nbins)
+    nrows = rowdata.nrows
+    old = _load(rowdata) if cache else None
+    if old is not None:
+        old, info = old
+        if old.dtype != dtype or \
+                float(info['sampling_rate']) != sampling_rate or \
+                not np.array_equal(info['band_edges'], band_edges):
+            old = None
+    done = 0 if old is None else len(old)
+    if old is not None and done == nrows:
+        return old
+
+    def blocks():
+        for lo in range(0, done, chunk_rows):
+            yield lo, old[lo:lo + chunk_rows]
+        lo = done
+        for spectral in compute_spectral(rowdata, sampling_rate, done,
+                                         nrows, band_edges, nbins,
+                                         chunk_rows):
+            yield lo, spectral
+            lo += len(spectral)
+
+    if cache and stream_npy(_path(rowdata, '.npy'), dtype, (nrows,),
+                            blocks()) and \
+            save_npz(_path(rowdata, '.npz'), nrows=np.array(nrows),
+                     sampling_rate=np.array(sampling_rate),
+                     band_edges=np.asarray(band_edges, dtype=np.float64)):
+        loaded = _load(rowdata)
+        if loaded is not None:
+            return loaded[0]
+    spectral = np.empty((nrows,), dtype=dtype)
+    for lo, block in blocks():
+        spectral[lo:lo + len(block)] = block
+    return spectral
+
+
+def spectral_file(filename, band_edges=BAND_EDGES, nbins=SPECTRUM_BINS,
+                  chunk_rows=CHUNK_ROWS):
+    """Bring the spectral features of every channel of an IAES file up to
+    date, opening it read-only. Returns {rowdata path: number of blocks}.
+    """
+    h5file = open_file(filename, 'r')
+    try:
+        return dict((channel._v_pathname + '/' + ROWDATA,
+                     len(channel_spectral(channel, band_edges, nbins,
+                                          chunk_rows)))
+                    for board in iter_boards(h5file)
+                    for channel in iter_channels(board)
+                    if ROWDATA in channel)
+    finally:
+        h5file.close()
+
+
+def cached_spectrum(channel, row, block_id=None):
+    """Return the spectral features of rowdata row `row` of a channel, or
+    None if they were not computed. `block_id`, when given, is checked.
+    """
+    if ROWDATA not in channel:
+        return None
+    loaded = _load(channel._v_file.getNode(channel, ROWDATA))
+    if loaded is None:
+        return None
+    spectral = loaded[0]
+    if row < 0 or row >= len(spectral):
+        return None
+    if block_id is not None and spectral['block_id'][row] != block_id:
+        # not in rowdata order: look the block up
+        rows = np.flatnonzero(spectral['block_id'] == block_id)
+        return spectral[rows[0]] if len(rows) else None
+    return spectral[row]
+
+#EOF
@@ -0,0 +1,191 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Background execution of data loading and computations, so that the
+viewer stays responsive. Requests submitted with the same key replace
+each other: a newer one cancels the older ones, pending or running, and
+the results of a cancelled request are never delivered.
+
+The HDF5 library is not thread safe: code reading files in the workers
+must hold HDF5_LOCK while doing it, a chunk at a time, and so do the
+readers used from the GUI thread.
+"""
+import threading
+from Queue import Queue
+
+
+# Serializes the HDF5 calls of the worker threads and the GUI thread
+HDF5_LOCK = threading.RLock()
+
+
+class Cancelled(Exception):
+    """Raised inside a request that was cancelled."""
+
+
+class Request(object):
+    """A unit of background work. The function doing it receives the
+    request as first argument and should call `check()` (or
+    `set_progress()`) regularly, which raise Cancelled once the request
+    has been cancelled.
+    """
+
+    def __init__(self, worker, key, func, args, kwargs, on_done, on_error,
+                 on_progress, on_cancel):
+        self.worker = worker
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        if not self.cancelled:
+            self._cancelled.set()
+            self.worker._post(self.on_cancel)
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def set_progress(self, done, total):
+        """Report progress (and give a chance to cancel)."""
+        self.check()
+        if total:
+            self.worker._post(self.on_progress, float(done) / total)
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.func(self, *self.args, **self.kwargs)
+        except Cancelled:
+            return
+        except Exception, e:
+            if not self.cancelled:
+                self.worker._post(self._fail, e)
+            return
+        if not self.cancelled:
+            self.worker._post(self._deliver, result)
+
+    def _deliver(self, result):
+        # checked again in the thread the result is delivered to
+        if not self.cancelled:
+            self.worker._forget(self)
+            if self.on_done is not None:
+                self.on_done(result)
+
+    def _fail(self, error):
+        # e.g. cancelled because its file was closed under it meanwhile
+        if not self.cancelled:
+            self.worker._forget(self)
+            if self.on_error is not None:
+                self.on_error(error)
+
+
+class BackgroundWorker(object):
+    """A pool of daemon threads running Requests.
+
+    Callbacks (on_done, on_error, on_progress, on_cancel) go through
+    `dispatch`, e.g. pyface's GUI.invoke_later to run them in the GUI
+    thread; by default they are called in the worker thread.
+    """
+
+    def __init__(self, threads=1, dispatch=None):
+        self.dispatch = dispatch
+        self._queue = Queue()
+        self._current = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(threads):
+            thread = threading.Thread(target=self._run,
+                                      name='iaes-worker-%d' % i)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+            request.run()
+
+    def _post(self, callback, *args):
+        if callback is None:
+            return
+        if self.dispatch is None:
+            callback(*args)
+        else:
+            self.dispatch(callback, *args)
+
+    def _forget(self, request):
+        with self._lock:
+            if self._current.get(request.key) is request:
+                del self._current[request.key]
+
+    def submit(self, func, args=(), kwargs=None, key=None, on_done=None,
+               on_error=None, on_progress=None, on_cancel=None):
+        """Run `func(request, *args, **kwargs)` in the background and
+        return the Request. The request previously submitted with the
+        same key, if any, is cancelled.
+        """
+        request = Request(self, key, func, tuple(args), kwargs or {},
+                          on_done, on_error, on_progress, on_cancel)
+        if key is not None:
+            with self._lock:
+                previous = self._current.get(key)
+                self._current[key] = request
+            if previous is not None:
+                previous.cancel()
+        self._queue.put(request)
+        return request
+
+    def cancel(self, key):
+        """Cancel the request submitted with a key, if any."""
+        with self._lock:
+            request = self._current.pop(key, None)
+        if request is not None:
+            request.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            requests = self._current.values()
+            self._current.clear()
+        for request in requests:
+            request.cancel()
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+_default_worker = None
+
+
+def default_worker(dispatch=None):
+    """Return the worker shared by the whole process, created with the
+    given dispatch function the first time."""
+    global _default_worker
+    if _default_worker is None:
+        _default_worker = BackgroundWorker(dispatch=dispatch)
+    return _default_worker
+
+#EOF
@@ -0,0 +1,241 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+A test campaign recorded as a sequence of IAES files, seen as a single
+dataset: a board/channel is addressed across all the files and time
+window reads span file boundaries.
+"""
+import os
+
+import numpy as np
+
+from iaes.readers.core import iter_boards, iter_channels, data_block_dtype, \
+    param_dtype, PARAMETERS
+from iaes.readers.handle_pool import default_pool
+from iaes.readers.rollup import Rollup, combine, levels_trend, \
+    RESOLUTIONS, MAX_BUCKETS
+from iaes.readers.time_index import TimeIndex
+from iaes.readers.waveform import scaling, decode, decode_rows, \
+    decoded_dtype, RAW_DATA
+
+
+def _empty(name, field=None):
+    """Return no rows of a table called `name`, or of one of its columns.
+    """
+    if name.startswith(PARAMETERS):
+        dtype = param_dtype
+    else:
+        dtype = decoded_dtype(data_block_dtype)
+    rows = np.empty((0,), dtype=dtype)
+    return rows if field is None else rows[field]
+
+
+def _file_stat(filename):
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+class Campaign(object):
+    """A list of IAES files presented as one dataset.
+
+    Files are opened only when needed, through a HandlePool, and a time
+    window read only opens the files whose time range overlaps it. The
+    time range of a table is looked up in the catalog when one is given
+    (see iaes.tools.catalog), otherwise read once from the file.
+
+    >>> campaign = Campaign(sorted(glob.glob('/data/test12/*.h5')))
+    >>> hits = campaign.between('Board0', 'Ch1', t0, t1)
+    >>> edges, counts = campaign.hit_rate('Board0', 'Ch1', 60.0)
+    """
+
+    def __init__(self, filenames, pool=None, catalog=None):
+        self.filenames = list(filenames)
+        self.pool = pool if pool is not None else default_pool()
+        self.catalog = catalog
+        # (filename, board, channel, name) -> (stat of the file, (first,
+        # last) or None), looked up again once the file changed
+        self._ranges = {}
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def _acquire(self, filename):
+        return self.pool.acquire(filename)
+
+    def _table(self, h5file, board, channel, name):
+        """Return a table of an open file, or None if it has none."""
+        path = '/%s/%s/%s' % (board, channel, name)
+        if path not in h5file:
+            return None
+        return h5file.getNode(path)
+
+    def boards(self):
+        """Return the names of the boards found in any of the files."""
+        names = set()
+        for filename in self.filenames:
+            h5file = self._acquire(filename)
+            try:
+                names.update(b._v_name for b in iter_boards(h5file))
+            finally:
+                self.pool.release(filename)
+        return sorted(names)
+
+    def channels(self, board):
+        """Return the names of the channels of a board in any file."""
+        names = set()
+        for filename in self.filenames:
+            h5file = self._acquire(filename)
+            try:
+                if '/' + board in h5file:
+                    names.update(c._v_name for c in
+                                 iter_channels(h5file.getNode('/' + board)))
+            finally:
+                self.pool.release(filename)
+        return sorted(names)
+
+    def file_range(self, filename, board, channel, name=PARAMETERS):
+        """Return the (first, last) time stamps of a table of one file, or
+        None if the file has no such table or it is empty.
+        """
+        key = (filename, board, channel, name)
+        stat = _file_stat(filename)
+        cached = self._ranges.get(key)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+        t_range = None
+        if self.catalog is not None:
+            t_range = self.catalog.time_range(filename, board, channel, name)
+        if t_range is None:
+            h5file = self._acquire(filename)
+            try:
+                table = self._table(h5file, board, channel, name)
+                if table is not None:
+                    t_range = TimeIndex(table,
+                                        create_index=False).time_range()
+            finally:
+                self.pool.release(filename)
+        self._ranges[key] = (stat, t_range)
+        return t_range
+
+    def time_range(self, board, channel, name=PARAMETERS):
+        """Return the (first, last) time stamps of a channel over the whole
+        campaign, or None if it has no data.
+        """
+        ranges = [r for r in (self.file_range(f, board, channel, name)
+                              for f in self.filenames) if r is not None]
+        if not ranges:
+            return None
+        return (min(r[0] for r in ranges), max(r[1] for r in ranges))
+
+    def overlapping(self, board, channel, t0=None, t1=None,
+                    name=PARAMETERS):
+        """Return the files with data of a channel in [t0, t1)."""
+        files = []
+        for filename in self.filenames:
+            t_range = self.file_range(filename, board, channel, name)
+            if t_range is None:
+                continue
+            if t1 is not None and t_range[0] >= t1:
+                continue
+            if t0 is not None and t_range[1] < t0:
+                continue
+            files.append(filename)
+        return files
+
+    def iter_tables(self, board, channel, t0=None, t1=None,
+                    name=PARAMETERS):
+        """Iterate over the (filename, table) of a channel in the files
+        overlapping [t0, t1). Each file is in use only while its table is
+        being consumed.
+        """
+        for filename in self.overlapping(board, channel, t0, t1, name):
+            h5file = self._acquire(filename)
+            try:
+                yield filename, self._table(h5file, board, channel, name)
+            finally:
+                self.pool.release(filename)
+
+    def between(self, board, channel, t0, t1, name=PARAMETERS):
+        """Return the rows of a channel with t0 <= time_stamp < t1 from all
+        the files, in file order. Waveforms are decoded to float64 volts
+        (see waveform), each file having its own scale.
+        """
+        parts = [decode_rows(TimeIndex(table, create_index=False)
+                             .between(t0, t1), scaling(table))
+                 for _, table in self.iter_tables(board, channel, t0, t1,
+                                                  name)]
+        if not parts:
+            return _empty(name)
+        return np.concatenate(parts)
+
+    def read(self, board, channel, name=PARAMETERS, field=None):
+        """Return all the rows (or one column) of a channel, the
+        waveforms decoded to float64 volts."""
+        parts = []
+        for _, table in self.iter_tables(board, channel, name=name):
+            rows = table.read(field=field)
+            if field is None:
+                rows = decode_rows(rows, scaling(table))
+            elif field == RAW_DATA:
+                rows = decode(rows, scaling(table))
+            parts.append(rows)
+        if not parts:
+            return _empty(name, field)
+        return np.concatenate(parts)
+
+    def hit_rate(self, board, channel, bin_width, t0=None, t1=None,
+                 name=PARAMETERS):
+        """Return (edges, counts): the number of hits of a channel in
+        consecutive bins of `bin_width` seconds over [t0, t1) (by default
+        the whole campaign), reading only the time stamp column of the
+        files overlapping it.
+        """
+        if t0 is None or t1 is None:
+            t_range = self.time_range(board, channel, name)
+            if t_range is None:
+                return np.array([0.0, bin_width]), np.zeros((1,), int)
+            t0 = t_range[0] if t0 is None else t0
+            t1 = np.nextafter(t_range[1], np.inf) if t1 is None else t1
+        nbins = max(1, int(np.ceil((t1 - t0) / float(bin_width))))
+        edges = t0 + bin_width * np.arange(nbins + 1)
+        counts = np.zeros((nbins,), dtype=np.int64)
+        for _, table in self.iter_tables(board, channel, t0, t1, name):
+            t = table.col('time_stamp')
+            t = t[(t >= t0) & (t < t1)]
+            bins = ((t - t0) // bin_width).astype(np.intp)
+            counts += np.bincount(np.minimum(bins, nbins - 1),
+                                  minlength=nbins)
+        return edges, counts
+
+    def trend(self, board, channel, t0=None, t1=None, resolution=None,
+              max_buckets=MAX_BUCKETS, name=PARAMETERS,
+              resolutions=RESOLUTIONS):
+        """Return the trend (hits, rate, cumulative count, rms and peak,
+        see rollup.trend_dtype) of a channel over [t0, t1), by default the
+        whole campaign, from the rollups of the files: only rollups that
+        are missing or behind their table read it.
+        """
+        per_file = [Rollup(table, resolutions).update().levels
+                    for _, table in self.iter_tables(board, channel, None,
+                                                     t1, name)]
+        resolutions = tuple(float(r) for r in resolutions)
+        if not per_file:
+            per_file = [Rollup.empty_levels(resolutions)]
+        levels = [combine(np.concatenate(parts)) for parts in zip(*per_file)]
+        return levels_trend(levels, resolutions, t0, t1, resolution,
+                            max_buckets)
+
+#EOF
@@ -0,0 +1,122 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Memory-mapped columnar copies of 'rowdata' tables. Each column is stored
+once as a contiguous .npy sidecar and memory-mapped afterwards, so that
+reopening a file does not decode it through HDF5 again and processes
+reading the same file share its pages through the OS page cache.
+"""
+import numpy as np
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.sidecar import sidecar_path, source_stamp, save_npz, \
+    load_npz, stream_npy, load_npy
+
+
+# Columns of a 'rowdata' table that are cached by default
+COLUMNS = ('block_id', 'time_stamp', 'raw_data')
+
+# Rows read from the table at a time while building the cache
+CHUNK_ROWS = 256
+
+
+class ColumnCache(object):
+    """Memory-mapped columns of a table, validated against the modification
+    time of the file and the number of rows of the table.
+
+    >>> columns = ColumnCache(table_ptr).load()
+    >>> columns['raw_data'][1000]    # no HDF5 read, no copy
+    """
+
+    def __init__(self, table_ptr, columns=COLUMNS, chunk_rows=CHUNK_ROWS):
+        self.table_ptr = table_ptr
+        self.columns = tuple(name for name in columns
+                             if name in table_ptr.coldtypes)
+        self.chunk_rows = chunk_rows
+
+    def _path(self, suffix):
+        return sidecar_path(self.table_ptr, 'cols%s' % suffix)
+
+    def _load(self):
+        info = load_npz(self._path('.npz'), source_stamp(self.table_ptr))
+        if info is None or \
+                tuple(info['columns'].tolist()) != self.columns:
+            return None
+        arrays = {}
+        for name in self.columns:
+            arr = load_npy(self._path('.%s.npy' % name))
+            if arr is None or len(arr) != self.table_ptr.nrows:
+                return None
+            arrays[name] = arr
+        return arrays
+
+    def _chunks(self, name, nrows):
+        for start in range(0, nrows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, nrows)
+            # taken for each chunk only, not while it is written
+            with HDF5_LOCK:
+                chunk = self.table_ptr.read(start, stop, field=name)
+            yield start, chunk
+
+    def build(self):
+        """Write the column sidecars streaming the table in chunks of rows.
+        Returns False if they could not be written (e.g. no write access).
+        """
+        nrows = self.table_ptr.nrows
+        if nrows == 0:
+            return False
+        for name in self.columns:
+            dtype = self.table_ptr.coldtypes[name]
+            if not stream_npy(self._path('.%s.npy' % name), dtype.base,
+                              (nrows,) + dtype.shape,
+                              self._chunks(name, nrows)):
+                return False
+        # written last, it validates the columns above
+        return save_npz(self._path('.npz'),
+                        stamp=source_stamp(self.table_ptr),
+                        columns=np.array(self.columns))
+
+    def load(self, build=True):
+        """Return a dictionary of read-only memory-mapped columns, building
+        them first if they are missing or stale and `build` is true.
+        Returns None if no valid cache is available.
+        """
+        arrays = self._load()
+        if arrays is None and build and self.build():
+            arrays = self._load()
+        return arrays
+
+
+def build_file(filename, columns=COLUMNS):
+    """Build the column cache of every 'rowdata' table of a file, e.g.
+    right after an acquisition, and return the number of tables cached.
+    """
+    # imported here, core itself depends on this module via table_cache
+    from iaes.readers.core import open_file, iter_boards, iter_channels, \
+        ROWDATA
+    h5file = open_file(filename, 'r')
+    built = 0
+    try:
+        for board in iter_boards(h5file):
+            for channel in iter_channels(board):
+                if ROWDATA not in channel._v_children:
+                    continue
+                cache = ColumnCache(h5file.getNode(channel, ROWDATA),
+                                    columns)
+                if cache.load() is not None:
+                    built += 1
+    finally:
+        h5file.close()
+    return built
+
+#EOF
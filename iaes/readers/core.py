@@ -0,0 +1,163 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Headless access to IAES .h5 files.
+
+This module only depends on NumPy and PyTables: it never imports a GUI
+toolkit, so it is the one to use from scripts and batch jobs. The traits
+based browser in hdf5.py is built on top of it.
+"""
+import numpy as np
+from tables import openFile
+
+from iaes.readers.table_cache import ChunkedTable
+
+
+data_block_dtype = np.dtype(([('block_id', '<u8'), \
+                             ('time_stamp', '<f8'), \
+                             ('raw_data', '<f8', (4096,))]))
+
+# The 16 bit ADC codes, converted to volts with the raw_scale and
+# raw_offset attributes of the channel (see waveform)
+compact_block_dtype = np.dtype([('block_id', '<u8'),
+                                ('time_stamp', '<f8'),
+                                ('raw_data', '<i2', (4096,))])
+
+param_dtype = np.dtype([('block_id', '<u8'), \
+                           ('time_stamp', '<f8'), \
+                           ('rms', '<f8'), \
+                           ('peak', '<f8'), \
+                           ('count', '<i2')])
+
+# Names of the tables found below a channel group
+ROWDATA = 'rowdata'
+PARAMETERS = 'parameters'
+
+
+def open_file(filename, mode='r'):
+    """Open an IAES .h5 file, read-only by default."""
+    return openFile(filename, mode)
+
+
+def is_board(group):
+    return group._v_name.lower().strip().find('board') != -1
+
+
+def is_channel(group):
+    return group._v_name.lower().strip().find('ch') != -1
+
+
+def iter_boards(h5file):
+    """Iterate over the board groups immediately below the root group."""
+    for group in h5file.iterNodes(h5file.root, classname='Group'):
+        if is_board(group):
+            yield group
+
+
+def iter_channels(board):
+    """Iterate over the channel groups immediately below a board group."""
+    for group in board._v_file.iterNodes(board, classname='Group'):
+        if is_channel(group):
+            yield group
+
+
+def table_kind(table):
+    """Return ROWDATA or PARAMETERS for the tables of a channel, None for
+    anything else. Recomputed parameters tables ('parameters_<suffix>')
+    are PARAMETERS as well."""
+    name = table._v_name
+    if name == ROWDATA:
+        return ROWDATA
+    if name == PARAMETERS or name.startswith(PARAMETERS + '_'):
+        return PARAMETERS
+    return None
+
+
+def iter_tables(channel):
+    """Iterate over the 'rowdata' and 'parameters' tables of a channel."""
+    for table in channel._v_file.iterNodes(channel, classname='Table'):
+        if table_kind(table) is not None:
+            yield table
+
+
+def node_meta(node):
+    """Return the user attributes of a node as a dictionary."""
+    labels = node._v_attrs._f_list("user")
+    meta = {}
+    for label in labels:
+        meta[label] = node._v_attrs[label]
+    return meta
+
+
+class IAESFile(object):
+    """An open IAES file, addressed by board and channel names.
+
+    >>> with IAESFile('run.h5') as f:
+    ...     for board in f.boards():
+    ...         for channel in f.channels(board):
+    ...             params = f.parameters(board, channel).read()
+    """
+
+    def __init__(self, filename, mode='r'):
+        self.filename = filename
+        self.h5file = open_file(filename, mode)
+
+    def close(self):
+        self.h5file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def board_node(self, board):
+        return self.h5file.getNode(self.h5file.root, board)
+
+    def channel_node(self, board, channel):
+        return self.h5file.getNode(self.board_node(board), channel)
+
+    def boards(self):
+        """Return the names of the boards in the file."""
+        return [group._v_name for group in iter_boards(self.h5file)]
+
+    def channels(self, board):
+        """Return the names of the channels of a board."""
+        return [group._v_name
+                for group in iter_channels(self.board_node(board))]
+
+    def tables(self, board, channel):
+        """Return the names of the tables of a channel."""
+        return [table._v_name
+                for table in iter_tables(self.channel_node(board, channel))]
+
+    def meta(self, board, channel=None):
+        """Return the user attributes of a board or of a channel."""
+        if channel is None:
+            return node_meta(self.board_node(board))
+        return node_meta(self.channel_node(board, channel))
+
+    def table_ptr(self, board, channel, name):
+        return self.h5file.getNode(self.channel_node(board, channel), name)
+
+    def rowdata(self, board, channel, **kwargs):
+        """Return the 'rowdata' table of a channel as a ChunkedTable."""
+        return ChunkedTable(self.table_ptr(board, channel, ROWDATA),
+                            **kwargs)
+
+    def parameters(self, board, channel, **kwargs):
+        """Return the 'parameters' table of a channel as a ChunkedTable."""
+        return ChunkedTable(self.table_ptr(board, channel, PARAMETERS),
+                            **kwargs)
+
+#EOF
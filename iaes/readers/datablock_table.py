@@ -18,64 +18,139 @@ import os
 os.environ['QT_API'] = 'pyqt'
 os.environ['ETS_TOOLKIT'] = 'qt4'
 
-from traits.api import HasTraits, Array, Instance, Any, Str, \
-    Property, on_trait_change, cached_property
-from traitsui.api import View, Item, TabularEditor, VGroup, \
-    InstanceEditor
-from traitsui.tabular_adapter import TabularAdapter
+from traits.api import HasTraits, Instance, Any, Str, Bool, Int, Event, \
+    Property, Array, Button, Enum, on_trait_change, cached_property
+from traitsui.api import View, Item, TabularEditor, VGroup, HGroup, \
+    InstanceEditor, ProgressEditor
+from pyface.api import GUI
 
 from enable.api import ComponentEditor
 
 from chaco.api import ArrayPlotData, Plot
 from chaco.tools.api import PanTool, ZoomTool, DragZoom
 
-data_block_dtype = np.dtype(([('block_id', '<u8'), \
-                             ('time_stamp', '<f8'), \
-                             ('raw_data', '<f8', (4096,))]))
+from iaes.analysis.similarity import SimilarityIndex, METHODS, \
+    result_dtype
+from iaes.analysis.spectral import cached_spectrum, channel_sampling_rate
+
+from iaes.readers.background import default_worker, HDF5_LOCK
+from iaes.readers.core import data_block_dtype
+from iaes.readers.instrument import measure
+from iaes.readers.lod import MinMaxPyramid
+from iaes.readers.paged_adapter import PagedAdapter
+from iaes.readers.table_cache import ChunkedTable
+
+
+def _load_pyramid(request, pyramid):
+    """Build (or read from its cache) a pyramid in a worker thread."""
+    pyramid.load(request.set_progress)
+    return pyramid
 
 
-class DataBlockAdapter(TabularAdapter):
+def _search_similar(request, table_ptr, row, method, k):
+    """Rank the blocks like the one of a row in a worker thread,
+    computing the embeddings of the table first if needed."""
+    index = SimilarityIndex(table_ptr, method)
+    index.load(progress=request.set_progress)
+    request.check()
+    return index.search_row(row, k)
+
+
+class DataBlockAdapter(PagedAdapter):
 
     columns = [('Block_ID', 'block_id'), ('Time Stamp', 'time_stamp'), \
                ('Raw Data', 'raw_data')]
 
-    def get_text(self, object, trait, row, column):
-        return str(getattr(object, trait)[row][column])
+
+class SimilarAdapter(PagedAdapter):
+
+    columns = [('Block_ID', 'block_id'), ('Row', 'row'), ('Score', 'score')]
 
 
 class DataBlockTable(HasTraits):
     name = Str('<Unknown>')
-    table = Property(Array(dtype=data_block_dtype), depends_on='table_ptr')
-    _table = Array(dtype=data_block_dtype)
+    # either a plain structured array or a ChunkedTable reading the rows
+    # of table_ptr on demand
+    table = Property(Any, depends_on='table_ptr')
+    _table = Any
     table_ptr = Any  # PyTables iterator to access the rown
 
+    # serve the rows from memory-mapped sidecar columns (see column_cache),
+    # on by default when the IAES_MMAP_CACHE environment variable is set
+    mmap_cache = Bool
+
     selected = Any
+    selected_row = Int(-1)
 
-    view = View(
-                Item('table',
-                     show_label=False,
-                     style='readonly',
-                     editor=TabularEditor(adapter=DataBlockAdapter(),
-                                          selected='selected',
-                                          editable=False)
-                     ),
-                title='Parameters Table',
-                height=0.50,
-                width=0.30,
-                resizable=True
-            )
+    # fired when rows were appended to the table
+    table_updated = Event
+
+    # built for each table, each editor getting its own adapter and
+    # so its own cache of pages
+    def default_traits_view(self):
+        return View(
+                    Item('table',
+                         show_label=False,
+                         style='readonly',
+                         editor=TabularEditor(adapter=DataBlockAdapter(),
+                                              selected='selected',
+                                              selected_row='selected_row',
+                                              update='table_updated',
+                                              editable=False)
+                         ),
+                    title='Raw Data Table',
+                    height=0.50,
+                    width=0.30,
+                    resizable=True
+                )
 
     def _get_table(self):
-        if self._table is None or len(self._table) == 0:
-            if self.table_ptr is not None:
-                self._table = np.array(self.table_ptr, self.table_ptr.dtype)
-            else:
-                self._table = np.array([])
-        return self._table
+        # built once for a table_ptr (see _table_ptr_changed), even if
+        # the table is empty or still growing
+        with measure('rowdata.table'):
+            if self._table is None:
+                if self.table_ptr is not None:
+                    self._table = ChunkedTable(self.table_ptr,
+                                               mmap_cache=self.mmap_cache)
+                else:
+                    self._table = np.array([], dtype=data_block_dtype)
+            return self._table
+
+    def _mmap_cache_default(self):
+        return bool(os.environ.get('IAES_MMAP_CACHE'))
 
     def _set_table(self, np_arr_struct):
         self._table = np_arr_struct
 
+    def _table_ptr_changed(self, new):
+        if isinstance(self._table, ChunkedTable) and new is not None and \
+                new._v_pathname == self._table.path:
+            # a newer handle on the same table, e.g. after rows were
+            # appended: keep the rows already cached
+            self._table.refresh(new)
+            self.table_updated = True
+        else:
+            self._table = None
+
+    def refresh(self, table_ptr):
+        """Follow rows appended to the table, available through a newer
+        handle: the chunks already cached are kept and the views (the
+        table and the pyramid of the plot) updated.
+        """
+        if table_ptr is not self.table_ptr:
+            self.table_ptr = table_ptr
+            return
+        if isinstance(self._table, ChunkedTable):
+            self._table.refresh(table_ptr)
+        self.table_updated = True
+
+    def between(self, t0, t1):
+        """Return the rows with t0 <= time_stamp < t1."""
+        if isinstance(self.table, ChunkedTable):
+            return self.table.between(t0, t1)
+        time_stamp = self.table['time_stamp']
+        return self.table[(time_stamp >= t0) & (time_stamp < t1)]
+
 
 class DataBlockTablePlot(HasTraits):
 
@@ -91,31 +166,103 @@ class DataBlockTablePlot(HasTraits):
     # Chaco Plot instance
     plot = Instance(Plot)
 
-    traits_view = View(
-                       VGroup(
-                              Item('dataset', show_label=False, style='custom',
-                                   editor=InstanceEditor()),
-                              Item('plot',
-                                   show_label=False,
-                                   editor=ComponentEditor(),
-                                   width=0.25, height=0.35
-                                   ),
-                              ),
-                       width=0.60, height=0.60,
-                       resizable=True,
-                       title='Parameters Plot',
-                       )
+    # show the consecutive blocks as one continuous signal
+    continuous = Bool(False)
+
+    # min/max level-of-detail pyramid used in continuous mode
+    pyramid = Property(depends_on='dataset.table_ptr')
+    _pyramid = Any
+
+    # (low, high, width) of the continuous view currently drawn
+    _stream_view = Any
+
+    # the pyramid is built by a background worker (see background.py),
+    # the plot switching to continuous mode once it is ready
+    worker = Any
+    loading = Bool(False)
+    progress = Int(0)
+    _request = Any
+
+    # blocks most similar to the selected one (see
+    # iaes.analysis.similarity), best first; selecting one selects its row
+    find_similar = Button('Find similar')
+    similarity = Enum(METHODS)
+    max_similar = Int(50)
+    similar = Array(dtype=result_dtype)
+    similar_row = Int(-1)
+    _search = Any
+
+    # power spectrum of the selected block, read from the spectral
+    # sidecar of the channel (see iaes.analysis.spectral) when computed
+    spectrum_data = Instance(ArrayPlotData, ())
+    spectrum_plot = Instance(Plot)
+
+    def default_traits_view(self):
+        return View(
+                    VGroup(
+                           Item('dataset', show_label=False, style='custom',
+                                editor=InstanceEditor()),
+                           HGroup(Item('continuous'),
+                                  Item('similarity'),
+                                  Item('find_similar', show_label=False),
+                                  Item('progress', show_label=False,
+                                       editor=ProgressEditor(min=0, max=100),
+                                       visible_when='loading')),
+                           HGroup(
+                                  Item('plot',
+                                       show_label=False,
+                                       editor=ComponentEditor(),
+                                       width=0.25, height=0.35
+                                       ),
+                                  Item('spectrum_plot',
+                                       show_label=False,
+                                       editor=ComponentEditor(),
+                                       width=0.15, height=0.35
+                                       ),
+                                  ),
+                           Item('similar',
+                                show_label=False,
+                                editor=TabularEditor(
+                                    adapter=SimilarAdapter(),
+                                    selected_row='similar_row',
+                                    editable=False),
+                                visible_when='len(similar) > 0'),
+                           ),
+                    width=0.60, height=0.60,
+                    resizable=True,
+                    title='Parameters Plot',
+                    )
 
     def cview(self):
         return View(
                     VGroup(
                            Item('dataset', show_label=False, style='custom',
                                 editor=InstanceEditor()),
-                           Item('plot',
+                           HGroup(Item('continuous'),
+                                  Item('similarity'),
+                                  Item('find_similar', show_label=False),
+                                  Item('progress', show_label=False,
+                                       editor=ProgressEditor(min=0, max=100),
+                                       visible_when='loading')),
+                           HGroup(
+                                  Item('plot',
+                                       show_label=False,
+                                       editor=ComponentEditor(),
+                                       width=0.25, height=0.35
+                                       ),
+                                  Item('spectrum_plot',
+                                       show_label=False,
+                                       editor=ComponentEditor(),
+                                       width=0.15, height=0.35
+                                       ),
+                                  ),
+                           Item('similar',
                                 show_label=False,
-                                editor=ComponentEditor(),
-                                width=0.25, height=0.35
-                                ),
+                                editor=TabularEditor(
+                                    adapter=SimilarAdapter(),
+                                    selected_row='similar_row',
+                                    editable=False),
+                                visible_when='len(similar) > 0'),
                            ),
                     width=0.60, height=0.60,
                     resizable=True,
@@ -126,19 +273,194 @@ class DataBlockTablePlot(HasTraits):
     def _get_selected(self):
         return self.dataset.selected
 
+    def _get_pyramid(self):
+        if self.dataset is None or self.dataset.table_ptr is None:
+            return None
+        table_ptr = self.dataset.table_ptr
+        if self._pyramid is None or \
+                self._pyramid.path != table_ptr._v_pathname:
+            self._pyramid = MinMaxPyramid(table_ptr)
+        elif self._pyramid.table_ptr is not table_ptr:
+            # rows were appended: only those are added to the pyramid
+            self._pyramid.refresh(table_ptr)
+        return self._pyramid
+
+    def _streaming(self):
+        """Whether the continuous stream is drawn."""
+        return self.continuous and self.pyramid is not None and \
+            self.pyramid.ready
+
+    @on_trait_change('dataset.table_updated')
+    def _table_updated(self):
+        pyramid = self._pyramid
+        if pyramid is not None and pyramid.ready:
+            # add the rows appended meanwhile (a pyramid still being built
+            # is extended once it is ready)
+            with HDF5_LOCK:
+                pyramid.refresh(self.dataset.table_ptr)
+        if self._streaming():
+            self._stream_view = None
+            self._stream_view_change()
+
     @on_trait_change('selected')
     def _data_source_change(self):
         """Handler for changes of ther selected table row
         """
-        if self.selected is None:
-            return
+        with measure('plot.rowdata.source'):
+            if self.selected is None:
+                return
+
+            if self._streaming():
+                # bring the selected block into view
+                row = self.dataset.selected_row
+                if row >= 0:
+                    size = self.pyramid.block_size
+                    self.plot.index_range.set_bounds(row * size,
+                                                     (row + 1) * size)
+                return
+
+            x = np.linspace(0, \
+                            len(self.selected['raw_data']), \
+                            len(self.selected['raw_data']))
+
+            self.plot_data.set_data('x', x)
+            self.plot_data.set_data('y', self.selected['raw_data'])
 
-        x = np.linspace(0, \
-                        len(self.selected['raw_data']), \
-                        len(self.selected['raw_data']))
+    @on_trait_change('selected')
+    def _spectrum_change(self):
+        """Show the cached spectrum of the selected block
+        """
+        with measure('plot.rowdata.spectrum'):
+            table_ptr = self.dataset.table_ptr
+            if self.selected is None or table_ptr is None:
+                return
+            with HDF5_LOCK:
+                channel = table_ptr._v_parent
+                spectral = cached_spectrum(channel, self.dataset.selected_row,
+                                           self.selected['block_id'])
+                sampling_rate = channel_sampling_rate(channel)
+            if spectral is None:
+                self.spectrum_data.set_data('freq', [])
+                self.spectrum_data.set_data('power', [])
+                self.spectrum_plot.title = 'Spectrum (not computed)'
+                return
+            spectrum = spectral['spectrum']
+            nyquist = sampling_rate / 2.0
+            freq = (np.arange(len(spectrum)) + 0.5) * nyquist / len(spectrum)
+            self.spectrum_data.set_data('freq', freq / 1e3)
+            self.spectrum_data.set_data('power', spectrum)
+            self.spectrum_plot.title = 'Peak %.0f kHz, centroid %.0f kHz' % \
+                (spectral['peak_freq'] / 1e3, spectral['centroid'] / 1e3)
+
+    def _continuous_changed(self, new):
+        """Switch between the selected block and the continuous stream
+        """
+        index_range = self.plot.index_range
+        if new and self.pyramid is not None and not self.pyramid.ready:
+            self._build_pyramid()
+        elif new and self.pyramid is not None:
+            self._stream_view = None
+            index_range.set_bounds(0, self.pyramid.n_samples)
+            index_range.on_trait_change(self._stream_view_change, 'updated')
+            self.plot.on_trait_change(self._stream_view_change, 'bounds')
+            self._stream_view_change()
+        else:
+            self.cancel()
+            index_range.on_trait_change(self._stream_view_change, 'updated',
+                                        remove=True)
+            self.plot.on_trait_change(self._stream_view_change, 'bounds',
+                                      remove=True)
+            index_range.low_setting = 'auto'
+            index_range.high_setting = 'auto'
+            self._data_source_change()
+
+    def _worker_default(self):
+        return default_worker(GUI.invoke_later)
+
+    def _build_pyramid(self):
+        """Build the pyramid in the background; whatever was loading for
+        the view shown before is cancelled.
+        """
+        self.loading = True
+        self.progress = 0
+        self._request = self.worker.submit(
+            _load_pyramid, (self.pyramid,), key='view',
+            on_done=self._pyramid_built, on_error=self._pyramid_failed,
+            on_progress=self._load_progress, on_cancel=self._load_cancelled)
+
+    def _pyramid_built(self, pyramid):
+        self._request = None
+        self.loading = self._search is not None
+        if pyramid is self._pyramid:
+            # add the rows appended while it was being built
+            pyramid.refresh(pyramid.table_ptr)
+            if self.continuous:
+                self._continuous_changed(True)
+
+    def _pyramid_failed(self, error):
+        self._request = None
+        self.loading = self._search is not None
+        self.plot.title = 'Row Data (continuous view failed: %s)' % error
+        self.continuous = False
+
+    def _load_progress(self, fraction):
+        self.progress = int(100 * fraction)
+
+    def _load_cancelled(self):
+        # only the current request matters: a newer one may be running
+        if self._request is not None and self._request.cancelled:
+            self._request = None
+            self.loading = self._search is not None
+            self.continuous = False
+
+    def _find_similar_fired(self):
+        """Search the blocks like the selected one in the background."""
+        table_ptr = self.dataset.table_ptr
+        row = self.dataset.selected_row
+        if table_ptr is None or row < 0:
+            return
+        self.loading = True
+        self.progress = 0
+        self._search = self.worker.submit(
+            _search_similar,
+            (table_ptr, row, self.similarity, self.max_similar),
+            key='similar', on_done=self._similar_found,
+            on_error=self._similar_failed, on_progress=self._load_progress)
+
+    def _similar_found(self, results):
+        self._search = None
+        self.loading = self._request is not None
+        self.similar_row = -1
+        self.similar = results
+
+    def _similar_failed(self, error):
+        self._search = None
+        self.loading = self._request is not None
+        self.plot.title = 'Row Data (similarity search failed: %s)' % error
+
+    def _similar_row_changed(self, new):
+        if 0 <= new < len(self.similar):
+            self.dataset.selected_row = int(self.similar['row'][new])
+
+    def cancel(self):
+        """Stop building the pyramid."""
+        if self._request is not None:
+            self._request.cancel()
+
+    def _stream_view_change(self):
+        """Redraw the continuous stream at the level of detail matching
+        the visible span and the width of the plot in pixels
+        """
+        with measure('plot.rowdata.stream'):
+            index_range = self.plot.index_range
+            view = (index_range.low, index_range.high, int(self.plot.width))
+            if view == self._stream_view:
+                return
+            self._stream_view = view
 
-        self.plot_data.set_data('x', x)
-        self.plot_data.set_data('y', self.selected['raw_data'])
+            x, y = self.pyramid.line(*view)
+            self.plot_data.set_data('x', x)
+            self.plot_data.set_data('y', y)
 
     def _plot_data_default(self):
         """ This creates a list of ArrayPlotData instances,
@@ -171,6 +493,22 @@ class DataBlockTablePlot(HasTraits):
 
         return plot
 
+    def _spectrum_data_default(self):
+        spectrum_data = ArrayPlotData()
+        spectrum_data.set_data('freq', [])
+        spectrum_data.set_data('power', [])
+        return spectrum_data
+
+    def _spectrum_plot_default(self):
+        plot = Plot(self.spectrum_data)
+        plot.plot(('freq', 'power'), type='line', color='darkblue')
+        plot.title = 'Spectrum'
+        plot.x_axis.title = 'Frequency (kHz)'
+        plot.y_axis.title = 'Power'
+        plot.tools.append(PanTool(plot))
+        plot.tools.append(ZoomTool(plot))
+        return plot
+
 
 if __name__ == '__main__':
 
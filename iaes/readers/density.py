@@ -0,0 +1,67 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+2-D binning of scatter data, to draw millions of points as a density
+image whose cost depends on the number of pixels and not of points.
+"""
+import numpy as np
+
+
+def data_range(values):
+    """Return (low, high) of finite values, widened if they are all equal.
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0.0, 1.0
+    low, high = float(values.min()), float(values.max())
+    if high <= low:
+        pad = abs(low) * 0.5 or 0.5
+        return low - pad, high + pad
+    return low, high
+
+
+def in_range(x, y, x_range, y_range):
+    """Return the mask of the points inside the given ranges."""
+    return (x >= x_range[0]) & (x <= x_range[1]) & \
+        (y >= y_range[0]) & (y <= y_range[1])
+
+
+def bin_counts(x, y, x_range, y_range, shape):
+    """Return the (ny, nx) histogram of the points in the given ranges,
+    `shape` being (nx, ny). Points outside the ranges are ignored.
+    """
+    if x_range[1] <= x_range[0] or y_range[1] <= y_range[0]:
+        raise ValueError('empty range')
+    nx, ny = max(1, int(shape[0])), max(1, int(shape[1]))
+    mask = in_range(x, y, x_range, y_range)
+    x = np.asarray(x[mask], dtype=np.float64)
+    y = np.asarray(y[mask], dtype=np.float64)
+    ix = (x - x_range[0]) * (nx / float(x_range[1] - x_range[0]))
+    iy = (y - y_range[0]) * (ny / float(y_range[1] - y_range[0]))
+    # the upper edges belong to the last bins
+    ix = np.minimum(ix.astype(np.intp), nx - 1)
+    iy = np.minimum(iy.astype(np.intp), ny - 1)
+    counts = np.bincount(iy * nx + ix, minlength=nx * ny)
+    return counts.reshape(ny, nx)
+
+
+def density_image(counts, log=True):
+    """Return the image of a histogram, optionally on a log scale which
+    keeps sparse regions visible next to dense ones.
+    """
+    image = counts.astype(np.float32)
+    if log:
+        image = np.log1p(image)
+    return image
+
+#EOF
@@ -0,0 +1,119 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.core import open_file
+
+
+# Number of idle handles kept open by default
+MAX_OPEN = 16
+
+
+class HandlePool(object):
+    """Shared, read-only handles on IAES files.
+
+    A file is opened once, whoever asks for it, and stays open while it is
+    in use (between acquire() and release()). Handles that are no longer
+    in use are kept open for reuse, the least recently used ones being
+    closed when more than `max_open` files are open.
+
+    Handles are opened and closed holding HDF5_LOCK, so never while a
+    background worker reads from them.
+    """
+
+    def __init__(self, max_open=MAX_OPEN):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._users = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self._handles
+
+    def acquire(self, filename):
+        """Return an open read-only handle on a file, marking it in use.
+        """
+        key = os.path.abspath(filename)
+        with HDF5_LOCK, self._lock:
+            h5file = self._handles.pop(key, None)
+            if h5file is None or not h5file.isopen:
+                h5file = open_file(key, 'r')
+            self._handles[key] = h5file
+            self._users[key] = self._users.get(key, 0) + 1
+            self._evict()
+            return h5file
+
+    def release(self, filename):
+        """Mark a handle obtained with acquire() as no longer used by the
+        caller. It may be closed from now on.
+        """
+        key = os.path.abspath(filename)
+        with HDF5_LOCK, self._lock:
+            users = self._users.get(key, 0) - 1
+            if users > 0:
+                self._users[key] = users
+            else:
+                self._users.pop(key, None)
+            self._evict()
+
+    def reopen(self, filename):
+        """Close and reopen a file, e.g. to see rows appended by another
+        process. Nodes of the previous handle become invalid.
+        """
+        key = os.path.abspath(filename)
+        with HDF5_LOCK, self._lock:
+            h5file = self._handles.pop(key, None)
+            if h5file is not None and h5file.isopen:
+                h5file.close()
+            h5file = open_file(key, 'r')
+            self._handles[key] = h5file
+            return h5file
+
+    def _evict(self):
+        excess = len(self._handles) - self.max_open
+        for key in list(self._handles):
+            if excess <= 0:
+                break
+            if self._users.get(key, 0) == 0:
+                h5file = self._handles.pop(key)
+                if h5file.isopen:
+                    h5file.close()
+                excess -= 1
+
+    def close_all(self):
+        with HDF5_LOCK, self._lock:
+            for h5file in self._handles.values():
+                if h5file.isopen:
+                    h5file.close()
+            self._handles.clear()
+            self._users.clear()
+
+
+_default_pool = None
+
+
+def default_pool():
+    """Return the pool shared by the whole process."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = HandlePool()
+    return _default_pool
+
+#EOF
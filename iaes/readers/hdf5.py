@@ -11,8 +11,6 @@ All rights reserved
 
 Created on Jun 12, 2012
 """
-from tables import openFile
-
 import sip
 sip.setapi('QString', 2)
 sip.setapi('QVariant', 2)
@@ -36,17 +34,23 @@ os.environ['ETS_TOOLKIT'] = 'qt4'
 
 from traits.api import \
     HasTraits, Str, List, Dict, Any, Property, cached_property, Instance, \
-    adapts, File, Button, on_trait_change
+    adapts, File, Button, Bool, Float, on_trait_change
 
 from traitsui.api import \
     TreeEditor, TreeNode, ITreeNode, View, Item, \
-    ITreeNodeAdapter, VGroup, HGroup, Controller
+    ITreeNodeAdapter, VGroup, HGroup, Controller, InstanceEditor
 
 from traitsui.tabular_adapter import TabularAdapter
 from pyface.api import FileDialog, MessageDialog
+from pyface.timer.api import Timer
 
-from datablock_table import DataBlockTable, DataBlockTablePlot
-from parameters_table import ParametersTable, ParametersTablePlot
+from iaes.readers.core import iter_boards, iter_channels, iter_tables, \
+    node_meta, table_kind, ROWDATA, PARAMETERS
+from iaes.readers.handle_pool import default_pool
+from iaes.readers.instrument import log, measure, timed
+from iaes.readers.tail import FileFollower
+from iaes.readers.datablock_table import DataBlockTable, DataBlockTablePlot
+from iaes.readers.parameters_table import ParametersTable, ParametersTablePlot
 
 
 class Board(HasTraits):
@@ -56,26 +60,41 @@ class Board(HasTraits):
     board_id = Str('<unknown>')
     path = Str('<unknown>')
     parent_path = Str('<unknown>')
-    chnls = List
+    # channels are only enumerated when the node is expanded
+    chnls = Property(List, depends_on='h5file_board_ptr')
+    _chnls = Any
     meta = Property(Dict, depends_on='h5file_board_ptr')
     cview = Property(depends_on='h5file_board_ptr')
 
     @cached_property
     def _get_cview(self):
         for label in self.meta.keys():
-            print label, self.meta[label]
+            log.debug('%s: %s', label, self.meta[label])
             self.add_trait(label, self.meta[label])
         items = [Item(name, style='readonly') \
                  for name in sorted(self.meta.keys())]
         return View(*items)
 
+    def _get_chnls(self):
+        if self._chnls is None and self.h5file_board_ptr is not None:
+            self._chnls = _get_channels(self.h5file_board_ptr,
+                                        self.h5file_board_ptr._v_file)
+        return self._chnls or []
+
+    def _h5file_board_ptr_changed(self):
+        self._chnls = None
+
+    def rebind(self, h5file):
+        """Point to the same group in a reopened file, together with the
+        channels already discovered.
+        """
+        self.trait_setq(h5file_board_ptr=h5file.getNode(self.path))
+        for channel in self._chnls or []:
+            channel.rebind(h5file)
+
     @cached_property
     def _get_meta(self):
-        labels = self.h5file_board_ptr._v_attrs._f_list("user")
-        meta = {}
-        for label in labels:
-            meta[label] = self.h5file_board_ptr._v_attrs[label]
-        return meta
+        return node_meta(self.h5file_board_ptr)
 
 
 class Channel(HasTraits):
@@ -85,25 +104,89 @@ class Channel(HasTraits):
     channel_id = Str('<unknown>')
     path = Str('<unknown>')
     parent_path = Str('<unknown>')
+    # tables are only enumerated when the node is expanded
+    tables = Property(List, depends_on='h5file_channel_ptr')
+    _tables = Any
     meta = Property(Dict, depends_on='h5file_channel_ptr')
     cview = Property(depends_on='h5file_channel_ptr')
 
     @cached_property
     def _get_cview(self):
         for label in self.meta.keys():
-            print label, self.meta[label]
+            log.debug('%s: %s', label, self.meta[label])
             self.add_trait(label, self.meta[label])
         items = [Item(name, style='readonly') \
                  for name in sorted(self.meta.keys())]
         return View(*items)
 
+    def _get_tables(self):
+        if self._tables is None and self.h5file_channel_ptr is not None:
+            self._tables = _get_tables(self.h5file_channel_ptr,
+                                       self.h5file_channel_ptr._v_file)
+        return self._tables or []
+
+    def _h5file_channel_ptr_changed(self):
+        self._tables = None
+
+    def rebind(self, h5file):
+        """Point to the same group in a reopened file, together with the
+        tables already discovered.
+        """
+        self.trait_setq(h5file_channel_ptr=h5file.getNode(self.path))
+        for table in self._tables or []:
+            table.rebind(h5file)
+
     @cached_property
     def _get_meta(self):
-        labels = self.h5file_channel_ptr._v_attrs._f_list("user")
-        meta = {}
-        for label in labels:
-            meta[label] = self.h5file_channel_ptr._v_attrs[label]
-        return meta
+        return node_meta(self.h5file_channel_ptr)
+
+
+class TableLeaf(HasTraits):
+    """ This class represents a 'rowdata' or 'parameters' table in the hdf5
+    tree structure. The table and its plot are only built when the leaf is
+    selected. """
+
+    table_ptr = Any
+    name = Str('<unknown>')
+    label = Str('<unknown>')
+    path = Str('<unknown>')
+    parent_path = Str('<unknown>')
+    plot = Property(depends_on='table_ptr')
+    _plot = Any
+
+    def _get_plot(self):
+        if self._plot is None:
+            kind = table_kind(self.table_ptr)
+            if kind == ROWDATA:
+                db = DataBlockTable(name=self.name, table_ptr=self.table_ptr)
+                self._plot = DataBlockTablePlot(dataset=db)
+            elif kind == PARAMETERS:
+                param = ParametersTable(name=self.name,
+                                        table_ptr=self.table_ptr)
+                self._plot = ParametersTablePlot(dataset=param)
+        return self._plot
+
+    def _table_ptr_changed(self):
+        self._plot = None
+
+    def rebind(self, h5file):
+        """Point to the same table in a reopened file. If the plot was
+        already built only the rows appended meanwhile are loaded.
+        """
+        table_ptr = h5file.getNode(self.path)
+        self.trait_setq(table_ptr=table_ptr)
+        if self._plot is not None:
+            self._plot.dataset.refresh(table_ptr)
+
+    def cview(self):
+        return View(
+                    Item('plot',
+                         show_label=False,
+                         style='custom',
+                         editor=InstanceEditor(view=self.plot.cview())
+                         ),
+                    resizable=True
+                    )
 
 
 class DataBlockAdapter(TabularAdapter):
@@ -125,7 +208,8 @@ class BoardObjectAdapter(ITreeNodeAdapter):
         return True
 
     def has_children(self):
-        return len(self.adaptee.chnls) > 0
+        # do not enumerate the channels just to draw the expander
+        return self.adaptee.h5file_board_ptr._v_nchildren > 0
 
     def get_children(self):
         return self.adaptee.chnls
@@ -144,7 +228,8 @@ class ChannelObjectAdapter(ITreeNodeAdapter):
         return True
 
     def has_children(self):
-        return len(self.adaptee.tables) > 0
+        # do not enumerate the tables just to draw the expander
+        return self.adaptee.h5file_channel_ptr._v_nchildren > 0
 
     def get_children(self):
         return self.adaptee.tables
@@ -156,9 +241,8 @@ class ChannelObjectAdapter(ITreeNodeAdapter):
         return self.adaptee.channel_id
 
 
-class DataBlockTablePlotObjectAdapter(ITreeNodeAdapter):
-
-    adapts(DataBlockTablePlot, ITreeNode)
+class TableLeafObjectAdapter(ITreeNodeAdapter):
+    adapts(TableLeaf, ITreeNode)
 
     def allows_children(self):
         return False
@@ -170,23 +254,7 @@ class DataBlockTablePlotObjectAdapter(ITreeNodeAdapter):
         return self.adaptee.cview()
 
     def get_label(self):
-        return "Raw Data"
-
-
-class ParametersTablePlotObjectAdapter(ITreeNodeAdapter):
-    adapts(ParametersTablePlot, ITreeNode)
-
-    def allows_children(self):
-        return False
-
-    def has_children(self):
-        return False
-
-    def get_view(self):
-        return self.adaptee.cview()
-
-    def get_label(self):
-        return "Parameters"
+        return self.adaptee.label
 
 
 # HDF5 Nodes in the tree
@@ -199,48 +267,81 @@ class Hdf5TableNode(HasTraits):
 class Hdf5FileNode(HasTraits):
     name = Str('<unknown>')
     path = Str('/')
+    filename = Str
+    h5file = Any
     boards = List(Board)
     channels = List(Channel)
     tables = List(Hdf5TableNode)
     boards_channels_tables = List
 
+    # reopens the file when it grows, see ATree.follow
+    _follower = Any
+
+    def follow(self, pool):
+        if self._follower is None:
+            self._follower = FileFollower(self.filename, pool=pool)
 
+    def unfollow(self):
+        if self._follower is not None:
+            self._follower.close()
+            self._follower = None
+
+    def poll(self):
+        """Reopen the file if it changed on disk and point the nodes
+        already discovered to it, loading only the appended rows.
+        """
+        if self._follower is None or (self.h5file is not None and
+                                      not self._follower.changed()):
+            return
+        self.h5file = self._follower.reopen()
+        if self.h5file is not None:
+            for board in self.boards:
+                board.rebind(self.h5file)
+
+
+class Hdf5Session(HasTraits):
+    """ The files open in the browser, each one a root of the tree. """
+    name = Str('IAES')
+    files = List(Hdf5FileNode)
+
+
+@timed('tree.tables')
 def _get_tables(group, h5file):
     """Return a list of all tables immediately below a group
     in an HDF5 file."""
     l = []
 
-    for table in h5file.iterNodes(group, classname='Table'):
-        if table._v_name == 'rowdata':
-            db = DataBlockTable(name=table._v_name,
-                                table_ptr=table)
-
-            a = DataBlockTablePlot(dataset=db)
-            l.append(a)
-        elif table._v_name == 'parameters':
-            param = ParametersTable(name=table._v_name,
-                                    table_ptr=table)
-            a = ParametersTablePlot(dataset=param)
-            l.append(a)
+    for table in iter_tables(group):
+        if table._v_name == ROWDATA:
+            label = 'Raw Data'
+        elif table._v_name == PARAMETERS:
+            label = 'Parameters'
+        else:
+            label = 'Parameters (%s)' % table._v_name[len(PARAMETERS) + 1:]
+        l.append(TableLeaf(
+                name=table._v_name,
+                label=label,
+                path=table._v_pathname,
+                parent_path=table._v_parent._v_pathname,
+                table_ptr=table
+                ))
     return l
 
 
+@timed('tree.channels')
 def _get_channels(board, h5file):
     """Return a list of all groups and arrays immediately below a group
     in an HDF5 file."""
     l = []
 
-    for subgroup in h5file.iterNodes(board, classname='Group'):
-        if subgroup._v_name.lower().strip().find('ch') != -1:
-            g = Channel(
-                    channel_id=subgroup._v_name,
-                    path=subgroup._v_pathname,
-                    parent_path=subgroup._v_parent._v_pathname,
-                    h5file_channel_ptr=subgroup
-                    )
-            g.tables = _get_tables(subgroup, h5file)
-
-            l.append(g)
+    for subgroup in iter_channels(board):
+        g = Channel(
+                channel_id=subgroup._v_name,
+                path=subgroup._v_pathname,
+                parent_path=subgroup._v_parent._v_pathname,
+                h5file_channel_ptr=subgroup
+                )
+        l.append(g)
 
     return l
 
@@ -250,27 +351,27 @@ def _get_boards(h5file):
     in an HDF5 file."""
     l = []
 
-    for subgroup in h5file.iterNodes(h5file.root, classname='Group'):
-        if subgroup._v_name.lower().strip().find('board') != -1:
-            g = Board(
-                    board_id=subgroup._v_name,
-                    path=subgroup._v_pathname,
-                    parent_path=subgroup._v_parent._v_pathname,
-                    h5file_board_ptr=subgroup
-                    )
-            g.chnls = _get_channels(subgroup, h5file)
-
-            l.append(g)
+    for subgroup in iter_boards(h5file):
+        g = Board(
+                board_id=subgroup._v_name,
+                path=subgroup._v_pathname,
+                parent_path=subgroup._v_parent._v_pathname,
+                h5file_board_ptr=subgroup
+                )
+        l.append(g)
 
     return l
 
 
+@timed('tree.build')
 def _hdf5_tree(h5file):
-    """Return a list of all groups and arrays below the root group
-    of an HDF5 file."""
+    """Return the root node of an HDF5 file tree. Only the boards are
+    listed here, channels and tables are discovered when expanded."""
 
     file_tree = Hdf5FileNode(
-            name='IAES',
+            name=os.path.basename(h5file.filename),
+            filename=h5file.filename,
+            h5file=h5file,
             boards=_get_boards(h5file)
             )
 
@@ -307,6 +408,13 @@ def _hdf5_tree_editor_item(selected=''):
     """Return a TreeEditor specifically for HDF5 file trees."""
     return TreeEditor(
         nodes=[
+            TreeNode(
+                node_for=[Hdf5Session],
+                auto_open=True,
+                children='files',
+                label='name',
+                view=no_view,
+                ),
             TreeNode(
                 node_for=[Hdf5FileNode],
                 auto_open=True,
@@ -322,6 +430,7 @@ def _hdf5_tree_editor_item(selected=''):
                 view=no_view,
                 ),
             ],
+        hide_root=True,
         selected=selected,
         shared_editor=True
         )
@@ -331,6 +440,13 @@ def _hdf5_tree_editor_tree(selected='', item_editor=''):
     """Return a TreeEditor specifically for HDF5 file trees."""
     return TreeEditor(
         nodes=[
+            TreeNode(
+                node_for=[Hdf5Session],
+                auto_open=True,
+                children='files',
+                label='name',
+                view=no_view,
+                ),
             TreeNode(
                 node_for=[Hdf5FileNode],
                 auto_open=True,
@@ -346,6 +462,7 @@ def _hdf5_tree_editor_tree(selected='', item_editor=''):
                 view=no_view,
                 ),
             ],
+        hide_root=True,
         selected=selected,
         shared_editor=True,
         editor=item_editor
@@ -355,6 +472,7 @@ def _hdf5_tree_editor_tree(selected='', item_editor=''):
 class AtreeC(Controller):
 
     open_file = Button('Open')
+    close_file = Button('Close')
 
     item_editor = _hdf5_tree_editor_item(selected='node')
     tree_editor = _hdf5_tree_editor_tree(selected='node', \
@@ -384,16 +502,18 @@ class AtreeC(Controller):
     view = View(VGroup(
                        HGroup(
                               Item('handler.open_file'),
+                              Item('handler.close_file'),
                               Item('filename', style='readonly', springy=True),
                               #Item('update'),
+                              HGroup(Item('follow')),
                               show_labels=False,
                               ),
-                       Item('h5_tree',
+                       Item('session',
                             editor=tree_editor,
                             resizable=True,
                             show_label=False
                             ),
-                       Item('h5_tree',
+                       Item('session',
                             editor=item_editor,
                             resizable=True,
                             show_label=False
@@ -412,46 +532,106 @@ class AtreeC(Controller):
         dlg = FileDialog()
         if dlg.open():
             if dlg.path != '':
-                if self.model.h5file is not None:
-                    self.model.h5file.close()
-                self.model.filename = dlg.path
-            else:
-                self.model.h5file = None
+                # opened next to the files already in the browser, even
+                # if it is the file last opened (and since closed)
+                self.model.open_file(dlg.path)
+
+    @on_trait_change('close_file')
+    def _close_file_changed(self):
+        if isinstance(self.model.node, Hdf5FileNode):
+            self.model.close_file(self.model.node)
 
     @on_trait_change('node')
     def _node_changed(self, new):
-        try:
-            print new.path
-        except:
-            pass
+        log.debug('selected %s', getattr(new, 'path', new))
 
     def close(self, info, is_ok):
-        self.model.h5file.close()
+        self.model.close()
         return True
 
 
 class ATree(HasTraits):
 
+    # the file opened last, setting it adds the file to the session
     filename = File
-    h5File = Any
 
-    h5_tree = Property(Instance(Hdf5FileNode), depends_on='filename')
+    # the handle on the file opened last
+    h5file = Property(depends_on='session.files')
+
+    # one root per open file, the handles being shared through a pool
+    session = Instance(Hdf5Session, ())
+    pool = Any
 
     node = Any
 
-    @cached_property
-    def _get_h5_tree(self):
+    # follow the files while the acquisition system is still writing them
+    follow = Bool(False)
+    poll_interval = Float(1.0)
+    _timer = Any
 
-        if self.filename is None:
+    def _pool_default(self):
+        return default_pool()
+
+    def _get_h5file(self):
+        if not self.session.files:
             return None
+        return self.session.files[-1].h5file
+
+    def _filename_changed(self, new):
+        if new:
+            self.open_file(new)
+
+    def open_file(self, filename):
+        """Add a file to the session (if not there already), opening it
+        read-only through the handle pool."""
+        for file_node in self.session.files:
+            if os.path.abspath(file_node.filename) == \
+                    os.path.abspath(filename):
+                return file_node
         try:
-            self.h5file = openFile(self.filename, "a")
-            return _hdf5_tree(self.h5file)
+            with measure('file.open'):
+                h5file = self.pool.acquire(filename)
+            file_node = _hdf5_tree(h5file)
         except Exception, exc:
-            dlg = MessageDialog(title='Could not open file %s' % self.filename,
+            dlg = MessageDialog(title='Could not open file %s' % filename,
                 message=str(exc))
             dlg.open()
             return None
+        if self.follow:
+            file_node.follow(self.pool)
+        self.session.files.append(file_node)
+        return file_node
+
+    def close_file(self, file_node):
+        """Remove a file from the session, releasing its handle."""
+        file_node.unfollow()
+        self.session.files.remove(file_node)
+        self.pool.release(file_node.filename)
+        if self.filename and os.path.abspath(self.filename) == \
+                os.path.abspath(file_node.filename):
+            # setting it again opens the file again
+            self.trait_setq(filename='')
+
+    def close(self):
+        self.follow = False
+        for file_node in list(self.session.files):
+            self.close_file(file_node)
+
+    def _follow_changed(self, new):
+        if self._timer is not None:
+            self._timer.Stop()
+            self._timer = None
+        for file_node in self.session.files:
+            if new:
+                file_node.follow(self.pool)
+            else:
+                file_node.unfollow()
+        if new:
+            self._timer = Timer(int(1000 * self.poll_interval), self._poll)
+
+    def _poll(self):
+        for file_node in self.session.files:
+            file_node.poll()
 
 if __name__ == '__main__':
 
@@ -0,0 +1,248 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Timing and memory counters for the slow paths of the browser: opening a
+file, building the tree, loading tables and updating the plots. They are
+off unless the IAES_PROFILE environment variable is set:
+
+    IAES_PROFILE=1          report written to stderr at exit
+    IAES_PROFILE=report.txt report written to a file at exit
+    IAES_TRACE=trace.json   every measure written at exit as a trace file
+                            (Chrome trace event format, chrome://tracing)
+
+The messages of the 'iaes' logger are printed to stderr when IAES_LOG
+gives their level (e.g. IAES_LOG=debug); the root logger is left to the
+application.
+
+For each name the report gives the number of calls, the total and the
+maximum duration, the bytes read and the growth of the peak resident
+memory of the process while measuring (Python 2 has no allocation
+tracer: this is what the operating system reports).
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+try:
+    import resource
+except ImportError:
+    # not on Windows
+    resource = None
+
+
+# Logger of the browser, replacing its diagnostic prints
+log = logging.getLogger('iaes')
+
+# Handler attached to `log` by enable_from_environment, if any
+_handler = None
+
+# Measures kept for the trace file, the older ones being dropped
+MAX_EVENTS = 100000
+
+
+def peak_rss():
+    """Return the peak resident memory of the process, in bytes (0 if it
+    is not available)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on Mac OS X
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Stat(object):
+    """Counters of one measured name."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.nbytes = 0
+        self.peak = 0
+
+    def add(self, duration, nbytes, peak):
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.nbytes += nbytes
+        self.peak = max(self.peak, peak)
+
+    def as_dict(self):
+        return {'calls': self.calls, 'total': self.total, 'max': self.max,
+                'bytes': self.nbytes, 'peak_growth': self.peak}
+
+
+class Profiler(object):
+    """Collects the measures of a session."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.events = []
+            self.origin = time.time()
+
+    def record(self, name, start, duration, nbytes=0, peak=0):
+        """Add a measure of `duration` seconds started at time `start`."""
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.add(duration, nbytes, peak)
+            if len(self.events) >= MAX_EVENTS:
+                del self.events[:MAX_EVENTS // 10]
+            self.events.append((name, start, duration, nbytes,
+                                threading.current_thread().name))
+
+    def as_dict(self):
+        with self._lock:
+            return dict((name, stat.as_dict())
+                        for name, stat in self.stats.items())
+
+    def report(self):
+        """Return the counters as a text table, the slowest names first.
+        """
+        stats = sorted(self.as_dict().items(),
+                       key=lambda item: -item[1]['total'])
+        lines = ['%-32s %8s %10s %10s %12s %12s'
+                 % ('name', 'calls', 'total s', 'max s', 'bytes read',
+                    'peak growth')]
+        for name, stat in stats:
+            lines.append('%-32s %8d %10.4f %10.4f %12d %12d'
+                         % (name, stat['calls'], stat['total'], stat['max'],
+                            stat['bytes'], stat['peak_growth']))
+        return '\n'.join(lines) + '\n'
+
+    def trace(self):
+        """Return the measures in the Chrome trace event format."""
+        with self._lock:
+            events = list(self.events)
+        threads = {}
+        trace = []
+        for name, start, duration, nbytes, thread in events:
+            tid = threads.setdefault(thread, len(threads))
+            trace.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': tid,
+                          'ts': 1e6 * (start - self.origin),
+                          'dur': 1e6 * duration,
+                          'args': {'bytes': nbytes}})
+        for thread, tid in threads.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': 0,
+                          'tid': tid, 'args': {'name': thread}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def write_report(self, path):
+        with open(path, 'w') as f:
+            f.write(self.report())
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+
+
+_profiler = Profiler()
+
+
+def profiler():
+    """Return the profiler of the process."""
+    return _profiler
+
+
+class measure(object):
+    """Context manager measuring a block of code under a name, e.g.
+
+    >>> with measure('parameters.load') as m:
+    ...     rows = table_ptr.read()
+    ...     m.add_bytes(rows.nbytes)
+
+    Nothing is measured when the profiler is off.
+    """
+
+    def __init__(self, name, nbytes=0):
+        self.name = name
+        self.nbytes = nbytes
+
+    def add_bytes(self, nbytes):
+        self.nbytes += nbytes
+
+    def __enter__(self):
+        self.enabled = _profiler.enabled
+        if self.enabled:
+            self.peak = peak_rss()
+            self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            duration = time.time() - self.start
+            _profiler.record(self.name, self.start, duration, self.nbytes,
+                             peak_rss() - self.peak)
+        return False
+
+
+def timed(name):
+    """Decorator measuring every call of a function under a name. Not
+    for traits handlers and property getters, whose signature traits
+    inspects: use measure() in their body instead.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _at_exit(report, trace):
+    if report:
+        if report.lower() in ('1', 'yes', 'true', 'on'):
+            sys.stderr.write(_profiler.report())
+        else:
+            _profiler.write_report(report)
+    if trace:
+        _profiler.write_trace(trace)
+
+
+def enable_from_environment(environ=os.environ):
+    """Turn the profiler on, and register the reports written at exit,
+    as asked by the IAES_PROFILE and IAES_TRACE environment variables,
+    and print the messages of `log` at the level given by IAES_LOG.
+    """
+    global _handler
+    report = environ.get('IAES_PROFILE', '')
+    trace = environ.get('IAES_TRACE', '')
+    if report or trace:
+        _profiler.enabled = True
+        atexit.register(_at_exit, report, trace)
+    level = environ.get('IAES_LOG', '')
+    if level:
+        if _handler is None:
+            _handler = logging.StreamHandler()
+            _handler.setFormatter(logging.Formatter(
+                '%(levelname)s:%(name)s:%(message)s'))
+            log.addHandler(_handler)
+        log.setLevel(getattr(logging, level.upper(), logging.DEBUG))
+
+
+enable_from_environment()
+
+#EOF
@@ -0,0 +1,204 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+import numpy as np
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.instrument import measure
+from iaes.readers.sidecar import sidecar_path, source_stamp, save_npz, \
+    load_npz, save_npy, load_npy
+from iaes.readers.waveform import scaling, decode
+
+
+class MinMaxPyramid(object):
+    """Min/max level-of-detail pyramid of a 'rowdata' table.
+
+    The raw_data blocks of consecutive rows are seen as one continuous
+    signal. Level 0 holds the (min, max) of every `base_bin` samples and
+    each following level merges `factor` bins of the previous one, so a
+    view over any span can be drawn from about one bin per pixel while
+    every peak of the signal is preserved. Compact waveforms are reduced
+    as stored and only the bins are decoded to volts.
+    """
+
+    def __init__(self, table_ptr, column='raw_data', base_bin=256,
+                 factor=4, chunk_rows=256, cache=True):
+        self.table_ptr = table_ptr
+        self.path = table_ptr._v_pathname
+        self.column = column
+        self.scaling = scaling(table_ptr)
+        self.block_size = int(np.prod(table_ptr.coldtypes[column].shape))
+        if self.block_size % base_bin:
+            raise ValueError('base_bin must divide the block size (%d)'
+                             % self.block_size)
+        self.base_bin = base_bin
+        self.factor = factor
+        self.chunk_rows = chunk_rows
+        self.cache = cache
+        self._levels = None
+
+    @property
+    def n_samples(self):
+        return self.table_ptr.nrows * self.block_size
+
+    @property
+    def levels(self):
+        """List of (nbins, 2) arrays holding the (min, max) of each bin."""
+        return self.load()
+
+    @property
+    def ready(self):
+        """Whether the levels are available without reading the table."""
+        return self._levels is not None
+
+    def load(self, progress=None):
+        """Return the levels, from the sidecar cache or building them.
+        `progress(done, total)` is called as rows are read while building.
+        """
+        if self._levels is None:
+            levels = self._load() if self.cache else None
+            if levels is None:
+                nrows = self.table_ptr.nrows
+                levels = self.build(progress)
+                # not if refreshed with appended rows while building
+                if self.cache and self.table_ptr.nrows == nrows:
+                    self._save(levels)
+            self._levels = levels
+        return self._levels
+
+    def bin_size(self, level):
+        return self.base_bin * self.factor ** level
+
+    def _base_bins(self, start, stop, progress=None):
+        """Return the level 0 bins of rows [start, stop)."""
+        per_row = self.block_size // self.base_bin
+        base = np.empty(((stop - start) * per_row, 2), dtype=np.float32)
+        for lo in range(start, stop, self.chunk_rows):
+            hi = min(lo + self.chunk_rows, stop)
+            with HDF5_LOCK:
+                raw = self.table_ptr.read(lo, hi, field=self.column)
+            raw = raw.reshape(-1, self.base_bin)
+            # a negative scale swaps the extremes
+            a = decode(raw.min(axis=1), self.scaling)
+            b = decode(raw.max(axis=1), self.scaling)
+            base[(lo - start) * per_row:(hi - start) * per_row, 0] = \
+                np.minimum(a, b)
+            base[(lo - start) * per_row:(hi - start) * per_row, 1] = \
+                np.maximum(a, b)
+            if progress is not None:
+                progress(hi - start, stop - start)
+        return base
+
+    def _upper_levels(self, base):
+        """Return the list of levels built on top of `base`."""
+        levels = [base]
+        while len(levels[-1]) > 1:
+            prev = levels[-1]
+            edges = np.arange(0, len(prev), self.factor)
+            level = np.empty((len(edges), 2), dtype=np.float32)
+            level[:, 0] = np.minimum.reduceat(prev[:, 0], edges)
+            level[:, 1] = np.maximum.reduceat(prev[:, 1], edges)
+            levels.append(level)
+        return levels
+
+    def build(self, progress=None):
+        """Compute the pyramid streaming the table in chunks of rows."""
+        nrows = self.table_ptr.nrows
+        nbytes = nrows * self.table_ptr.coldtypes[self.column].itemsize
+        with measure('lod.build', nbytes):
+            return self._upper_levels(self._base_bins(0, nrows, progress))
+
+    def refresh(self, table_ptr):
+        """Switch to a newer handle on the same table and extend the
+        pyramid with the rows appended since it was built.
+        """
+        self.table_ptr = table_ptr
+        self.path = table_ptr._v_pathname
+        self.scaling = scaling(table_ptr)
+        if self._levels is None:
+            return
+        base = self._levels[0]
+        done = len(base) * self.base_bin // self.block_size
+        if table_ptr.nrows > done:
+            new = self._base_bins(done, table_ptr.nrows)
+            self._levels = self._upper_levels(np.concatenate((base, new)))
+
+    def _path(self, suffix):
+        return sidecar_path(self.table_ptr, 'lod%s' % suffix)
+
+    def _load(self):
+        info = load_npz(self._path('.npz'), source_stamp(self.table_ptr))
+        if info is None or info['base_bin'] != self.base_bin or \
+                info['factor'] != self.factor:
+            return None
+        levels = [load_npy(self._path('%d.npy' % k))
+                  for k in range(int(info['nlevels']))]
+        if any(level is None for level in levels):
+            return None
+        return levels
+
+    def _save(self, levels):
+        for k, level in enumerate(levels):
+            if not save_npy(self._path('%d.npy' % k), level):
+                return
+        # written last, it validates the levels above
+        save_npz(self._path('.npz'), stamp=source_stamp(self.table_ptr),
+                 base_bin=self.base_bin, factor=self.factor,
+                 nlevels=len(levels))
+
+    def level_for(self, start, stop, width):
+        """Return the coarsest level still giving at least one bin per
+        pixel over [start, stop), or -1 if raw samples should be drawn.
+        """
+        span = max(1, stop - start)
+        width = max(1, int(width))
+        if span <= 2 * width:
+            return -1
+        level = -1
+        while level + 1 < len(self.levels) and \
+                span // self.bin_size(level + 1) >= width:
+            level += 1
+        return level
+
+    def raw(self, start, stop):
+        """Return the raw samples [start, stop) of the continuous signal."""
+        start, stop, _ = slice(start, stop).indices(self.n_samples)
+        if stop <= start:
+            return np.empty((0,), dtype=np.float64)
+        row0 = start // self.block_size
+        row1 = (stop - 1) // self.block_size + 1
+        with HDF5_LOCK:
+            raw = self.table_ptr.read(row0, row1, field=self.column)
+        raw = decode(raw, self.scaling).ravel()
+        offset = row0 * self.block_size
+        return raw[start - offset:stop - offset]
+
+    def line(self, start, stop, width):
+        """Return (x, y) drawing samples [start, stop) with about `width`
+        points: raw samples when zoomed in, otherwise the min and max of
+        each bin one after the other, which preserves the peaks.
+        """
+        start = max(0, int(start))
+        stop = min(self.n_samples, int(np.ceil(stop)))
+        level = self.level_for(start, stop, width)
+        if level < 0:
+            y = self.raw(start, stop)
+            return np.arange(start, start + len(y)), y
+        size = self.bin_size(level)
+        b0 = start // size
+        b1 = min(len(self.levels[level]), -(-stop // size))
+        x = np.repeat(np.arange(b0, b1) * size + size // 2, 2)
+        y = np.asarray(self.levels[level][b0:b1]).ravel()
+        return x, y
+
+#EOF
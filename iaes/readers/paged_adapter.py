@@ -0,0 +1,45 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+from traits.api import Any, Int
+from traitsui.tabular_adapter import TabularAdapter
+
+from iaes.readers.row_pages import RowPages, PAGE_ROWS, MAX_PAGES
+
+
+class PagedAdapter(TabularAdapter):
+    """TabularAdapter showing a structured array or a ChunkedTable.
+
+    The text of the cells comes from a RowPages, so only the rows being
+    displayed are read and formatted, a page at a time, and array columns
+    (the waveforms) are shown as a short summary. The pages cached are
+    those of one table: give each editor its own adapter, building the
+    View in default_traits_view rather than as a class attribute.
+    """
+
+    page_rows = Int(PAGE_ROWS)
+    max_pages = Int(MAX_PAGES)
+
+    _pages = Any
+
+    def _row_pages(self, object, trait):
+        data = getattr(object, trait)
+        if self._pages is None or self._pages.data is not data:
+            self._pages = RowPages(data, [c[1] for c in self.columns],
+                                   self.page_rows, self.max_pages)
+        return self._pages
+
+    def get_text(self, object, trait, row, column):
+        return self._row_pages(object, trait).text(row, column)
+
+#EOF
@@ -19,67 +19,260 @@ os.environ['QT_API'] = 'pyqt'
 os.environ['ETS_TOOLKIT'] = 'qt4'
 
 from traits.api import HasTraits, Array, List, Instance, Any, Str, \
-    Property, Int, Enum, on_trait_change, cached_property
+    Property, Int, Bool, Enum, on_trait_change, cached_property
 from traitsui.api import View, Item, TabularEditor, HGroup, VGroup, \
-    InstanceEditor
-from traitsui.tabular_adapter import TabularAdapter
+    InstanceEditor, ProgressEditor, TextEditor
+from pyface.api import GUI
 
 from enable.api import ComponentEditor
 
 from chaco.api import ArrayPlotData, Plot, ScatterInspectorOverlay, jet
 from chaco.tools.api import PanTool, ZoomTool, DragZoom
 
+from iaes.readers.background import default_worker, HDF5_LOCK
+from iaes.readers.core import param_dtype
+from iaes.readers.density import data_range, in_range, bin_counts, \
+    density_image
+from iaes.readers.instrument import measure
+from iaes.readers.paged_adapter import PagedAdapter
+from iaes.readers.query import select, check_condition
+from iaes.readers.rollup import Rollup
+from iaes.readers.time_index import TimeIndex
+
+
+# Rows read at once when loading a table in the background
+LOAD_CHUNK_ROWS = 65536
+
+
+def _load_rows(request, table_ptr, condition, stop,
+               chunk_rows=LOAD_CHUNK_ROWS):
+    """Read the rows [0, stop) of a table passing a condition (all of them
+    if it is empty) in a worker thread. Returns (rows, error), error being
+    the message of an invalid condition, in which case all the rows are
+    returned.
+    """
+    error = ''
+    if condition:
+        with HDF5_LOCK:
+            try:
+                check_condition(table_ptr, condition)
+            except ValueError, e:
+                # show all the rows
+                error = str(e)
+                condition = ''
+    parts = []
+    lo = 0
+    while lo < stop:
+        hi = min(lo + chunk_rows, stop)
+        with HDF5_LOCK, measure('parameters.read') as m:
+            if condition:
+                try:
+                    rows = select(table_ptr, condition, start=lo, stop=hi)
+                except (ValueError, TypeError, NameError), e:
+                    # show all the rows, reading them again from the start
+                    error = str(e)
+                    condition = ''
+                    parts = []
+                    lo = 0
+                    continue
+            else:
+                rows = table_ptr.read(lo, hi)
+            m.add_bytes(rows.nbytes)
+        parts.append(rows)
+        request.set_progress(hi, stop)
+        lo = hi
+    if not parts:
+        return np.array([], dtype=param_dtype), error
+    return np.concatenate(parts), error
+
 
-param_dtype = np.dtype([('block_id', '<u8'), \
-                           ('time_stamp', '<f8'), \
-                           ('rms', '<f8'), \
-                           ('peak', '<f8'), \
-                           ('count', '<i2')])
+def _update_rollup(request, rollup):
+    """Bring the rollups of a table up to date in a worker thread, from
+    their sidecar when it is there."""
+    with HDF5_LOCK, measure('parameters.rollup'):
+        return rollup.update()
 
 
-class ParametersAdapter(TabularAdapter):
+class ParametersAdapter(PagedAdapter):
 
     columns = [('Block_ID', 'block_id'), ('Time Stamp', 'time_stamp'), \
                ('RMS', 'rms'), ('Peak Amp', 'peak'), ('Count', 'count')]
 
-    def get_text(self, object, trait, row, column):
-        return str(getattr(object, trait)[row][column])
-
 
 class ParametersTable(HasTraits):
     name = Str('<Unknown>')
-    table = Property(Array(dtype=param_dtype), depends_on='table_ptr')
+    table = Property(Array(dtype=param_dtype), depends_on='table_ptr,_table')
     _table = Array(dtype=param_dtype)
     table_ptr = Any  # PyTables iterator to access the rown
 
+    # room for appended rows, _table being a view of its beginning
+    _buffer = Any
+
+    # condition on the columns, e.g. '(rms > 0.3) & (count < 20)': when set
+    # only the matching rows are read (see query.py) and shown, once it
+    # is entered
+    filter = Str
+    filter_error = Str
+
+    # the last load failed: it is not tried again until the filter changes
+    _failed = Bool(False)
+
+    # rows of table_ptr already read into _table
+    _nread = Int(0)
+
+    # the rows are read by a background worker (see background.py): the
+    # table stays empty until they are all read, progress being a percent
+    worker = Any
+    loading = Bool(False)
+    progress = Int(0)
+    _request = Any
+
     selection = List(Int)
 
-    view = View(
-                Item('table_ptr',
-                     show_label=True,
-                     style='readonly',
-                     editor=TabularEditor(adapter=ParametersAdapter(),
-                                          multi_select=True,
-                                          selected_row='selection',
-                                          editable=False)
-                     ),
-                title='Parameters Table',
-                height=0.50,
-                width=0.30,
-                resizable=True
-            )
+    # built for each table, each editor getting its own adapter and
+    # so its own cache of pages
+    def default_traits_view(self):
+        return View(
+                    HGroup(Item('filter', springy=True,
+                                editor=TextEditor(auto_set=False,
+                                                  enter_set=True)),
+                           Item('filter_error', show_label=False,
+                                style='readonly')),
+                    Item('progress', show_label=False,
+                         editor=ProgressEditor(min=0, max=100),
+                         visible_when='loading'),
+                    Item('table',
+                         show_label=True,
+                         style='readonly',
+                         editor=TabularEditor(adapter=ParametersAdapter(),
+                                              multi_select=True,
+                                              selected_row='selection',
+                                              editable=False)
+                         ),
+                    title='Parameters Table',
+                    height=0.50,
+                    width=0.30,
+                    resizable=True
+                )
 
     def _get_table(self):
-        if self._table is None or len(self._table) == 0:
-            if self.table_ptr is not None:
-                self._table = np.array(self.table_ptr, self.table_ptr.dtype)
-            else:
+        # _nread tells an empty result of the filter from rows not read yet
+        if self._nread == 0 and (self._table is None or
+                                 len(self._table) == 0):
+            self._buffer = None
+            if self.table_ptr is None:
                 self._table = np.array([])
+            elif self.table_ptr.nrows > 0 and not self.loading and \
+                    not self._failed:
+                self._load()
         return self._table
 
+    def _worker_default(self):
+        return default_worker(GUI.invoke_later)
+
+    def _load(self):
+        """Read the rows passing the filter in the background. The load
+        of the table viewed before, if still running, is cancelled.
+        """
+        self.loading = True
+        self.progress = 0
+        stop = self.table_ptr.nrows
+        self._request = self.worker.submit(
+            _load_rows, (self.table_ptr, self.filter.strip(), stop),
+            key='view', on_done=lambda result: self._loaded(result, stop),
+            on_error=self._load_failed, on_progress=self._load_progress,
+            on_cancel=self._load_cancelled)
+
+    def _loaded(self, result, stop):
+        rows, self.filter_error = result
+        self._request = None
+        self.loading = False
+        self._nread = stop
+        self._table = rows
+
+    def _load_failed(self, error):
+        self._request = None
+        self.loading = False
+        self._failed = True
+        self.filter_error = 'read failed: %s' % error
+
+    def _load_progress(self, fraction):
+        self.progress = int(100 * fraction)
+
+    def _load_cancelled(self):
+        # only the current request matters: a newer one may be running
+        if self._request is not None and self._request.cancelled:
+            self._request = None
+            self.loading = False
+
+    def cancel(self):
+        """Stop loading the table; it is loaded again when next shown."""
+        if self._request is not None:
+            self._request.cancel()
+
     def _set_table(self, np_arr_struct):
+        self.cancel()
+        self._buffer = None
+        self._nread = len(np_arr_struct)
         self._table = np_arr_struct
 
+    def _read(self, table_ptr, start, stop):
+        """Read the rows [start, stop) of the table passing the filter."""
+        if self.filter.strip():
+            try:
+                check_condition(table_ptr, self.filter)
+            except ValueError, e:
+                self.filter_error = str(e)
+            else:
+                self.filter_error = ''
+                return select(table_ptr, self.filter, start=start,
+                              stop=stop)
+        return table_ptr.read(start, stop)
+
+    def _filter_changed(self):
+        self.cancel()
+        self._request = None
+        self.loading = False
+        self._failed = False
+        self._buffer = None
+        self._nread = 0
+        self.selection = []
+        self._table = np.array([], dtype=param_dtype)
+
+    def refresh(self, table_ptr):
+        """Follow rows appended to the table, available through a newer
+        handle: only the new rows are read and appended in memory.
+        """
+        if self._nread == 0 and self.loading:
+            # the first load still reads the previous handle, now closed:
+            # start it again on the new one, which has the appended rows
+            self.cancel()
+            self.table_ptr = table_ptr
+            self._load()
+            return
+        n = len(self._table) if self._table is not None else 0
+        m = table_ptr.nrows
+        if self._nread > 0 and m > self._nread:
+            with HDF5_LOCK, measure('parameters.refresh') as timer:
+                new = self._read(table_ptr, self._nread, m)
+                timer.add_bytes(new.nbytes)
+            k = n + len(new)
+            if self._buffer is None or len(self._buffer) < k:
+                buffer = np.empty((max(k, 2 * n),), dtype=param_dtype)
+                buffer[:n] = self._table
+                self._buffer = buffer
+            self._buffer[n:k] = new
+            self._table = self._buffer[:k]
+            self._nread = m
+        self.table_ptr = table_ptr
+
+    def between(self, t0, t1):
+        """Return the rows with t0 <= time_stamp < t1."""
+        if self.table_ptr is not None:
+            return TimeIndex(self.table_ptr).between(t0, t1)
+        time_stamp = self.table['time_stamp']
+        return self.table[(time_stamp >= t0) & (time_stamp < t1)]
+
 
 class ParametersTablePlot(HasTraits):
 
@@ -101,12 +294,36 @@ class ParametersTablePlot(HasTraits):
     # a corresponding list of markers to use for each species
     markers = Enum(['square', 'circle', 'triangle'])
 
+    # 'auto' draws the hits in view as a density image when there are more
+    # than max_markers of them, and as individual markers otherwise
+    plot_mode = Enum(['auto', 'density', 'markers'])
+    max_markers = Int(20000)
+    density_bins = Int(200)
+
+    # True while the density image is drawn, the markers then only showing
+    # the selected hits
+    _density = Bool(False)
+    _all_markers = Bool(False)
+    _view = Any
+
     # ArrayPlotData for plot
     plot_data = Instance(ArrayPlotData, ())
 
     # Chaco Plot instance
     plot = Instance(Plot)
 
+    # trend of the hits over the whole test, drawn from the rollups of the
+    # table (see rollup.py) at the resolution of the time range in view,
+    # without reading its rows
+    trend_field = Enum(['rate', 'cumulative', 'rms_mean', 'rms_max',
+                        'peak_mean', 'peak_max'])
+    trend_data = Instance(ArrayPlotData, ())
+    trend_plot = Instance(Plot)
+    worker = Any
+    _rollup = Any
+    _trend_request = Any
+    _trend_view = Any
+
     traits_view = View(
            HGroup(
                Item('dataset', show_label=False, style='custom',
@@ -115,13 +332,20 @@ class ParametersTablePlot(HasTraits):
                        VGroup(
                            Item('x_axis'),
                            Item('y_axis'),
-                           Item('color')
+                           Item('color'),
+                           Item('plot_mode')
                            ),
                        Item('plot',
                             show_label=False,
                             editor=ComponentEditor(),
                             width=0.25, height=0.35
                             ),
+                       Item('trend_field'),
+                       Item('trend_plot',
+                            show_label=False,
+                            editor=ComponentEditor(),
+                            width=0.25, height=0.15
+                            ),
                ),
            ),
            width=0.60, height=0.60,
@@ -138,13 +362,20 @@ class ParametersTablePlot(HasTraits):
                                   VGroup(
                                          Item('x_axis'),
                                          Item('y_axis'),
-                                         Item('color')
+                                         Item('color'),
+                                         Item('plot_mode')
                                          ),
                                   Item('plot',
                                        show_label=False,
                                        editor=ComponentEditor(),
                                        width=0.25, height=0.35
                                        ),
+                                  Item('trend_field'),
+                                  Item('trend_plot',
+                                       show_label=False,
+                                       editor=ComponentEditor(),
+                                       width=0.25, height=0.15
+                                       ),
                                   ),
                            ),
                     width=0.60, height=0.60,
@@ -160,30 +391,146 @@ class ParametersTablePlot(HasTraits):
     def _data_source_change(self):
         """Handler for changes to the data source selectors
         """
-        self.plot_data.set_data('index', self.data[self.x_axis])
-        self.plot_data.set_data('value', self.data[self.y_axis])
-        self.plot_data.set_data('color', self.data[self.color])
-
-        # set axis titles appropriately
-        self.plot.x_axis.title = self.x_axis.title()
-        self.plot.y_axis.title = self.y_axis.title()
+        with measure('plot.parameters.source'):
+            self.plot.index_range.set_bounds(
+                *data_range(self.data[self.x_axis]))
+            self.plot.value_range.set_bounds(
+                *data_range(self.data[self.y_axis]))
+
+            # set axis titles appropriately
+            self.plot.x_axis.title = self.x_axis.title()
+            self.plot.y_axis.title = self.y_axis.title()
+
+            self._all_markers = False
+            self._view = None
+            self._view_change()
+
+    def _plot_mode_changed(self):
+        self._view_change()
+
+    def _view_change(self):
+        """Draw the visible range either as a density image, binned again
+        at every zoom, or as individual markers
+        """
+        with measure('plot.parameters.view'):
+            x = self.data[self.x_axis]
+            y = self.data[self.y_axis]
+            x_range = (self.plot.index_range.low, self.plot.index_range.high)
+            y_range = (self.plot.value_range.low, self.plot.value_range.high)
+            view = (x_range, y_range, self.plot_mode)
+            if view == self._view:
+                return
+            self._view = view
+
+            density = self.plot_mode == 'density'
+            if self.plot_mode == 'auto':
+                visible = in_range(x, y, x_range, y_range)
+                density = np.count_nonzero(visible) > self.max_markers
+            if density and x_range[1] > x_range[0] and y_range[1] > y_range[0]:
+                nx = ny = self.density_bins
+                counts = bin_counts(x, y, x_range, y_range, (nx, ny))
+                self.plot_data.set_data('density', density_image(counts))
+                self.density_renderer.index.set_data(
+                    np.linspace(x_range[0], x_range[1], nx + 1),
+                    np.linspace(y_range[0], y_range[1], ny + 1))
+            else:
+                density = False
+            self.density_renderer.visible = density
+            self._density = density
+            self._show_markers()
+
+    def _show_markers(self):
+        """Update the markers: all the hits, or only the selected ones on
+        top of the density image
+        """
+        selection = np.unique(np.asarray(self.dataset.selection, dtype=int))
+        if self._density:
+            self._all_markers = False
+            self.plot_data.set_data('index', self.data[self.x_axis][selection])
+            self.plot_data.set_data('value', self.data[self.y_axis][selection])
+            self.plot_data.set_data('color', self.data[self.color][selection])
+            self.renderer.index.metadata['selections'] = \
+                range(len(selection))
+            return
+        if not self._all_markers:
+            self._all_markers = True
+            self.plot_data.set_data('index', self.data[self.x_axis])
+            self.plot_data.set_data('value', self.data[self.y_axis])
+            self.plot_data.set_data('color', self.data[self.color])
+        self.renderer.index.metadata['selections'] = list(selection)
 
     @on_trait_change('dataset.selection')
     def user_selection_changed(self, new):
-        """ We extract the selection from the dataset, and filter by
-        species.
+        """ Highlight the points selected in the table.
         """
         # ensure the plot exists
         self.plot
+        self._show_markers()
 
-        # turn the selection list of indices into a mask
-        selection = np.zeros(shape=len(self.data), dtype=bool)
-        selection[new] = True
+    def _worker_default(self):
+        return default_worker(GUI.invoke_later)
 
-        # now get the indices
-        indx = list(np.arange(len(self.data))[selection])
-        # set the metadata on the renderer
-        self.renderer.index.metadata['selections'] = indx
+    @on_trait_change('dataset.table_ptr')
+    def _update_trend(self):
+        """Bring the rollups up to date in the background, only the rows
+        appended being aggregated when the table is followed.
+        """
+        table_ptr = self.dataset.table_ptr if self.dataset else None
+        if table_ptr is None:
+            return
+        rollup = self._rollup
+        if rollup is None or \
+                rollup.table_ptr._v_pathname != table_ptr._v_pathname:
+            rollup = Rollup(table_ptr)
+        else:
+            rollup.table_ptr = table_ptr
+        self._trend_request = self.worker.submit(
+            _update_rollup, (rollup,), key='trend',
+            on_done=self._rollup_updated)
+
+    def _rollup_updated(self, rollup):
+        self._trend_request = None
+        self._rollup = rollup
+        self._trend_view = None
+        self._trend_view_change()
+
+    def _trend_field_changed(self):
+        self._trend_view_change()
+
+    def _trend_view_change(self):
+        """Draw the trend of the time range in view, at the finest
+        resolution of the rollups giving a few thousand buckets at most.
+        """
+        if self._rollup is None or self._rollup.levels is None:
+            return
+        index_range = self.trend_plot.index_range
+        t0 = t1 = None
+        if index_range.low_setting != 'auto':
+            t0, t1 = index_range.low, index_range.high
+        view = (t0, t1, self.trend_field, self._rollup.nrows)
+        if view == self._trend_view:
+            return
+        self._trend_view = view
+        with measure('plot.parameters.trend'):
+            trend = self._rollup.trend(t0, t1)
+            self.trend_data.set_data('time', trend['time'])
+            self.trend_data.set_data('trend', trend[self.trend_field])
+            self.trend_plot.y_axis.title = \
+                self.trend_field.replace('_', ' ').title()
+
+    def _trend_plot_default(self):
+        self.trend_data.set_data('time', [])
+        self.trend_data.set_data('trend', [])
+        plot = Plot(self.trend_data)
+        plot.plot(('time', 'trend'), type='line')
+        plot.title = 'Trend'
+        plot.x_axis.title = 'Time'
+        plot.tools.append(PanTool(plot))
+        plot.tools.append(ZoomTool(plot, axis='index'))
+        # the buckets are read again when zooming or panning
+        plot.index_range.on_trait_change(self._trend_view_change,
+                                         'updated')
+        return plot
 
     def _plot_data_default(self):
         """ This creates a, ArrayPlotData instances.
@@ -193,6 +540,7 @@ class ParametersTablePlot(HasTraits):
         plot_data.set_data('index', [])
         plot_data.set_data('value', [])
         plot_data.set_data('color', [])
+        plot_data.set_data('density', np.zeros((1, 1)))
 
         return plot_data
 
@@ -202,6 +550,10 @@ class ParametersTablePlot(HasTraits):
         # create the main plot object
         plot = Plot(self.plot_data)
 
+        # density image, below the markers
+        self.density_renderer = plot.img_plot('density', colormap=jet)[0]
+        self.density_renderer.visible = False
+
         renderer = plot.plot(('index', 'value', 'color'), \
                              type="cmap_scatter", \
                              color_mapper=jet, \
@@ -233,6 +585,10 @@ class ParametersTablePlot(HasTraits):
         plot.tools.append(ZoomTool(plot))
         plot.tools.append(DragZoom(plot, drag_button="right"))
 
+        # bin the data again when zooming or panning
+        plot.index_range.on_trait_change(self._view_change, 'updated')
+        plot.value_range.on_trait_change(self._view_change, 'updated')
+
         return plot
 
 
@@ -0,0 +1,163 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Selection of the rows of 'parameters' (or any) tables matching a
+condition on their columns, e.g. '(rms > 0.3) & (count < 20)', without
+loading the tables. The condition uses the numexpr syntax of PyTables
+and is evaluated in-kernel, chunk by chunk. Conditions numexpr cannot
+evaluate (e.g. on the unsigned 64 bit block_id column) are evaluated by
+NumPy on chunks of rows instead.
+"""
+import numpy as np
+
+from iaes.readers.core import iter_boards, iter_channels, PARAMETERS
+
+
+# Rows evaluated at once when numexpr cannot be used
+CHUNK_ROWS = 65536
+
+# Functions conditions may use, known to numexpr under the same names
+FUNCTIONS = {'abs': np.abs, 'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log,
+             'log10': np.log10, 'where': np.where}
+
+
+def condition_names(condition):
+    """Return the names used in a condition, raising ValueError if it is
+    not a valid expression.
+    """
+    try:
+        return compile(condition, '<condition>', 'eval').co_names
+    except SyntaxError, e:
+        raise ValueError('invalid condition %r: %s' % (condition, e.msg))
+
+
+def _check(table_ptr, condition, condvars):
+    for name in condition_names(condition):
+        if name not in table_ptr.colnames and name not in condvars and \
+                name not in FUNCTIONS:
+            raise ValueError('unknown name %r in condition %r (columns: %s)'
+                             % (name, condition,
+                                ', '.join(table_ptr.colnames)))
+
+
+def _in_kernel(table_ptr, condition):
+    """Whether numexpr can evaluate the condition on the table."""
+    for name in condition_names(condition):
+        if name in table_ptr.colnames and \
+                table_ptr.coldtypes[name] == np.uint64:
+            return False
+    return True
+
+
+def _numpy_chunks(table_ptr, condition, condvars, start, stop):
+    """Iterate over (first row, mask) of chunks of [start, stop)."""
+    code = compile(condition, '<condition>', 'eval')
+    names = [name for name in code.co_names if name in table_ptr.colnames]
+    for lo in range(start, stop, CHUNK_ROWS):
+        hi = min(lo + CHUNK_ROWS, stop)
+        namespace = dict(FUNCTIONS)
+        namespace.update(condvars)
+        for name in names:
+            namespace[name] = table_ptr.read(lo, hi, field=name)
+        mask = np.asarray(eval(code, {'__builtins__': {}}, namespace),
+                          dtype=bool)
+        if mask.ndim == 0:
+            mask = np.repeat(mask, hi - lo)
+        yield lo, mask
+
+
+def coordinates(table_ptr, condition, condvars=None, start=None, stop=None):
+    """Return the (ascending) numbers of the rows matching a condition.
+    """
+    condvars = condvars or {}
+    _check(table_ptr, condition, condvars)
+    start, stop, _ = slice(start, stop).indices(table_ptr.nrows)
+    if _in_kernel(table_ptr, condition):
+        return table_ptr.getWhereList(condition, condvars, start=start,
+                                      stop=stop, sort=True)
+    found = [lo + np.flatnonzero(mask) for lo, mask in
+             _numpy_chunks(table_ptr, condition, condvars, start, stop)]
+    if not found:
+        return np.empty((0,), dtype=np.int64)
+    return np.concatenate(found).astype(np.int64)
+
+
+def select(table_ptr, condition, condvars=None, start=None, stop=None,
+           field=None):
+    """Return the rows (or the `field` column of the rows) matching a
+    condition, in table order.
+    """
+    condvars = condvars or {}
+    _check(table_ptr, condition, condvars)
+    start, stop, _ = slice(start, stop).indices(table_ptr.nrows)
+    if _in_kernel(table_ptr, condition):
+        return table_ptr.readWhere(condition, condvars, field=field,
+                                   start=start, stop=stop)
+    rows = []
+    for lo, mask in _numpy_chunks(table_ptr, condition, condvars, start,
+                                  stop):
+        chunk = table_ptr.read(lo, lo + len(mask), field=field)
+        rows.append(chunk[mask])
+    if not rows:
+        dtype = table_ptr.dtype if field is None else \
+            table_ptr.coldtypes[field]
+        return np.empty((0,), dtype=dtype)
+    return np.concatenate(rows)
+
+
+def check_condition(table_ptr, condition, condvars=None):
+    """Raise ValueError if a condition cannot be evaluated on a table,
+    trying it on the first row: besides the names checked by select,
+    numexpr raises assorted errors on expressions it cannot compile,
+    e.g. 'rms > "a"' or 'rms and count'.
+    """
+    try:
+        select(table_ptr, condition, condvars, start=0, stop=1)
+    except ValueError:
+        raise
+    except Exception, e:
+        raise ValueError('invalid condition %r: %s' % (condition, e))
+
+
+def count(table_ptr, condition, condvars=None):
+    """Return the number of rows matching a condition."""
+    return len(coordinates(table_ptr, condition, condvars))
+
+
+def select_file(h5file, condition, condvars=None, boards=None,
+                channels=None, name=PARAMETERS, field=None):
+    """Return {(board, channel): rows} of the `name` tables of an open
+    IAES file matching a condition, optionally restricted to some boards
+    or to some (board, channel) pairs. Channels without matches are left
+    out.
+
+    >>> select_file(h5file, '(rms > 0.3) & (count < 20)',
+    ...             boards=['Board2'])
+    """
+    found = {}
+    for board in iter_boards(h5file):
+        if boards is not None and board._v_name not in boards:
+            continue
+        for channel in iter_channels(board):
+            pair = (board._v_name, channel._v_name)
+            if channels is not None and pair not in channels:
+                continue
+            if name not in channel._v_children:
+                continue
+            rows = select(h5file.getNode(channel, name), condition,
+                          condvars, field=field)
+            if len(rows):
+                found[pair] = rows
+    return found
+
+#EOF
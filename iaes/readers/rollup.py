@@ -0,0 +1,315 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Rollups of the 'parameters' tables: the hits of a channel aggregated in
+fixed time buckets at several resolutions (number of hits, sum and
+maximum of rms and peak, histogram of the counts). They are small, kept
+in a sidecar next to the file and extended with the rows appended since
+they were built, so that hit-rate, cumulative-count and rms trends over
+a whole test are drawn without reading the tables.
+"""
+import numpy as np
+
+from iaes.readers.core import open_file, iter_boards, iter_channels, \
+    iter_tables, table_kind, PARAMETERS
+from iaes.readers.sidecar import sidecar_path, save_npz, load_npz
+
+
+# Widths, in seconds, of the buckets of each rollup level
+RESOLUTIONS = (1.0, 10.0, 60.0, 600.0, 3600.0)
+
+# Lower edges of the bins of the count histograms, the last one open
+COUNT_EDGES = (0,) + tuple(2 ** k for k in range(15))
+
+# Rows of the parameters table aggregated at once
+CHUNK_ROWS = 65536
+
+# Buckets a trend is drawn with at most, when no resolution is given
+MAX_BUCKETS = 2000
+
+
+def rollup_dtype(nbins=len(COUNT_EDGES)):
+    return np.dtype([('bucket', '<i8'),
+                     ('hits', '<i8'),
+                     ('rms_sum', '<f8'),
+                     ('rms_max', '<f8'),
+                     ('peak_sum', '<f8'),
+                     ('peak_max', '<f8'),
+                     ('count_hist', '<i8', (nbins,))])
+
+
+def trend_dtype(nbins=len(COUNT_EDGES)):
+    return np.dtype([('time', '<f8'),
+                     ('hits', '<i8'),
+                     ('rate', '<f8'),
+                     ('cumulative', '<i8'),
+                     ('rms_mean', '<f8'),
+                     ('rms_max', '<f8'),
+                     ('peak_mean', '<f8'),
+                     ('peak_max', '<f8'),
+                     ('count_hist', '<i8', (nbins,))])
+
+
+def _groups(bucket):
+    """Return (order, starts, keys): the permutation sorting `bucket`,
+    where each run of equal buckets starts in it and their values.
+    """
+    order = np.argsort(bucket, kind='mergesort')
+    bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    return order, starts, bucket[starts]
+
+
+def aggregate(rows, width, count_edges=COUNT_EDGES):
+    """Return the rollup records of parameters rows in buckets of `width`
+    seconds, bucket k holding the hits with k * width <= time_stamp <
+    (k + 1) * width.
+    """
+    nbins = len(count_edges)
+    out = np.zeros((0,), dtype=rollup_dtype(nbins))
+    if len(rows) == 0:
+        return out
+    bucket = np.floor(rows['time_stamp'] / width).astype(np.int64)
+    order, starts, keys = _groups(bucket)
+    rows = rows[order]
+    out = np.zeros((len(keys),), dtype=out.dtype)
+    out['bucket'] = keys
+    out['hits'] = np.diff(np.r_[starts, len(rows)])
+    for name in ('rms', 'peak'):
+        out[name + '_sum'] = np.add.reduceat(rows[name], starts)
+        out[name + '_max'] = np.maximum.reduceat(rows[name], starts)
+    bins = np.searchsorted(count_edges, rows['count'], side='right') - 1
+    group = np.repeat(np.arange(len(keys)), out['hits'])
+    out['count_hist'] = np.bincount(group * nbins + np.maximum(bins, 0),
+                                    minlength=len(keys) * nbins) \
+        .reshape(len(keys), nbins)
+    return out
+
+
+def combine(records):
+    """Merge rollup records (e.g. of consecutive chunks of rows or of
+    several files) into one record per bucket.
+    """
+    if len(records) == 0:
+        return records
+    order, starts, keys = _groups(records['bucket'])
+    records = records[order]
+    out = np.zeros((len(keys),), dtype=records.dtype)
+    out['bucket'] = keys
+    for name in ('hits', 'rms_sum', 'peak_sum', 'count_hist'):
+        out[name] = np.add.reduceat(records[name], starts)
+    for name in ('rms_max', 'peak_max'):
+        out[name] = np.maximum.reduceat(records[name], starts)
+    return out
+
+
+def trend(records, width, t0=None, t1=None, before=0):
+    """Return the trend_dtype array of the buckets of `width` seconds
+    covering [t0, t1), empty buckets included, from rollup records.
+    `before` is the number of hits preceding the records, the start of
+    the cumulative count.
+    """
+    nbins = records.dtype['count_hist'].shape[0]
+    if t0 is None or t1 is None:
+        if len(records) == 0:
+            return np.zeros((0,), dtype=trend_dtype(nbins))
+        k0 = records['bucket'][0] if t0 is None else \
+            int(np.floor(t0 / width))
+        k1 = records['bucket'][-1] + 1 if t1 is None else \
+            int(np.ceil(t1 / width))
+    else:
+        k0, k1 = int(np.floor(t0 / width)), int(np.ceil(t1 / width))
+    k1 = max(k1, k0)
+    before += records['hits'][records['bucket'] < k0].sum()
+    records = records[(records['bucket'] >= k0) & (records['bucket'] < k1)]
+
+    out = np.zeros((k1 - k0,), dtype=trend_dtype(nbins))
+    out['time'] = (k0 + np.arange(k1 - k0)) * width
+    out['rms_max'] = out['peak_max'] = np.nan
+    out['rms_mean'] = out['peak_mean'] = np.nan
+    index = records['bucket'] - k0
+    hits = records['hits']
+    out['hits'][index] = hits
+    out['rms_mean'][index] = records['rms_sum'] / hits
+    out['peak_mean'][index] = records['peak_sum'] / hits
+    out['rms_max'][index] = records['rms_max']
+    out['peak_max'][index] = records['peak_max']
+    out['count_hist'][index] = records['count_hist']
+    out['rate'] = out['hits'] / float(width)
+    out['cumulative'] = before + np.cumsum(out['hits'])
+    return out
+
+
+def pick_resolution(resolutions, t0, t1, max_buckets=MAX_BUCKETS):
+    """Return the finest resolution showing [t0, t1) with at most
+    `max_buckets` buckets (the coarsest one if none does).
+    """
+    for width in sorted(resolutions):
+        if (t1 - t0) / width <= max_buckets:
+            return width
+    return max(resolutions)
+
+
+class Rollup(object):
+    """Rollups of a 'parameters' table, one level per resolution.
+
+    >>> rollup = Rollup(table_ptr).update()
+    >>> rates = rollup.trend(resolution=60.0)['rate']
+
+    The sidecar is validated against the time stamp of the last row it
+    aggregated: if the table only grew since, only the new rows are read.
+    """
+
+    def __init__(self, table_ptr, resolutions=RESOLUTIONS,
+                 count_edges=COUNT_EDGES, chunk_rows=CHUNK_ROWS, cache=True):
+        self.table_ptr = table_ptr
+        self.resolutions = tuple(float(r) for r in resolutions)
+        self.count_edges = tuple(count_edges)
+        self.chunk_rows = chunk_rows
+        self.cache = cache
+        self.levels = None
+        self.nrows = 0
+        self._last = None
+
+    def _path(self):
+        return sidecar_path(self.table_ptr, 'rollup.npz')
+
+    def _prefix_valid(self, nrows, last):
+        """Whether the table still starts with the rows aggregated."""
+        if nrows > self.table_ptr.nrows:
+            return False
+        return nrows == 0 or \
+            self.table_ptr.read(nrows - 1, nrows, field='time_stamp')[0] \
+            == last
+
+    def _load(self):
+        info = load_npz(self._path(), None)
+        if info is None or \
+                tuple(info['resolutions'].tolist()) != self.resolutions or \
+                tuple(info['count_edges'].tolist()) != self.count_edges:
+            return False
+        nrows = int(info['nrows'])
+        last = float(info['last'])
+        if not self._prefix_valid(nrows, last):
+            return False
+        self.levels = [info['level%d' % k]
+                       for k in range(len(self.resolutions))]
+        self.nrows = nrows
+        self._last = last
+        return True
+
+    def _save(self):
+        arrays = dict(('level%d' % k, level)
+                      for k, level in enumerate(self.levels))
+        return save_npz(self._path(),
+                        resolutions=np.array(self.resolutions),
+                        count_edges=np.array(self.count_edges),
+                        nrows=np.array(self.nrows),
+                        last=np.array(self._last, dtype=np.float64),
+                        **arrays)
+
+    @staticmethod
+    def empty_levels(resolutions=RESOLUTIONS, count_edges=COUNT_EDGES):
+        return [np.zeros((0,), dtype=rollup_dtype(len(count_edges)))
+                for _ in resolutions]
+
+    def update(self):
+        """Bring the rollups up to date with the table, aggregating only
+        the rows it gained since they were computed. Returns self.
+        """
+        if self.levels is None or \
+                not self._prefix_valid(self.nrows, self._last):
+            if not (self.cache and self._load()):
+                self.levels = self.empty_levels(self.resolutions,
+                                                self.count_edges)
+                self.nrows = 0
+        stop = self.table_ptr.nrows
+        if stop == self.nrows:
+            return self
+        # the chunks are merged into the levels once, at the end
+        parts = [[level] for level in self.levels]
+        for lo in range(self.nrows, stop, self.chunk_rows):
+            hi = min(lo + self.chunk_rows, stop)
+            rows = self.table_ptr.read(lo, hi)
+            for part, width in zip(parts, self.resolutions):
+                part.append(aggregate(rows, width, self.count_edges))
+        self.levels = [combine(np.concatenate(part)) for part in parts]
+        self.nrows = stop
+        self._last = float(rows['time_stamp'][-1])
+        if self.cache:
+            self._save()
+        return self
+
+    def refresh(self, table_ptr):
+        """Switch to a newer handle on the same table and aggregate the
+        rows appended to it."""
+        self.table_ptr = table_ptr
+        return self.update()
+
+    def level(self, resolution):
+        """Return the rollup records of one of the resolutions."""
+        if self.levels is None:
+            self.update()
+        return self.levels[self.resolutions.index(float(resolution))]
+
+    @property
+    def hits(self):
+        if self.levels is None:
+            self.update()
+        return int(self.levels[0]['hits'].sum())
+
+    def trend(self, t0=None, t1=None, resolution=None,
+              max_buckets=MAX_BUCKETS):
+        """Return the trend_dtype array of [t0, t1) (by default the whole
+        table) at a resolution, by default the finest one with at most
+        `max_buckets` buckets.
+        """
+        if self.levels is None:
+            self.update()
+        return levels_trend(self.levels, self.resolutions, t0, t1,
+                            resolution, max_buckets)
+
+
+def levels_trend(levels, resolutions, t0=None, t1=None, resolution=None,
+                 max_buckets=MAX_BUCKETS):
+    """Return the trend of rollup levels (see Rollup.trend)."""
+    if resolution is None:
+        width = min(resolutions)
+        records = levels[resolutions.index(width)]
+        if len(records) == 0:
+            return trend(records, width)
+        first = records['bucket'][0] * width if t0 is None else t0
+        last = (records['bucket'][-1] + 1) * width if t1 is None else t1
+        resolution = pick_resolution(resolutions, first, last, max_buckets)
+    return trend(levels[resolutions.index(float(resolution))], resolution,
+                 t0, t1)
+
+
+def rollup_file(filename, resolutions=RESOLUTIONS, count_edges=COUNT_EDGES):
+    """Bring the rollups of every parameters table of an IAES file up to
+    date. Returns {table path: number of hits}.
+    """
+    h5file = open_file(filename, 'r')
+    try:
+        hits = {}
+        for board in iter_boards(h5file):
+            for channel in iter_channels(board):
+                for table in iter_tables(channel):
+                    if table_kind(table) == PARAMETERS:
+                        rollup = Rollup(table, resolutions, count_edges)
+                        hits[table._v_pathname] = rollup.update().hits
+        return hits
+    finally:
+        h5file.close()
+
+#EOF
@@ -0,0 +1,94 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Text of the rows of a table as shown by a table view. Rows are read and
+formatted a page at a time, only for the pages being looked at, and a
+bounded number of formatted pages is kept, so the cost of scrolling does
+not depend on the length of the table.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Rows formatted at a time
+PAGE_ROWS = 256
+
+# Formatted pages kept in memory
+MAX_PAGES = 8
+
+
+def summarize(values):
+    """Return a short text standing for an array column of rows: the
+    number of samples and their range, one string per row.
+    """
+    values = values.reshape(len(values), -1)
+    if values.shape[1] == 0:
+        return ['0 samples'] * len(values)
+    lo = values.min(axis=1)
+    hi = values.max(axis=1)
+    return ['%d samples [%.4g, %.4g]' % (values.shape[1], a, b)
+            for a, b in zip(lo, hi)]
+
+
+def format_column(values):
+    """Return the text of every row of a column."""
+    if values.ndim > 1:
+        return summarize(values)
+    return [str(value) for value in values]
+
+
+class RowPages(object):
+    """Formatted text of the rows of a structured array or ChunkedTable.
+
+    >>> pages = RowPages(table, ['block_id', 'time_stamp', 'raw_data'])
+    >>> pages.text(1000000, 2)
+    '4096 samples [-0.3121, 0.2874]'
+    """
+
+    def __init__(self, data, columns, page_rows=PAGE_ROWS,
+                 max_pages=MAX_PAGES):
+        self.data = data
+        self.columns = list(columns)
+        self.page_rows = page_rows
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self._pages.clear()
+
+    def _page(self, index):
+        page = self._pages.pop(index, None)
+        start = index * self.page_rows
+        stop = min(start + self.page_rows, len(self.data))
+        if page is None or len(page[0]) < stop - start:
+            # missing, or rows were appended to a partial last page
+            rows = self.data[start:stop]
+            page = [format_column(np.asarray(rows[name]))
+                    for name in self.columns]
+            while len(self._pages) >= self.max_pages:
+                self._pages.popitem(last=False)
+        self._pages[index] = page
+        return page
+
+    def text(self, row, column):
+        """Return the text of a cell, `column` being an index in
+        `columns`.
+        """
+        page = self._page(row // self.page_rows)
+        return page[column][row % self.page_rows]
+
+#EOF
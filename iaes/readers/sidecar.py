@@ -0,0 +1,149 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Location and validation of the data derived from an IAES file (indexes,
+caches) that is stored on disk next to it.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+
+def sidecar_dir(filename):
+    """Return the directory holding data derived from an IAES file.
+
+    It is '<filename>.iaes' next to the file or, when the IAES_CACHE_DIR
+    environment variable is set, a directory below it.
+    """
+    filename = os.path.abspath(filename)
+    cache_root = os.environ.get('IAES_CACHE_DIR')
+    if not cache_root:
+        return filename + '.iaes'
+    digest = hashlib.md5(filename.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_root,
+                        '%s-%s.iaes' % (os.path.basename(filename), digest))
+
+
+def sidecar_path(node, suffix):
+    """Return the sidecar file of a node, e.g. 'Board0.Ch1.rowdata.tidx.npz'.
+    """
+    stem = node._v_pathname.strip('/').replace('/', '.')
+    return os.path.join(sidecar_dir(node._v_file.filename),
+                        '%s.%s' % (stem, suffix))
+
+
+def source_stamp(table_ptr):
+    """Return what a sidecar of a table must match to still be valid: the
+    modification time of the file and the number of rows of the table.
+    """
+    return np.array([os.path.getmtime(table_ptr._v_file.filename),
+                     table_ptr.nrows], dtype='<f8')
+
+
+def save_npz(path, **arrays):
+    """Atomically write a sidecar .npz file. Failures (e.g. a read-only
+    archive) are ignored, the sidecar then only lives in memory.
+    """
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp, 'wb') as fid:
+            np.savez(fid, **arrays)
+        os.rename(tmp, path)
+        return True
+    except (IOError, OSError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def save_npy(path, array):
+    """Atomically write a sidecar .npy file, returning False on failure.
+    """
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp, 'wb') as fid:
+            np.save(fid, array)
+        os.rename(tmp, path)
+        return True
+    except (IOError, OSError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def stream_npy(path, dtype, shape, blocks):
+    """Atomically write a sidecar .npy file from an iterable of
+    (start, array) pairs filling it along the first axis, without holding
+    the whole array in memory. Returns False on failure.
+    """
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype,
+                                        shape=shape)
+        for start, block in blocks:
+            out[start:start + len(block)] = block
+        out.flush()
+        del out
+        os.rename(tmp, path)
+        return True
+    except (IOError, OSError, ValueError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+    except BaseException:
+        # e.g. the producer of the blocks was cancelled
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_npy(path, mmap_mode='r'):
+    """Memory-map a sidecar .npy file, or return None if it is missing.
+    """
+    try:
+        return np.load(path, mmap_mode=mmap_mode)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def load_npz(path, stamp, names=None):
+    """Load a sidecar .npz file written with a 'stamp' array, or return
+    None if it is missing or stale. With stamp None the caller validates
+    the content itself. With `names` only those arrays (and the stamp)
+    are read.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        data = np.load(path)
+        if names is not None:
+            names = set(names) | set(['stamp'])
+        arrays = dict((name, data[name]) for name in data.files
+                      if names is None or name in names)
+        data.close()
+    except (IOError, OSError, ValueError):
+        return None
+    if stamp is None:
+        return arrays
+    if 'stamp' not in arrays or not np.array_equal(arrays['stamp'], stamp):
+        return None
+    return arrays
+
+#EOF
@@ -0,0 +1,228 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+from collections import OrderedDict
+from numbers import Integral
+
+import numpy as np
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.column_cache import ColumnCache
+from iaes.readers.instrument import measure
+from iaes.readers.time_index import TimeIndex
+from iaes.readers.waveform import scaling, decode_rows
+
+
+# Target size, in bytes, of a single cached chunk. It is rounded to a
+# multiple of the HDF5 chunk rows so that every read is chunk aligned.
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# Default number of chunks kept in memory by each table.
+MAX_CHUNKS = 8
+
+
+def _chunk_rows(table_ptr, chunk_bytes):
+    """Return the number of rows per cached chunk for a PyTables Table.
+    """
+    h5_rows = 1
+    if getattr(table_ptr, 'chunkshape', None):
+        h5_rows = max(1, int(table_ptr.chunkshape[0]))
+    rows = max(1, chunk_bytes // max(1, table_ptr.dtype.itemsize))
+    # round up to a whole number of HDF5 chunks
+    return ((rows + h5_rows - 1) // h5_rows) * h5_rows
+
+
+class ChunkedTable(object):
+    """Lazy, read-only, sequence-like view over a PyTables Table.
+
+    Rows are read on demand in chunk-aligned slices and the most recently
+    used chunks are kept in a bounded LRU cache, so memory depends on the
+    rows actually accessed and not on the size of the table.
+
+    With `mmap_cache` the columns are served from their memory-mapped
+    sidecar copies (see column_cache), built on first use, instead of
+    being decoded by HDF5.
+
+    Compact waveforms (see waveform) are cached as stored and only the
+    rows returned are decoded, to `float_type` volts.
+    """
+
+    def __init__(self, table_ptr, chunk_rows=None, max_chunks=MAX_CHUNKS,
+                 chunk_bytes=CHUNK_BYTES, mmap_cache=False,
+                 float_type=np.float64):
+        self.table_ptr = table_ptr
+        self.path = table_ptr._v_pathname
+        self.float_type = float_type
+        self.scaling = scaling(table_ptr)
+        self.dtype = decode_rows(np.empty((0,), dtype=table_ptr.dtype),
+                                 self.scaling, float_type).dtype
+        if chunk_rows is None:
+            chunk_rows = _chunk_rows(table_ptr, chunk_bytes)
+        self.chunk_rows = int(chunk_rows)
+        self.max_chunks = max(1, int(max_chunks))
+        self._chunks = OrderedDict()
+        self._time_index = None
+        self.columns = None
+        if mmap_cache:
+            self.columns = ColumnCache(table_ptr).load()
+
+    def __len__(self):
+        return int(self.table_ptr.nrows)
+
+    @property
+    def shape(self):
+        return (len(self),)
+
+    @property
+    def nbytes_cached(self):
+        return sum(chunk.nbytes for chunk in self._chunks.values())
+
+    def clear_cache(self):
+        self._chunks.clear()
+
+    def refresh(self, table_ptr):
+        """Switch to a newer handle on the same table, e.g. after rows were
+        appended to it, keeping the cached chunks that were complete.
+        """
+        self.table_ptr = table_ptr
+        self.path = table_ptr._v_pathname
+        self.scaling = scaling(table_ptr)
+        self._time_index = None
+        if self.columns is not None:
+            # rebuilding on every append would cost more than it saves
+            self.columns = ColumnCache(table_ptr).load(build=False)
+        for index, chunk in list(self._chunks.items()):
+            if len(chunk) < self.chunk_rows:
+                del self._chunks[index]
+
+    def _chunk(self, index):
+        """Return the cached chunk number `index`, reading it if needed.
+        """
+        chunk = self._chunks.pop(index, None)
+        if chunk is None:
+            start = index * self.chunk_rows
+            stop = min(start + self.chunk_rows, len(self))
+            stored = self.table_ptr.dtype
+            if self.columns is not None and \
+                    set(stored.names) <= set(self.columns):
+                chunk = np.empty((stop - start,), dtype=stored)
+                for name in stored.names:
+                    chunk[name] = self.columns[name][start:stop]
+            else:
+                with HDF5_LOCK, measure('table.chunk') as m:
+                    chunk = self.table_ptr.read(start, stop)
+                    m.add_bytes(chunk.nbytes)
+            while len(self._chunks) >= self.max_chunks:
+                self._chunks.popitem(last=False)
+        self._chunks[index] = chunk
+        return chunk
+
+    def _decode(self, rows):
+        return decode_rows(rows, self.scaling, self.float_type)
+
+    def _row(self, row):
+        n = len(self)
+        if row < 0:
+            row += n
+        if row < 0 or row >= n:
+            raise IndexError('row index out of range')
+        chunk = self._chunk(row // self.chunk_rows)
+        i = row % self.chunk_rows
+        return self._decode(chunk[i:i + 1])[0]
+
+    def read(self, start=None, stop=None):
+        """Return rows [start, stop) as a new structured array.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            return np.empty((0,), dtype=self.dtype)
+        out = np.empty((stop - start,), dtype=self.table_ptr.dtype)
+        first = start // self.chunk_rows
+        last = (stop - 1) // self.chunk_rows
+        for index in range(first, last + 1):
+            chunk_start = index * self.chunk_rows
+            lo = max(start, chunk_start)
+            hi = min(stop, chunk_start + self.chunk_rows)
+            out[lo - start:hi - start] = \
+                self._chunk(index)[lo - chunk_start:hi - chunk_start]
+        return self._decode(out)
+
+    def take(self, rows):
+        """Return the rows at the given (possibly unsorted) positions.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        n = len(self)
+        rows = np.where(rows < 0, rows + n, rows)
+        if len(rows) and (rows.min() < 0 or rows.max() >= n):
+            raise IndexError('row index out of range')
+        out = np.empty(rows.shape, dtype=self.table_ptr.dtype)
+        chunk_ids = rows // self.chunk_rows
+        for index in np.unique(chunk_ids):
+            mask = chunk_ids == index
+            out[mask] = self._chunk(int(index))[rows[mask] % self.chunk_rows]
+        return self._decode(out)
+
+    @property
+    def time_index(self):
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.table_ptr)
+        return self._time_index
+
+    def between(self, t0, t1):
+        """Return the rows with t0 <= time_stamp < t1.
+        """
+        return self._decode(self.time_index.between(t0, t1))
+
+    def __getitem__(self, key):
+        if isinstance(key, Integral):
+            return self._row(int(key))
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self.read(start, stop)
+            return self.take(np.arange(start, stop, step))
+        if isinstance(key, str):
+            # a whole column: the memory-mapped copy if there is one,
+            # otherwise read straight from the table, not cached
+            mapped = self.columns is not None and key in self.columns
+            if self.dtype[key].shape:
+                # the waveforms would be read (or decoded) all at once:
+                # only their memory-mapped copy in volts is served so
+                if not mapped or self.scaling is not None or \
+                        self.columns[key].dtype != self.dtype[key].base:
+                    raise ValueError('the %s column of %s is read by rows, '
+                                     'e.g. table[start:stop][%r]'
+                                     % (key, self.path, key))
+                return self.columns[key]
+            if mapped:
+                return self.columns[key]
+            with HDF5_LOCK:
+                return self.table_ptr.col(key)
+        key = np.asarray(key)
+        if key.dtype == bool:
+            key = np.flatnonzero(key)
+        return self.take(key)
+
+    def __iter__(self):
+        for index in range((len(self) + self.chunk_rows - 1) //
+                           self.chunk_rows):
+            for row in self._decode(self._chunk(index)):
+                yield row
+
+    def __array__(self, dtype=None):
+        arr = self.read()
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return arr
+
+#EOF
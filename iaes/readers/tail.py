@@ -0,0 +1,136 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Following IAES files that are still being written by the acquisition
+system. An open HDF5 handle never sees rows appended by another process,
+and HDF5 shares the state of a file opened twice by the same process, so
+the only way to see them is to close the handle and open the file again.
+The classes below do that only when the file changed on disk and report
+the appended row ranges, so refresh cost tracks the append rate.
+"""
+import os
+import time
+
+from tables.exceptions import HDF5ExtError
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.core import open_file
+
+
+class FileFollower(object):
+    """Reopens an IAES file read-only when its size or mtime change.
+
+    With a HandlePool the file is acquired from and reopened through the
+    pool, so the other users of the shared handle follow it as well.
+    After a reopen every node of the previous handle is invalid: callers
+    must look up the nodes they use again in `h5file`.
+    """
+
+    def __init__(self, filename, h5file=None, pool=None):
+        self.filename = filename
+        self.pool = pool
+        if h5file is None:
+            if pool is not None:
+                h5file = pool.acquire(filename)
+            else:
+                h5file = open_file(filename, 'r')
+        self.h5file = h5file
+        self._stat = self._file_stat()
+
+    def _file_stat(self):
+        st = os.stat(self.filename)
+        return (st.st_mtime, st.st_size)
+
+    def changed(self):
+        try:
+            return self._file_stat() != self._stat
+        except OSError:
+            return False
+
+    def reopen(self):
+        """Close and reopen the file, returning the new handle or None if
+        the file could not be opened in its current state (it is then
+        retried at the next call). Background readers of the previous
+        handle are waited for, but must be cancelled by their owners.
+        """
+        with HDF5_LOCK:
+            if self.pool is None and self.h5file is not None and \
+                    self.h5file.isopen:
+                self.h5file.close()
+            self.h5file = None
+            try:
+                stat = self._file_stat()
+                if self.pool is not None:
+                    self.h5file = self.pool.reopen(self.filename)
+                else:
+                    self.h5file = open_file(self.filename, 'r')
+            except (HDF5ExtError, IOError, OSError):
+                return None
+        self._stat = stat
+        return self.h5file
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self.filename)
+        elif self.h5file is not None and self.h5file.isopen:
+            with HDF5_LOCK:
+                self.h5file.close()
+
+
+class TableTail(object):
+    """Follows one table of a file still being written.
+
+    >>> tail = TableTail('run.h5', '/Board0/Ch0/parameters')
+    >>> for rows in tail.follow(interval=1.0):
+    ...     print len(rows)
+    """
+
+    def __init__(self, filename, path, start=None):
+        self.path = path
+        self.follower = FileFollower(filename)
+        self.table_ptr = self.follower.h5file.getNode(path)
+        self.nrows = self.table_ptr.nrows if start is None else start
+
+    def poll(self):
+        """Return the (start, stop) range of the rows appended since the
+        last poll, or None if there are none yet.
+        """
+        if self.table_ptr is not None and not self.follower.changed():
+            return None
+        h5file = self.follower.reopen()
+        if h5file is None:
+            self.table_ptr = None
+            return None
+        self.table_ptr = h5file.getNode(self.path)
+        nrows = self.table_ptr.nrows
+        if nrows <= self.nrows:
+            return None
+        start, self.nrows = self.nrows, nrows
+        return start, nrows
+
+    def read(self, start, stop):
+        return self.table_ptr.read(start, stop)
+
+    def follow(self, interval=1.0):
+        """Iterate forever over the newly appended rows."""
+        while True:
+            new = self.poll()
+            if new is None:
+                time.sleep(interval)
+            else:
+                yield self.read(*new)
+
+    def close(self):
+        self.follower.close()
+
+#EOF
@@ -0,0 +1,188 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from iaes.readers.background import HDF5_LOCK
+from iaes.readers.sidecar import sidecar_path, source_stamp, save_npz, load_npz
+
+
+# Sorted time stamps already loaded, keyed by (file name, table path),
+# the least recently used ones being dropped past MAX_SORTED tables
+_sorted_cache = OrderedDict()
+MAX_SORTED = 8
+
+# Whether a table is stored in time order, keyed like _sorted_cache
+# with the stamp it was found for: a table in order is read by slices
+# without loading its time stamps
+_order_flags = {}
+
+
+class TimeIndex(object):
+    """Sorted index on the 'time_stamp' column of a 'rowdata' or
+    'parameters' table, answering t0 <= time_stamp < t1 queries.
+
+    A PyTables column index is used when the column is already indexed or
+    when the file is writable and one can be created. Otherwise the sorted
+    time stamps (and the sorting permutation, when the table is not already
+    in time order) are kept in a sidecar file and searched with
+    `searchsorted`. Either way a query reads only the matching rows.
+
+    To stream a table in time order by slices, get its sort_order once
+    and pass it to every read_sorted call.
+    """
+
+    def __init__(self, table_ptr, column='time_stamp', create_index=True):
+        self.table_ptr = table_ptr
+        self.column = column
+        self.create_index = create_index
+        self._condition = '(%s >= t0) & (%s < t1)' % (column, column)
+
+    def _column_indexed(self):
+        col = getattr(self.table_ptr.cols, self.column)
+        if col.is_indexed:
+            return True
+        if self.create_index and self.table_ptr._v_file.mode != 'r':
+            col.createCSIndex()
+            self.table_ptr.flush()
+            return True
+        return False
+
+    def _key(self):
+        return (self.table_ptr._v_file.filename, self.table_ptr._v_pathname)
+
+    def in_order(self):
+        """Return whether the table is stored in time order, reading only
+        a flag of the sidecar when it is there.
+        """
+        key = self._key()
+        stamp = source_stamp(self.table_ptr)
+        cached = _order_flags.get(key)
+        if cached is not None and np.array_equal(cached[0], stamp):
+            return cached[1]
+        arrays = load_npz(sidecar_path(self.table_ptr, 'tidx.npz'), stamp,
+                          names=['in_order'])
+        if arrays is None or 'in_order' not in arrays:
+            return self._sorted()[1] is None
+        in_order = bool(arrays['in_order'])
+        _order_flags[key] = (stamp, in_order)
+        return in_order
+
+    def sort_order(self):
+        """Return the row numbers of the table in time order, or None if
+        it is stored so."""
+        with HDF5_LOCK:
+            if self.in_order():
+                return None
+            return self._sorted()[1]
+
+    def _sorted(self):
+        """Return (keys, order): the sorted time stamps and the row of
+        each of them, `order` being None when the table is in time order.
+        """
+        key = self._key()
+        stamp = source_stamp(self.table_ptr)
+        cached = _sorted_cache.pop(key, None)
+        if cached is not None and np.array_equal(cached[0], stamp):
+            _sorted_cache[key] = cached
+            return cached[1], cached[2]
+
+        path = sidecar_path(self.table_ptr, 'tidx.npz')
+        arrays = load_npz(path, stamp)
+        if arrays is None:
+            keys = self.table_ptr.col(self.column)
+            order = None
+            if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+                order = np.argsort(keys, kind='mergesort')
+                keys = keys[order]
+            arrays = {'stamp': stamp, 'keys': keys,
+                      'in_order': np.array(order is None)}
+            if order is not None:
+                arrays['order'] = order
+            save_npz(path, **arrays)
+        keys, order = arrays['keys'], arrays.get('order')
+        _order_flags[key] = (stamp, order is None)
+        while len(_sorted_cache) >= MAX_SORTED:
+            _sorted_cache.popitem(last=False)
+        _sorted_cache[key] = (stamp, keys, order)
+        return keys, order
+
+    def coordinates(self, t0, t1):
+        """Return the ascending row numbers with t0 <= time_stamp < t1."""
+        with HDF5_LOCK:
+            if self._column_indexed():
+                return self.table_ptr.getWhereList(self._condition,
+                                                   {'t0': t0, 't1': t1},
+                                                   sort=True)
+            keys, order = self._sorted()
+            lo = np.searchsorted(keys, t0, side='left')
+            hi = np.searchsorted(keys, t1, side='left')
+            if order is None:
+                return np.arange(lo, hi)
+            return np.sort(order[lo:hi])
+
+    def between(self, t0, t1):
+        """Return the rows with t0 <= time_stamp < t1, in table order."""
+        with HDF5_LOCK:
+            if self._column_indexed():
+                return self.table_ptr.readWhere(self._condition,
+                                                {'t0': t0, 't1': t1})
+            keys, order = self._sorted()
+            lo = np.searchsorted(keys, t0, side='left')
+            hi = np.searchsorted(keys, t1, side='left')
+            if order is None:
+                return self.table_ptr.read(lo, hi)
+            return self.table_ptr.readCoordinates(np.sort(order[lo:hi]))
+
+    def read_sorted(self, start=None, stop=None, order=None):
+        """Return the rows [start, stop) of the table in time order, e.g.
+        to stream a table that is not stored in time order by slices.
+        `order` is what sort_order returned, not looked up again.
+        """
+        with HDF5_LOCK:
+            nrows = self.table_ptr.nrows
+            start, stop, _ = slice(start, stop).indices(nrows)
+            if order is None:
+                if getattr(self.table_ptr.cols, self.column).is_indexed:
+                    return self.table_ptr.readSorted(self.column,
+                                                     start=start, stop=stop)
+                if self.in_order():
+                    return self.table_ptr.read(start, stop)
+                order = self._sorted()[1]
+            return self.table_ptr.readCoordinates(order[start:stop])
+
+    def time_range(self):
+        """Return the (first, last) time stamps of the table, or None."""
+        with HDF5_LOCK:
+            if self.table_ptr.nrows == 0:
+                return None
+            if getattr(self.table_ptr.cols, self.column).is_indexed:
+                n = self.table_ptr.nrows
+                first = self.table_ptr.readSorted(self.column,
+                                                  field=self.column,
+                                                  start=0, stop=1)
+                last = self.table_ptr.readSorted(self.column,
+                                                 field=self.column,
+                                                 start=n - 1, stop=n)
+                return (first[0], last[0])
+            if self.in_order():
+                n = self.table_ptr.nrows
+                first = self.table_ptr.read(0, 1, field=self.column)
+                last = self.table_ptr.read(n - 1, n, field=self.column)
+                return (first[0], last[0])
+            keys, _ = self._sorted()
+            return (keys[0], keys[-1])
+
+#EOF
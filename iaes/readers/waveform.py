@@ -0,0 +1,120 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Storage of the waveforms of the 'rowdata' tables. The raw_data column
+holds float64 volts, or a compact form: the 16 bit ADC codes (int16) or
+float32 samples. Integer samples are converted to volts with the
+'raw_scale' and 'raw_offset' attributes of their channel group:
+
+    volts = raw_scale * code + raw_offset
+
+The readers keep the stored samples and decode only the rows returned,
+to float64 or float32 as asked.
+"""
+import numpy as np
+
+
+RAW_DATA = 'raw_data'
+
+# Attributes of a channel group converting its stored samples to volts
+SCALE = 'raw_scale'
+OFFSET = 'raw_offset'
+
+
+def scaling(table_ptr):
+    """Return the (scale, offset) of the samples of a rowdata table, from
+    the attributes of its channel, or None if they are stored in volts.
+    """
+    attrs = table_ptr._v_parent._v_attrs
+    names = attrs._f_list('user')
+    if SCALE not in names:
+        return None
+    offset = float(attrs[OFFSET]) if OFFSET in names else 0.0
+    return float(attrs[SCALE]), offset
+
+
+def decoded_dtype(dtype, float_type=np.float64, column=RAW_DATA):
+    """Return the dtype of rows of `dtype` once their waveforms are
+    decoded to `float_type`."""
+    if dtype.names is None or column not in dtype.names or \
+            dtype[column].base == float_type:
+        return dtype
+    return np.dtype([(name, float_type, dtype[name].shape)
+                     if name == column else (name, dtype[name])
+                     for name in dtype.names])
+
+
+def decode(raw, scaling=None, float_type=np.float64):
+    """Return stored samples as `float_type` volts (a new array, unless
+    they already are)."""
+    values = np.asarray(raw, dtype=float_type)
+    if scaling is None:
+        return values
+    scale, offset = scaling
+    values = values * float_type(scale)
+    if offset:
+        values += float_type(offset)
+    return values
+
+
+def decode_rows(rows, scaling=None, float_type=np.float64,
+                column=RAW_DATA):
+    """Return rows with their waveforms decoded to `float_type` volts.
+    Rows that need no decoding are returned as they are, not copied.
+    """
+    dtype = decoded_dtype(rows.dtype, float_type, column)
+    if rows.dtype.names is None or column not in rows.dtype.names or \
+            scaling is None and dtype == rows.dtype:
+        return rows
+    out = np.empty(rows.shape, dtype=dtype)
+    for name in dtype.names:
+        if name == column:
+            out[name] = decode(rows[name], scaling, float_type)
+        else:
+            out[name] = rows[name]
+    return out
+
+
+def encode(values, sample_type, scaling=None):
+    """Return volts as samples of `sample_type`: the inverse of decode,
+    rounded and clipped to the range of integer types."""
+    values = np.asarray(values, dtype=np.float64)
+    if scaling is not None:
+        scale, offset = scaling
+        values = (values - offset) / scale
+    sample_type = np.dtype(sample_type)
+    if sample_type.kind in 'iu':
+        info = np.iinfo(sample_type)
+        values = np.clip(np.round(values), info.min, info.max)
+    return values.astype(sample_type)
+
+
+def fit_scaling(lo, hi, sample_type='<i2'):
+    """Return the (scale, offset) mapping [lo, hi] volts onto the whole
+    range of an integer sample type. The quantization error is at most
+    half the scale."""
+    info = np.iinfo(np.dtype(sample_type))
+    scale = (float(hi) - float(lo)) / (int(info.max) - int(info.min))
+    if not scale > 0:
+        scale = 1.0
+    return scale, float(lo) - int(info.min) * scale
+
+
+def read_raw(table_ptr, start=None, stop=None, float_type=np.float64,
+             column=RAW_DATA):
+    """Return the waveforms of rows [start, stop) of a rowdata table as
+    `float_type` volts."""
+    return decode(table_ptr.read(start, stop, field=column),
+                  scaling(table_ptr), float_type)
+
+#EOF
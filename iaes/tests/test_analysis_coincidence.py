@@ -0,0 +1,94 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.analysis.coincidence import find_events, extract_events
+from iaes.readers.core import param_dtype
+
+
+class TestCoincidence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'events.h5')
+        rng = np.random.RandomState(1)
+        # 500 sources 1 s apart, seen by the channels with a few ms delay
+        self.sources = np.arange(500) + 0.5
+        self.delays = [0.0, 0.002, 0.004, 0.003]
+        h5file = openFile(self.filename, 'w')
+        for c, delay in enumerate(self.delays):
+            board = 'Board%d' % (c // 2)
+            if board not in h5file.root:
+                h5file.createGroup('/', board)
+            group = h5file.createGroup('/' + board, 'Ch%d' % (c % 2))
+            # channel 3 misses every other event, plus unrelated noise
+            times = self.sources[::2] if c == 3 else self.sources
+            noise = rng.uniform(0, 500, 50) if c == 1 else []
+            times = np.concatenate((times + delay, noise))
+            params = np.zeros((len(times),), dtype=param_dtype)
+            params['time_stamp'] = times
+            params['block_id'] = np.arange(len(times))
+            params['peak'] = c + 1
+            if c != 1:
+                params = params[np.argsort(times)]
+            h5file.createTable(group, 'parameters', params)
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testEvents(self):
+        labels, events = find_events(self.filename, 0.01, chunk_rows=64)
+        self.assertEqual(labels, ['Board0/Ch0', 'Board0/Ch1', 'Board1/Ch0',
+                                  'Board1/Ch1'])
+        sources = events[events['nchannels'] >= 3]
+        np.testing.assert_allclose(sources['time'], self.sources)
+        np.testing.assert_allclose(sources['arrival'][:, 2],
+                                   self.sources + 0.004)
+        np.testing.assert_array_equal(sources['nchannels'][::2], 4)
+        np.testing.assert_array_equal(sources['nchannels'][1::2], 3)
+        self.assertTrue(np.all(np.isnan(sources['arrival'][1::2, 3])))
+        np.testing.assert_array_equal(sources['peak'][0], [1, 2, 3, 4])
+        np.testing.assert_array_equal(events['event_id'],
+                                      np.arange(len(events)))
+
+    def testStreamingMatchesSingleChunk(self):
+        _, small = find_events(self.filename, 0.01, chunk_rows=7)
+        _, large = find_events(self.filename, 0.01, chunk_rows=10 ** 6)
+        for name in small.dtype.names:
+            np.testing.assert_array_equal(small[name], large[name])
+
+    def testExtract(self):
+        path = extract_events(self.filename, 0.01,
+                              channels=[('Board0', 'Ch0'), ('Board1', 'Ch1')])
+        h5file = openFile(self.filename, 'r')
+        try:
+            table = h5file.getNode(path)
+            self.assertEqual(table.attrs.channels,
+                             ['Board0/Ch0', 'Board1/Ch1'])
+            self.assertEqual(table.nrows, 250)
+        finally:
+            h5file.close()
+        self.assertRaises(ValueError, extract_events, self.filename, 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.analysis.features import block_features, extract_file
+from iaes.readers.core import data_block_dtype, param_dtype
+
+
+class TestFeatures(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'features.h5')
+        self.rowdata = np.zeros((50,), dtype=data_block_dtype)
+        self.rowdata['block_id'] = np.arange(50)
+        self.rowdata['time_stamp'] = np.arange(50) * 0.1
+        self.rowdata['raw_data'] = np.random.normal(size=(50, 4096))
+        h5file = openFile(self.filename, 'w')
+        channel = h5file.createGroup(h5file.createGroup('/', 'Board0'), 'Ch0')
+        h5file.createTable(channel, 'rowdata', self.rowdata)
+        # a channel without waveforms, only parameters
+        channel = h5file.createGroup('/Board0', 'Ch1')
+        h5file.createTable(channel, 'parameters',
+                           np.zeros((3,), dtype=param_dtype))
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testBlockFeatures(self):
+        raw = np.array([[0.0, 2.0, 0.0, 2.0, -3.0, 2.0],
+                        [1.5, 1.5, 0.0, 0.0, 0.0, 0.0]])
+        rms, peak, count = block_features(raw, 1.0)
+        np.testing.assert_allclose(rms, np.sqrt((raw ** 2).mean(axis=1)))
+        np.testing.assert_array_equal(peak, [3.0, 1.5])
+        np.testing.assert_array_equal(count, [3, 1])
+
+    def testExtractFile(self):
+        paths = extract_file(self.filename, 0.5, chunk_rows=16)
+        self.assertEqual(paths, ['/Board0/Ch0/parameters'])
+        paths = extract_file(self.filename, 0.3, chunk_rows=16)
+        self.assertEqual(paths, ['/Board0/Ch0/parameters_0_3'])
+
+        h5file = openFile(self.filename, 'r')
+        try:
+            params = h5file.root.Board0.Ch0.parameters_0_3.read()
+            self.assertEqual(params.dtype, param_dtype)
+            self.assertEqual(h5file.root.Board0.Ch0.parameters_0_3
+                             .attrs.threshold, 0.3)
+        finally:
+            h5file.close()
+        raw = self.rowdata['raw_data']
+        np.testing.assert_array_equal(params['block_id'],
+                                      self.rowdata['block_id'])
+        np.testing.assert_allclose(params['peak'], np.abs(raw).max(axis=1))
+        np.testing.assert_array_equal(params['count'],
+                                      block_features(raw, 0.3)[2])
+
+    def testExtractFileParallel(self):
+        paths = extract_file(self.filename, 0.5, chunk_rows=16, processes=2)
+        self.assertEqual(paths, ['/Board0/Ch0/parameters'])
+        h5file = openFile(self.filename, 'r')
+        try:
+            params = h5file.root.Board0.Ch0.parameters.read()
+            self.assertEqual(h5file.root.Board0.Ch1.parameters.nrows, 3)
+        finally:
+            h5file.close()
+        np.testing.assert_allclose(
+            params['rms'], block_features(self.rowdata['raw_data'], 0.5)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.analysis.features import extract_file
+from iaes.analysis.parallel import map_channels
+from iaes.readers.core import data_block_dtype
+
+
+def max_block_id(channel):
+    return int(channel.rowdata.col('block_id').max())
+
+
+class TestMapChannels(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'parallel.h5')
+        h5file = openFile(self.filename, 'w')
+        for b in range(2):
+            board = h5file.createGroup('/', 'Board%d' % b)
+            for c in range(3):
+                channel = h5file.createGroup(board, 'Ch%d' % c)
+                rowdata = np.zeros((10 * (b + c + 1),),
+                                   dtype=data_block_dtype)
+                rowdata['block_id'] = np.arange(len(rowdata))
+                rowdata['raw_data'] = np.random.normal(size=(len(rowdata),
+                                                             4096))
+                h5file.createTable(channel, 'rowdata', rowdata)
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testMapChannels(self):
+        calls = []
+        for processes in (1, 3):
+            results = map_channels(max_block_id, self.filename,
+                                   processes=processes,
+                                   progress=lambda *a: calls.append(a))
+            self.assertEqual(len(results), 6)
+            self.assertEqual(results[(self.filename, 'Board1', 'Ch2')], 39)
+        self.assertEqual(len(calls), 12)
+        self.assertEqual(calls[-1][:2], (6, 6))
+
+    def testSelectedChannels(self):
+        results = map_channels(max_block_id, [self.filename], processes=2,
+                               channels=[('Board0', 'Ch1')])
+        self.assertEqual(results, {(self.filename, 'Board0', 'Ch1'): 19})
+
+    def testParallelExtraction(self):
+        extract_file(self.filename, 0.5, processes=2)
+        extract_file(self.filename, 0.5, name='parameters_serial')
+        h5file = openFile(self.filename, 'r')
+        try:
+            channel = h5file.root.Board1.Ch2
+            np.testing.assert_array_equal(channel.parameters.read(),
+                                          channel.parameters_serial.read())
+        finally:
+            h5file.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
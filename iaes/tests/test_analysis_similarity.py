@@ -0,0 +1,147 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.analysis.similarity import SimilarityIndex, embed, top_k, \
+    search_files
+from iaes.readers.handle_pool import HandlePool
+
+
+BLOCK = 512
+
+
+def _burst(start, freq, rng):
+    t = np.arange(BLOCK - start) * 1e-6
+    signal = np.zeros((BLOCK,))
+    signal[start:] = np.sin(2 * np.pi * freq * t) * np.exp(-t / 40e-6)
+    return rng.uniform(0.5, 5.0) * signal + rng.normal(0, 0.02, BLOCK)
+
+
+def _blocks(n, seed=0):
+    """Blocks of three kinds: early 100 kHz bursts, late 300 kHz bursts
+    and noise, kind = row % 3."""
+    rng = np.random.RandomState(seed)
+    dtype = np.dtype([('block_id', '<u8'), ('time_stamp', '<f8'),
+                      ('raw_data', '<f8', (BLOCK,))])
+    rows = np.zeros((n,), dtype=dtype)
+    rows['block_id'] = 1000 + np.arange(n)
+    for i in range(n):
+        if i % 3 == 0:
+            rows['raw_data'][i] = _burst(50, 100e3, rng)
+        elif i % 3 == 1:
+            rows['raw_data'][i] = _burst(300, 300e3, rng)
+        else:
+            rows['raw_data'][i] = rng.normal(0, 1, BLOCK)
+    return rows
+
+
+class TestEmbedding(unittest.TestCase):
+
+    def testNormalized(self):
+        rows = _blocks(9)
+        for method in ('envelope', 'spectrum'):
+            vectors = embed(rows['raw_data'], method, 32)
+            self.assertEqual(vectors.shape, (9, 32))
+            self.assertEqual(vectors.dtype, np.float32)
+            np.testing.assert_allclose((vectors ** 2).sum(axis=1), 1.0,
+                                       rtol=1e-5)
+            # gain independent
+            np.testing.assert_allclose(
+                embed(10 * rows['raw_data'][:1], method, 32), vectors[:1],
+                atol=1e-5)
+        self.assertRaises(ValueError, embed, rows['raw_data'], 'wavelet')
+
+    def testTopK(self):
+        rng = np.random.RandomState(1)
+        vectors = rng.normal(size=(1000, 8)).astype(np.float32)
+        queries = rng.normal(size=(3, 8)).astype(np.float32)
+        rows, scores = top_k(vectors, queries, 5, chunk_rows=64,
+                             exclude=17)
+        for q in range(3):
+            expected = np.argsort(-np.dot(vectors, queries[q]))
+            expected = expected[expected != 17][:5]
+            np.testing.assert_array_equal(rows[q], expected)
+            self.assertTrue(np.all(np.diff(scores[q]) <= 0))
+
+
+class TestSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.environ.get('IAES_CACHE_DIR')
+        os.environ['IAES_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+        self.filename = os.path.join(self.tmpdir, 'similar.h5')
+        h5file = openFile(self.filename, 'w')
+        group = h5file.createGroup('/', 'Board0')
+        for c in range(2):
+            channel = h5file.createGroup(group, 'Ch%d' % c)
+            h5file.createTable(channel, 'rowdata', _blocks(60, seed=c))
+        h5file.close()
+        self.h5file = openFile(self.filename, 'r')
+        self.table = self.h5file.getNode('/Board0/Ch0/rowdata')
+
+    def tearDown(self):
+        self.h5file.close()
+        if self.cache_dir is None:
+            del os.environ['IAES_CACHE_DIR']
+        else:
+            os.environ['IAES_CACHE_DIR'] = self.cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def testSearchRow(self):
+        for method in ('envelope', 'spectrum'):
+            index = SimilarityIndex(self.table, method, chunk_rows=16)
+            for row in (0, 1):
+                results = index.search_row(row, k=19)
+                self.assertFalse(row in results['row'])
+                self.assertEqual((results['row'] % 3).tolist(),
+                                 [row] * 19)
+                np.testing.assert_array_equal(results['block_id'],
+                                              1000 + results['row'])
+
+    def testSidecarReused(self):
+        done = []
+        SimilarityIndex(self.table).load(
+            progress=lambda n, total: done.append(n))
+        self.assertEqual(done[-1], 60)
+        index = SimilarityIndex(self.table)
+        self.assertTrue(index._load())
+        self.assertTrue(isinstance(index.vectors, np.memmap))
+
+    def testSearchFiles(self):
+        pool = HandlePool()
+        raw = _blocks(3, seed=5)['raw_data'][1]
+        try:
+            found = search_files([self.filename], raw, k=30, pool=pool)
+        finally:
+            pool.close_all()
+        self.assertEqual(len(found), 30)
+        self.assertEqual(set(path for _, _, path, _, _ in found),
+                         set(['/Board0/Ch0/rowdata', '/Board0/Ch1/rowdata']))
+        self.assertTrue(all(row % 3 == 1 for _, _, _, row, _ in found))
+        scores = [score for score, _, _, _, _ in found]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+#EOF
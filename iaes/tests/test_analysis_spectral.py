@@ -0,0 +1,98 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.analysis.spectral import block_spectra, channel_spectral, \
+    spectral_file, cached_spectrum
+from iaes.readers.core import data_block_dtype
+
+
+class TestSpectral(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'spectral.h5')
+        t = np.arange(4096) / 1e6
+        self.data = np.zeros((20,), dtype=data_block_dtype)
+        self.data['block_id'] = np.arange(20)
+        self.freqs = 50e3 + 10e3 * np.arange(20)
+        self.data['raw_data'] = np.sin(2 * np.pi * self.freqs[:, None] * t)
+        h5file = openFile(self.filename, 'w')
+        group = h5file.createGroup(h5file.createGroup('/', 'Board0'), 'Ch0')
+        group._v_attrs.sampling_rate = 1e6
+        h5file.createTable(group, 'rowdata', self.data[:15])
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testBlockSpectra(self):
+        peak, centroid, bands, spectrum = \
+            block_spectra(self.data['raw_data'], 1e6)
+        resolution = 1e6 / 4096
+        np.testing.assert_allclose(peak, self.freqs, atol=resolution)
+        np.testing.assert_allclose(centroid, self.freqs, rtol=0.05)
+        # 50-90 kHz in the first band, 100-190 kHz in the second, the
+        # 200 kHz block lying on an edge
+        np.testing.assert_array_equal(bands[:15].argmax(axis=1),
+                                      [0] * 5 + [1] * 10)
+        np.testing.assert_array_equal(bands[16:].argmax(axis=1), [2] * 4)
+        self.assertEqual(spectrum.shape, (20, 128))
+
+    def testCacheExtended(self):
+        mtime = os.path.getmtime(self.filename)
+        self.assertEqual(spectral_file(self.filename),
+                         {'/Board0/Ch0/rowdata': 15})
+        # a sidecar: the file itself is left untouched
+        self.assertEqual(os.path.getmtime(self.filename), mtime)
+        self.assertTrue(os.path.isdir(self.filename + '.iaes'))
+        h5file = openFile(self.filename, 'a')
+        channel = h5file.root.Board0.Ch0
+        first = np.array(channel_spectral(channel))
+        channel.rowdata.append(self.data[15:])
+        spectral = channel_spectral(channel, chunk_rows=4)
+        self.assertEqual(len(spectral), 20)
+        np.testing.assert_array_equal(spectral[:15]['spectrum'],
+                                      first['spectrum'])
+        np.testing.assert_allclose(spectral['peak_freq'], self.freqs,
+                                   atol=1e6 / 4096)
+        # other settings replace the sidecar
+        self.assertEqual(channel_spectral(channel, nbins=64)
+                         ['spectrum'].shape, (20, 64))
+        self.assertEqual(cached_spectrum(channel, 0)['spectrum'].shape,
+                         (64,))
+        h5file.close()
+
+    def testCachedSpectrum(self):
+        h5file = openFile(self.filename, 'r')
+        self.assertEqual(cached_spectrum(h5file.root.Board0.Ch0, 3), None)
+        h5file.close()
+        spectral_file(self.filename)
+        h5file = openFile(self.filename, 'r')
+        channel = h5file.root.Board0.Ch0
+        self.assertEqual(cached_spectrum(channel, 3, 3)['block_id'], 3)
+        self.assertEqual(cached_spectrum(channel, 3, 7)['block_id'], 7)
+        self.assertEqual(cached_spectrum(channel, 99), None)
+        h5file.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import threading
+import unittest
+
+from iaes.readers.background import BackgroundWorker
+
+
+def _blocked(request, started, release):
+    started.set()
+    while not release.wait(0.01):
+        request.check()
+    request.check()
+    return 'first'
+
+
+def _counting(request, n):
+    for i in range(n):
+        request.set_progress(i + 1, n)
+    return n
+
+
+def _failing(request):
+    raise ValueError('broken')
+
+
+class TestBackgroundWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = BackgroundWorker()
+        self.done = threading.Event()
+        self.results = []
+        self.errors = []
+        self.cancelled = []
+        self.progress = []
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def _submit(self, func, args=(), key=None):
+        def on_done(result):
+            self.results.append(result)
+            self.done.set()
+
+        def on_error(error):
+            self.errors.append(error)
+            self.done.set()
+        return self.worker.submit(func, args, key=key, on_done=on_done,
+                                  on_error=on_error,
+                                  on_progress=self.progress.append,
+                                  on_cancel=lambda:
+                                  self.cancelled.append(True))
+
+    def testResultAndProgress(self):
+        self._submit(_counting, (4,))
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [4])
+        self.assertEqual(self.progress, [0.25, 0.5, 0.75, 1.0])
+
+    def testSameKeyCancelsPrevious(self):
+        started, release = threading.Event(), threading.Event()
+        first = self._submit(_blocked, (started, release), key='view')
+        self.assertTrue(started.wait(5))
+        self._submit(_counting, (2,), key='view')
+        self.assertTrue(first.cancelled)
+        release.set()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [2])
+        self.assertEqual(self.cancelled, [True])
+
+    def testCancelByKey(self):
+        started, release = threading.Event(), threading.Event()
+        request = self._submit(_blocked, (started, release), key='view')
+        self.assertTrue(started.wait(5))
+        self.worker.cancel('view')
+        release.set()
+        self.worker.shutdown()
+        self.assertTrue(request.cancelled)
+        self.assertEqual(self.results, [])
+
+    def testError(self):
+        self._submit(_failing)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [])
+        self.assertEqual(str(self.errors[0]), 'broken')
+
+    def testDispatch(self):
+        posted = []
+        worker = BackgroundWorker(dispatch=lambda f, *args:
+                                  posted.append((f, args)))
+        worker.submit(_counting, (1,), on_done=self.results.append)
+        worker.shutdown()
+        for f, args in posted:
+            f(*args)
+        self.assertEqual(self.results, [1])
+
+    def testErrorAfterCancelDropped(self):
+        posted = []
+        worker = BackgroundWorker(dispatch=lambda f, *args:
+                                  posted.append((f, args)))
+        request = worker.submit(_failing, on_error=self.errors.append)
+        worker.shutdown()
+        # cancelled before the error reaches the dispatch thread
+        request.cancel()
+        for f, args in posted:
+            f(*args)
+        self.assertEqual(self.errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+#EOF
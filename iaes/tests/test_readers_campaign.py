@@ -0,0 +1,155 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.campaign import Campaign
+from iaes.readers.core import param_dtype
+from iaes.readers.handle_pool import HandlePool
+from iaes.readers.waveform import read_raw
+from iaes.tools.catalog import Catalog
+from iaes.tools.compact import compact
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestCampaign(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.environ.get('IAES_CACHE_DIR')
+        os.environ['IAES_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+        # three files of 100 s each, one hit per second; the last one
+        # also has a second channel
+        self.filenames = []
+        for i in range(3):
+            filename = os.path.join(self.tmpdir, 'run%d.h5' % i)
+            h5file = openFile(filename, 'w')
+            board = h5file.createGroup('/', 'Board0')
+            for c in range(1 if i < 2 else 2):
+                group = h5file.createGroup(board, 'Ch%d' % c)
+                params = np.zeros((100,), dtype=param_dtype)
+                params['time_stamp'] = 100.0 * i + np.arange(100)
+                params['block_id'] = np.arange(100)
+                h5file.createTable(group, 'parameters', params)
+            h5file.close()
+            self.filenames.append(filename)
+        self.pool = HandlePool()
+        self.campaign = Campaign(self.filenames, pool=self.pool)
+
+    def tearDown(self):
+        self.pool.close_all()
+        if self.cache_dir is None:
+            del os.environ['IAES_CACHE_DIR']
+        else:
+            os.environ['IAES_CACHE_DIR'] = self.cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def testLayout(self):
+        self.assertEqual(self.campaign.boards(), ['Board0'])
+        self.assertEqual(self.campaign.channels('Board0'), ['Ch0', 'Ch1'])
+        self.assertEqual(self.campaign.time_range('Board0', 'Ch0'),
+                         (0.0, 299.0))
+        self.assertEqual(self.campaign.time_range('Board0', 'Ch1'),
+                         (200.0, 299.0))
+        self.assertEqual(len(self.campaign.read('Board0', 'Ch0')), 300)
+
+    def testBetweenAcrossFiles(self):
+        rows = self.campaign.between('Board0', 'Ch0', 150.5, 250.0)
+        np.testing.assert_array_equal(rows['time_stamp'],
+                                      np.arange(151, 250))
+        self.assertEqual(self.campaign.overlapping('Board0', 'Ch0', 150, 160),
+                         [self.filenames[1]])
+        rows = self.campaign.between('Board0', 'Ch0', 1000.0, 2000.0)
+        self.assertEqual(rows.dtype, param_dtype)
+        self.assertEqual(len(rows['time_stamp']), 0)
+        self.assertEqual(self.campaign.read('Board9', 'Ch0',
+                                            field='rms').shape, (0,))
+
+    def testRangesFollowFiles(self):
+        self.assertEqual(self.campaign.time_range('Board0', 'Ch0'),
+                         (0.0, 299.0))
+        self.pool.close_all()
+        h5file = openFile(self.filenames[2], 'a')
+        params = np.zeros((10,), dtype=param_dtype)
+        params['time_stamp'] = 300.0 + np.arange(10)
+        h5file.root.Board0.Ch0.parameters.append(params)
+        h5file.close()
+        self.assertEqual(self.campaign.time_range('Board0', 'Ch0'),
+                         (0.0, 309.0))
+
+    def testOnlyOverlappingFilesOpened(self):
+        catalog = Catalog(os.path.join(self.tmpdir, 'catalog.sqlite'))
+        catalog.update(self.filenames, processes=1)
+        campaign = Campaign(self.filenames, pool=self.pool, catalog=catalog)
+        rows = campaign.between('Board0', 'Ch0', 120, 130)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual([f in self.pool for f in self.filenames],
+                         [False, True, False])
+        catalog.close()
+
+    def testHitRate(self):
+        edges, counts = self.campaign.hit_rate('Board0', 'Ch0', 60.0)
+        self.assertEqual(edges[0], 0.0)
+        self.assertEqual(counts.sum(), 300)
+        np.testing.assert_array_equal(counts, [60, 60, 60, 60, 60])
+        edges, counts = self.campaign.hit_rate('Board0', 'Ch1', 10.0,
+                                               t0=0, t1=300)
+        self.assertEqual(counts[:20].sum(), 0)
+        self.assertEqual(counts[20:].sum(), 100)
+
+    def testTrend(self):
+        out = self.campaign.trend('Board0', 'Ch0', resolution=10.0)
+        np.testing.assert_array_equal(out['hits'], [10] * 30)
+        self.assertEqual(out['cumulative'][-1], 300)
+        out = self.campaign.trend('Board0', 'Ch0', 150.0, 250.0,
+                                  resolution=60.0)
+        np.testing.assert_array_equal(out['time'], [120.0, 180.0, 240.0])
+        np.testing.assert_array_equal(out['cumulative'], [180, 240, 300])
+        self.assertEqual(len(self.campaign.trend('Board9', 'Ch0')), 0)
+
+    def testCompactAndFloatFiles(self):
+        filenames = [write_synthetic(os.path.join(self.tmpdir, name),
+                                     boards=1, channels=1, blocks=20,
+                                     block_size=128, seed=seed)
+                     for seed, name in enumerate(['f8.h5', 'i2.h5'])]
+        volts = []
+        for filename in filenames:
+            h5file = openFile(filename, 'r')
+            volts.append(read_raw(h5file.root.Board0.Ch0.rowdata))
+            h5file.close()
+        compact(filenames[1])
+        expected = np.concatenate(volts)
+        campaign = Campaign(filenames, pool=self.pool)
+
+        rows = campaign.read('Board0', 'Ch0', name='rowdata')
+        self.assertEqual(rows['raw_data'].dtype, np.float64)
+        np.testing.assert_allclose(rows['raw_data'], expected, atol=1e-4)
+        raw = campaign.read('Board0', 'Ch0', name='rowdata',
+                            field='raw_data')
+        np.testing.assert_allclose(raw, expected, atol=1e-4)
+        rows = campaign.between('Board0', 'Ch0', 0.0, np.inf, 'rowdata')
+        self.assertEqual(len(rows), 40)
+        self.assertEqual(rows['raw_data'].dtype, np.float64)
+        rows = campaign.between('Board0', 'Ch0', -2.0, -1.0, 'rowdata')
+        self.assertEqual(rows['raw_data'].dtype, np.float64)
+
+
+if __name__ == "__main__":
+    unittest.main()
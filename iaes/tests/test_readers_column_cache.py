@@ -0,0 +1,81 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.column_cache import ColumnCache, build_file
+from iaes.readers.core import data_block_dtype
+from iaes.readers.table_cache import ChunkedTable
+
+
+class TestColumnCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'cols.h5')
+        self.data = np.zeros((300,), dtype=data_block_dtype)
+        self.data['block_id'] = np.arange(300)
+        self.data['time_stamp'] = np.arange(300) * 0.5
+        self.data['raw_data'] = np.random.normal(size=(300, 4096))
+        h5file = openFile(self.filename, 'w')
+        group = h5file.createGroup(h5file.createGroup('/', 'Board0'), 'Ch0')
+        h5file.createTable(group, 'rowdata', self.data)
+        h5file.close()
+        self.h5file = openFile(self.filename, 'r')
+        self.table_ptr = self.h5file.root.Board0.Ch0.rowdata
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testBuildAndMap(self):
+        cache = ColumnCache(self.table_ptr, chunk_rows=64)
+        self.assertEqual(cache.load(build=False), None)
+        columns = cache.load()
+        self.assertTrue(isinstance(columns['raw_data'], np.memmap))
+        for name in ('block_id', 'time_stamp', 'raw_data'):
+            np.testing.assert_array_equal(columns[name], self.data[name])
+        self.assertNotEqual(cache.load(build=False), None)
+
+    def testStaleOnAppend(self):
+        ColumnCache(self.table_ptr).load()
+        self.h5file.close()
+        h5file = openFile(self.filename, 'a')
+        h5file.root.Board0.Ch0.rowdata.append(self.data[:10])
+        h5file.close()
+        self.h5file = openFile(self.filename, 'r')
+        self.table_ptr = self.h5file.root.Board0.Ch0.rowdata
+        cache = ColumnCache(self.table_ptr)
+        self.assertEqual(cache.load(build=False), None)
+        self.assertEqual(len(cache.load()['raw_data']), 310)
+
+    def testChunkedTable(self):
+        table = ChunkedTable(self.table_ptr, chunk_rows=50, mmap_cache=True)
+        self.assertNotEqual(table.columns, None)
+        rows = table[120:180]
+        np.testing.assert_array_equal(rows, self.data[120:180])
+        self.assertTrue(isinstance(table['raw_data'], np.memmap))
+
+    def testBuildFile(self):
+        self.assertEqual(build_file(self.filename), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.core import IAESFile, data_block_dtype, param_dtype
+
+
+class TestIAESFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'core.h5')
+        h5file = openFile(self.filename, 'w')
+        for b in range(2):
+            board = h5file.createGroup('/', 'Board%d' % b)
+            board._v_attrs.serial = 'SN%d' % b
+            for c in range(3):
+                channel = h5file.createGroup(board, 'Ch%d' % c)
+                channel._v_attrs.gain = 10 * c
+                rowdata = np.zeros((5,), dtype=data_block_dtype)
+                rowdata['block_id'] = np.arange(5)
+                params = np.zeros((5,), dtype=param_dtype)
+                params['block_id'] = np.arange(5)
+                params['rms'] = b + c
+                h5file.createTable(channel, 'rowdata', rowdata)
+                h5file.createTable(channel, 'parameters', params)
+            h5file.createGroup(board, 'notes')
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testDiscovery(self):
+        with IAESFile(self.filename) as f:
+            self.assertEqual(sorted(f.boards()), ['Board0', 'Board1'])
+            self.assertEqual(sorted(f.channels('Board1')),
+                             ['Ch0', 'Ch1', 'Ch2'])
+            self.assertEqual(sorted(f.tables('Board1', 'Ch2')),
+                             ['parameters', 'rowdata'])
+
+    def testMeta(self):
+        with IAESFile(self.filename) as f:
+            self.assertEqual(f.meta('Board1')['serial'], 'SN1')
+            self.assertEqual(f.meta('Board0', 'Ch2')['gain'], 20)
+
+    def testTables(self):
+        with IAESFile(self.filename) as f:
+            params = f.parameters('Board1', 'Ch2').read()
+            self.assertEqual(params.dtype, param_dtype)
+            self.assertTrue(np.all(params['rms'] == 3))
+            self.assertEqual(len(f.rowdata('Board0', 'Ch0')), 5)
+
+    def testReadOnly(self):
+        with IAESFile(self.filename) as f:
+            self.assertEqual(f.h5file.mode, 'r')
+
+    def testNoGuiImports(self):
+        code = ('import sys; import iaes.readers.core; '
+                'mods = [m for m in ("sip", "PyQt4", "traits", "traitsui", '
+                '"pyface", "enable", "chaco") if m in sys.modules]; '
+                'sys.exit(len(mods))')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import unittest
+
+import numpy as np
+
+from iaes.readers.density import data_range, bin_counts, density_image
+
+
+class TestDensity(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = rng.uniform(0, 10, 10000)
+        self.y = rng.uniform(-5, 5, 10000)
+
+    def testMatchesHistogram2d(self):
+        counts = bin_counts(self.x, self.y, (0, 10), (-5, 5), (20, 10))
+        expected, _, _ = np.histogram2d(self.y, self.x, bins=(10, 20),
+                                        range=((-5, 5), (0, 10)))
+        self.assertEqual(counts.shape, (10, 20))
+        np.testing.assert_array_equal(counts, expected)
+
+    def testVisibleRangeOnly(self):
+        counts = bin_counts(self.x, self.y, (2, 4), (0, 1), (8, 8))
+        inside = (self.x >= 2) & (self.x <= 4) & \
+            (self.y >= 0) & (self.y <= 1)
+        self.assertEqual(counts.sum(), inside.sum())
+        self.assertRaises(ValueError, bin_counts, self.x, self.y,
+                          (1, 1), (0, 1), (8, 8))
+
+    def testRangeAndImage(self):
+        self.assertEqual(data_range(np.array([1.0, np.nan, 3.0])),
+                         (1.0, 3.0))
+        self.assertEqual(data_range(np.array([2.0, 2.0])), (1.0, 3.0))
+        self.assertEqual(data_range(np.array([])), (0.0, 1.0))
+        image = density_image(np.array([[0, 1], [3, 0]]))
+        np.testing.assert_allclose(image, np.log1p([[0, 1], [3, 0]]),
+                                   rtol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tables import openFile
+
+from iaes.readers.handle_pool import HandlePool
+
+
+class TestHandlePool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filenames = []
+        for i in range(4):
+            filename = os.path.join(self.tmpdir, 'pool%d.h5' % i)
+            openFile(filename, 'w').close()
+            self.filenames.append(filename)
+        self.pool = HandlePool(max_open=2)
+
+    def tearDown(self):
+        self.pool.close_all()
+        shutil.rmtree(self.tmpdir)
+
+    def testShared(self):
+        a = self.pool.acquire(self.filenames[0])
+        b = self.pool.acquire(self.filenames[0])
+        self.assertTrue(a is b)
+        self.assertEqual(a.mode, 'r')
+
+    def testEviction(self):
+        for filename in self.filenames:
+            h5file = self.pool.acquire(filename)
+            self.pool.release(filename)
+        self.assertEqual(len(self.pool), 2)
+        self.assertTrue(self.filenames[3] in self.pool)
+        self.assertFalse(self.filenames[0] in self.pool)
+        self.assertTrue(h5file.isopen)
+
+    def testInUseNotEvicted(self):
+        handles = [self.pool.acquire(filename) for filename in self.filenames]
+        self.assertEqual(len(self.pool), 4)
+        self.assertTrue(all(h5file.isopen for h5file in handles))
+        self.pool.release(self.filenames[1])
+        self.pool.release(self.filenames[2])
+        self.assertEqual(len(self.pool), 2)
+        self.assertFalse(handles[1].isopen)
+        self.assertTrue(handles[0].isopen)
+
+    def testReopen(self):
+        a = self.pool.acquire(self.filenames[0])
+        b = self.pool.reopen(self.filenames[0])
+        self.assertFalse(a.isopen)
+        self.assertTrue(b is self.pool.acquire(self.filenames[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,8 +12,22 @@ All rights reserved
 Created on Jun 12, 2012
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
+from tables import openFile
+
+from iaes.tools.synthetic import write_synthetic
+
+try:
+    from iaes.readers.hdf5 import TableLeaf
+    from iaes.readers.table_cache import ChunkedTable
+except ImportError:
+    # no traits/Qt: the browser cannot be built here
+    TableLeaf = None
+
 
 class Test(unittest.TestCase):
 
@@ -27,6 +41,43 @@ class Test(unittest.TestCase):
         pass
 
 
+@unittest.skipIf(TableLeaf is None, 'the GUI toolkit is not installed')
+class TestTableLeaf(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = write_synthetic(os.path.join(self.tmpdir, 'run.h5'),
+                                        boards=1, channels=1, blocks=20,
+                                        block_size=256)
+        self.h5file = openFile(self.filename, 'r')
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testRebindRowdata(self):
+        path = '/Board0/Ch0/rowdata'
+        leaf = TableLeaf(name='rowdata', path=path,
+                         table_ptr=self.h5file.getNode(path))
+        table = leaf.plot.dataset.table
+        self.assertTrue(isinstance(table, ChunkedTable))
+        self.assertEqual(len(table), 20)
+
+        self.h5file.close()
+        h5file = openFile(self.filename, 'a')
+        rowdata = h5file.getNode(path)
+        rowdata.append(rowdata.read(0, 5))
+        h5file.close()
+        self.h5file = openFile(self.filename, 'r')
+
+        plot = leaf.plot
+        leaf.rebind(self.h5file)
+        self.assertTrue(leaf.plot is plot)
+        self.assertTrue(plot.dataset.table is table)
+        self.assertEqual(len(plot.dataset.table), 25)
+        self.assertEqual(plot.pyramid.table_ptr.nrows, 25)
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
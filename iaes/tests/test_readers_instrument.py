@@ -0,0 +1,116 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from iaes.readers import instrument
+from iaes.readers.instrument import profiler, measure, timed, log, \
+    enable_from_environment
+
+
+@timed('test.square')
+def _square(x):
+    return x * x
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = profiler()
+        self.enabled = self.profiler.enabled
+        self.profiler.reset()
+        self.profiler.enabled = True
+
+    def tearDown(self):
+        self.profiler.enabled = self.enabled
+        self.profiler.reset()
+
+    def testLogging(self):
+        root = list(logging.getLogger().handlers)
+        handlers = list(log.handlers)
+        level = log.level
+        try:
+            enable_from_environment({})
+            self.assertEqual(log.handlers, handlers)
+            enable_from_environment({'IAES_LOG': 'info'})
+            enable_from_environment({'IAES_LOG': 'info'})
+            self.assertEqual(len(log.handlers), len(handlers) + 1)
+            self.assertEqual(log.level, logging.INFO)
+            self.assertEqual(logging.getLogger().handlers, root)
+        finally:
+            if instrument._handler is not None:
+                log.removeHandler(instrument._handler)
+                instrument._handler = None
+            log.setLevel(level)
+
+    def testMeasure(self):
+        for i in range(3):
+            with measure('test.read') as m:
+                m.add_bytes(100)
+        stats = self.profiler.as_dict()['test.read']
+        self.assertEqual(stats['calls'], 3)
+        self.assertEqual(stats['bytes'], 300)
+        self.assertTrue(stats['max'] <= stats['total'])
+
+    def testTimed(self):
+        self.assertEqual(_square(3), 9)
+        self.assertEqual(_square.__name__, '_square')
+        self.assertEqual(self.profiler.as_dict()['test.square']['calls'], 1)
+
+    def testDisabled(self):
+        self.profiler.enabled = False
+        with measure('test.read'):
+            pass
+        self.assertEqual(_square(2), 4)
+        self.assertEqual(self.profiler.as_dict(), {})
+
+    def testErrorIsMeasured(self):
+        def fail():
+            with measure('test.fail'):
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(self.profiler.as_dict()['test.fail']['calls'], 1)
+
+    def testReportAndTrace(self):
+        with measure('test.outer'):
+            with measure('test.inner', 10):
+                pass
+        report = self.profiler.report()
+        self.assertTrue('test.outer' in report)
+        self.assertTrue('test.inner' in report)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'trace.json')
+            self.profiler.write_trace(path)
+            with open(path) as f:
+                events = json.load(f)['traceEvents']
+        finally:
+            shutil.rmtree(tmpdir)
+        spans = dict((e['name'], e) for e in events if e['ph'] == 'X')
+        self.assertEqual(set(spans), set(['test.outer', 'test.inner']))
+        self.assertEqual(spans['test.inner']['args']['bytes'], 10)
+        self.assertTrue(spans['test.outer']['dur'] >=
+                        spans['test.inner']['dur'])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+#EOF
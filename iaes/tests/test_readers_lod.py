@@ -0,0 +1,81 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.core import data_block_dtype
+from iaes.readers.lod import MinMaxPyramid
+
+
+class TestMinMaxPyramid(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.h5file = openFile(os.path.join(self.tmpdir, 'lod.h5'), 'w')
+        self.data = np.zeros((10,), dtype=data_block_dtype)
+        self.data['block_id'] = np.arange(10)
+        self.data['raw_data'] = np.random.normal(size=(10, 4096))
+        self.data['raw_data'][7, 1234] = 100.0
+        self.data['raw_data'][2, 99] = -100.0
+        self.table_ptr = self.h5file.createTable('/', 'rowdata', self.data)
+        self.signal = self.data['raw_data'].ravel()
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testLevels(self):
+        pyramid = MinMaxPyramid(self.table_ptr, base_bin=256, factor=4)
+        levels = pyramid.levels
+        self.assertEqual(len(levels[0]), 160)
+        self.assertEqual(len(levels[-1]), 1)
+        self.assertAlmostEqual(levels[-1][0, 0], -100.0)
+        self.assertAlmostEqual(levels[-1][0, 1], 100.0)
+
+    def testLoadProgress(self):
+        pyramid = MinMaxPyramid(self.table_ptr, chunk_rows=4, cache=False)
+        self.assertFalse(pyramid.ready)
+        done = []
+        pyramid.load(lambda n, total: done.append((n, total)))
+        self.assertTrue(pyramid.ready)
+        self.assertEqual(done, [(4, 10), (8, 10), (10, 10)])
+
+    def testLinePreservesPeaks(self):
+        pyramid = MinMaxPyramid(self.table_ptr)
+        x, y = pyramid.line(0, pyramid.n_samples, 100)
+        self.assertTrue(len(y) <= 2 * 4 * 100)
+        self.assertAlmostEqual(y.max(), 100.0)
+        self.assertAlmostEqual(y.min(), -100.0)
+
+    def testRawWhenZoomedIn(self):
+        pyramid = MinMaxPyramid(self.table_ptr)
+        x, y = pyramid.line(4000, 4300, 500)
+        np.testing.assert_array_equal(x, np.arange(4000, 4300))
+        np.testing.assert_array_equal(y, self.signal[4000:4300])
+
+    def testSidecar(self):
+        MinMaxPyramid(self.table_ptr).levels
+        pyramid = MinMaxPyramid(self.table_ptr)
+        self.assertTrue(pyramid._load() is not None)
+        self.assertTrue(isinstance(pyramid.levels[0], np.memmap))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers import query
+from iaes.readers.core import param_dtype
+from iaes.readers.query import select, coordinates, count, select_file, \
+    check_condition
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.h5file = openFile(os.path.join(self.tmpdir, 'q.h5'), 'w')
+        self.params = {}
+        for b in range(3):
+            board = self.h5file.createGroup('/', 'Board%d' % b)
+            for c in range(2):
+                group = self.h5file.createGroup(board, 'Ch%d' % c)
+                params = np.zeros((1000,), dtype=param_dtype)
+                params['block_id'] = np.arange(1000)
+                params['rms'] = rng.uniform(0, 1, 1000)
+                params['count'] = rng.randint(0, 40, 1000)
+                self.h5file.createTable(group, 'parameters', params)
+                self.params[('Board%d' % b, 'Ch%d' % c)] = params
+        self.table_ptr = self.h5file.root.Board0.Ch0.parameters
+        self.data = self.params[('Board0', 'Ch0')]
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testSelect(self):
+        cond = '(rms > 0.3) & (count < 20)'
+        mask = (self.data['rms'] > 0.3) & (self.data['count'] < 20)
+        np.testing.assert_array_equal(select(self.table_ptr, cond),
+                                      self.data[mask])
+        np.testing.assert_array_equal(coordinates(self.table_ptr, cond),
+                                      np.flatnonzero(mask))
+        self.assertEqual(count(self.table_ptr, cond), mask.sum())
+        rows = select(self.table_ptr, 'rms > lo', {'lo': 0.9}, 100, 200,
+                      field='rms')
+        np.testing.assert_array_equal(
+            rows, self.data['rms'][100:200][self.data['rms'][100:200] > 0.9])
+
+    def testNumpyFallback(self):
+        old = query.CHUNK_ROWS
+        query.CHUNK_ROWS = 64
+        try:
+            cond = '(block_id >= 500) & (abs(rms - 0.5) < 0.1)'
+            mask = (self.data['block_id'] >= 500) & \
+                (np.abs(self.data['rms'] - 0.5) < 0.1)
+            np.testing.assert_array_equal(select(self.table_ptr, cond),
+                                          self.data[mask])
+            np.testing.assert_array_equal(coordinates(self.table_ptr, cond),
+                                          np.flatnonzero(mask))
+        finally:
+            query.CHUNK_ROWS = old
+
+    def testInvalid(self):
+        self.assertRaises(ValueError, select, self.table_ptr, 'rms >')
+        self.assertRaises(ValueError, select, self.table_ptr, 'rsm > 0.3')
+        for cond in ['rms >', 'rms > "a"', 'rms and count', 'rms[0] > 0']:
+            self.assertRaises(ValueError, check_condition, self.table_ptr,
+                              cond)
+        check_condition(self.table_ptr, '(rms > 0.3) & (count < 20)')
+
+    def testSelectFile(self):
+        found = select_file(self.h5file, '(rms > 0.3) & (count < 20)',
+                            boards=['Board2'])
+        self.assertEqual(sorted(found), [('Board2', 'Ch0'), ('Board2', 'Ch1')])
+        data = self.params[('Board2', 'Ch1')]
+        mask = (data['rms'] > 0.3) & (data['count'] < 20)
+        np.testing.assert_array_equal(found[('Board2', 'Ch1')], data[mask])
+
+
+if __name__ == "__main__":
+    unittest.main()
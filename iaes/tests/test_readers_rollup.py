@@ -0,0 +1,152 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.core import param_dtype
+from iaes.readers.rollup import Rollup, aggregate, combine, trend, \
+    pick_resolution, rollup_file
+
+
+def _params(n, t0=0.0, seed=0):
+    rng = np.random.RandomState(seed)
+    params = np.zeros((n,), dtype=param_dtype)
+    params['block_id'] = np.arange(n)
+    params['time_stamp'] = t0 + np.sort(rng.uniform(0, 1000.0, n))
+    params['rms'] = rng.uniform(0, 1, n)
+    params['peak'] = rng.uniform(0, 10, n)
+    params['count'] = rng.randint(0, 3000, n)
+    return params
+
+
+def _assert_records_equal(test, a, b):
+    test.assertEqual(a.dtype, b.dtype)
+    for name in a.dtype.names:
+        test.assertTrue(np.allclose(a[name], b[name]), name)
+
+
+class TestAggregate(unittest.TestCase):
+
+    def testBuckets(self):
+        params = _params(500)
+        records = aggregate(params, 10.0)
+        bucket = np.floor(params['time_stamp'] / 10.0).astype(int)
+        self.assertEqual(records['hits'].sum(), 500)
+        for record in records:
+            rows = params[bucket == record['bucket']]
+            self.assertEqual(record['hits'], len(rows))
+            self.assertAlmostEqual(record['rms_sum'], rows['rms'].sum())
+            self.assertEqual(record['peak_max'], rows['peak'].max())
+            self.assertEqual(record['count_hist'].sum(), len(rows))
+            self.assertEqual(record['count_hist'][12],
+                             np.count_nonzero((rows['count'] >= 2048) &
+                                              (rows['count'] < 4096)))
+
+    def testCombineChunks(self):
+        params = _params(500)
+        whole = aggregate(params, 60.0)
+        parts = combine(np.concatenate((aggregate(params[:123], 60.0),
+                                        aggregate(params[123:], 60.0))))
+        _assert_records_equal(self, whole, parts)
+
+    def testTrend(self):
+        params = np.zeros((3,), dtype=param_dtype)
+        params['time_stamp'] = [5.0, 6.0, 35.0]
+        params['rms'] = [1.0, 3.0, 5.0]
+        out = trend(aggregate(params, 10.0), 10.0, 10.0, 40.0)
+        self.assertEqual(out['time'].tolist(), [10.0, 20.0, 30.0])
+        self.assertEqual(out['hits'].tolist(), [0, 0, 1])
+        self.assertEqual(out['cumulative'].tolist(), [2, 2, 3])
+        self.assertTrue(np.isnan(out['rms_mean'][0]))
+        self.assertEqual(out['rms_mean'][2], 5.0)
+        out = trend(aggregate(params, 10.0), 10.0)
+        self.assertEqual(out['rms_mean'][0], 2.0)
+        self.assertEqual(out['rate'][0], 0.2)
+
+    def testPickResolution(self):
+        resolutions = (1.0, 10.0, 60.0)
+        self.assertEqual(pick_resolution(resolutions, 0, 100, 200), 1.0)
+        self.assertEqual(pick_resolution(resolutions, 0, 1000, 200), 10.0)
+        self.assertEqual(pick_resolution(resolutions, 0, 1e6, 200), 60.0)
+
+
+class TestRollup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.environ.get('IAES_CACHE_DIR')
+        os.environ['IAES_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+        self.filename = os.path.join(self.tmpdir, 'rollup.h5')
+        self.h5file = openFile(self.filename, 'w')
+        group = self.h5file.createGroup('/', 'Board0')
+        group = self.h5file.createGroup(group, 'Ch0')
+        self.params = _params(1000)
+        self.table = self.h5file.createTable(group, 'parameters',
+                                             self.params[:600])
+
+    def tearDown(self):
+        if self.h5file.isopen:
+            self.h5file.close()
+        if self.cache_dir is None:
+            del os.environ['IAES_CACHE_DIR']
+        else:
+            os.environ['IAES_CACHE_DIR'] = self.cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def testIncrementalUpdate(self):
+        rollup = Rollup(self.table, chunk_rows=128).update()
+        self.assertEqual(rollup.hits, 600)
+        self.table.append(self.params[600:])
+        self.table.flush()
+
+        # a new rollup starts from the sidecar and reads the new rows only
+        rollup = Rollup(self.table, chunk_rows=128)
+        self.assertTrue(rollup._load())
+        self.assertEqual(rollup.nrows, 600)
+        rollup.update()
+        self.assertEqual(rollup.nrows, 1000)
+        for width in rollup.resolutions:
+            _assert_records_equal(self, rollup.level(width),
+                                  aggregate(self.params, width))
+
+    def testRebuiltWhenRewritten(self):
+        Rollup(self.table).update()
+        self.table.modifyColumn(599, 600, column=[2000.0],
+                                colname='time_stamp')
+        self.table.flush()
+        rollup = Rollup(self.table)
+        self.assertFalse(rollup._load())
+        self.assertEqual(rollup.update().level(60.0)['bucket'][-1], 33)
+
+    def testTrend(self):
+        out = Rollup(self.table).trend(max_buckets=100)
+        self.assertEqual(out['time'][1] - out['time'][0], 10.0)
+        self.assertEqual(out['cumulative'][-1], 600)
+
+    def testRollupFile(self):
+        self.h5file.close()
+        hits = rollup_file(self.filename)
+        self.assertEqual(hits, {'/Board0/Ch0/parameters': 600})
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+#EOF
@@ -0,0 +1,77 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import unittest
+
+import numpy as np
+
+from iaes.readers.core import data_block_dtype
+from iaes.readers.row_pages import RowPages, summarize
+
+
+class CountingArray(object):
+    """A structured array recording the slices read from it."""
+
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        self.reads.append((key.start, key.stop))
+        return self.data[key]
+
+
+class TestRowPages(unittest.TestCase):
+
+    def setUp(self):
+        self.data = np.zeros((1000,), dtype=data_block_dtype)
+        self.data['block_id'] = np.arange(1000)
+        self.data['raw_data'][:, 7] = np.arange(1000)
+        self.data['raw_data'][:, 9] = -1.5
+        self.table = CountingArray(self.data)
+        self.pages = RowPages(self.table,
+                              ['block_id', 'time_stamp', 'raw_data'],
+                              page_rows=100, max_pages=2)
+
+    def testText(self):
+        self.assertEqual(self.pages.text(123, 0), '123')
+        self.assertEqual(self.pages.text(123, 2), '4096 samples [-1.5, 123]')
+        self.assertEqual(summarize(np.zeros((2, 0))), ['0 samples'] * 2)
+
+    def testPaging(self):
+        for row in range(100, 200):
+            for column in range(3):
+                self.pages.text(row, column)
+        self.assertEqual(self.table.reads, [(100, 200)])
+        self.pages.text(0, 0)
+        self.pages.text(500, 0)
+        self.pages.text(150, 0)
+        # only two pages are kept, the one of row 150 was evicted
+        self.assertEqual(self.table.reads[-1], (100, 200))
+        self.assertEqual(len(self.table.reads), 4)
+
+    def testAppendedRows(self):
+        table = CountingArray(self.data[:150])
+        pages = RowPages(table, ['block_id'], page_rows=100)
+        self.assertEqual(pages.text(120, 0), '120')
+        table.data = self.data
+        self.assertEqual(pages.text(180, 0), '180')
+        self.assertEqual(table.reads, [(100, 150), (100, 200)])
+
+
+if __name__ == "__main__":
+    unittest.main()
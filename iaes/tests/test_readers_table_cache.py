@@ -0,0 +1,77 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.table_cache import ChunkedTable
+
+
+row_dtype = np.dtype([('block_id', '<u8'),
+                      ('time_stamp', '<f8'),
+                      ('raw_data', '<f8', (16,))])
+
+
+class TestChunkedTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.h5file = openFile(os.path.join(self.tmpdir, 'cache.h5'), 'w')
+        self.data = np.zeros((100,), dtype=row_dtype)
+        self.data['block_id'] = np.arange(100)
+        self.data['time_stamp'] = np.arange(100) * 0.5
+        self.data['raw_data'] = np.random.normal(size=(100, 16))
+        self.table_ptr = self.h5file.createTable('/', 'rowdata', self.data,
+                                                 chunkshape=(4,))
+        self.table = ChunkedTable(self.table_ptr, chunk_rows=8, max_chunks=2)
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testLen(self):
+        self.assertEqual(len(self.table), 100)
+        self.assertEqual(self.table.shape, (100,))
+
+    def testRow(self):
+        self.assertEqual(self.table[17]['block_id'], 17)
+        self.assertEqual(self.table[-1]['block_id'], 99)
+        self.assertRaises(IndexError, self.table.__getitem__, 100)
+
+    def testSlice(self):
+        np.testing.assert_array_equal(self.table[5:37], self.data[5:37])
+        np.testing.assert_array_equal(self.table[90:], self.data[90:])
+        np.testing.assert_array_equal(self.table[3:50:7], self.data[3:50:7])
+
+    def testFancyIndex(self):
+        rows = [42, 3, 99, 3]
+        np.testing.assert_array_equal(self.table[rows], self.data[rows])
+
+    def testCacheIsBounded(self):
+        self.table[0:100]
+        self.assertEqual(len(self.table._chunks), 2)
+        self.assertTrue(self.table.nbytes_cached <= 16 * row_dtype.itemsize)
+
+    def testDefaultChunkRowsAreAligned(self):
+        table = ChunkedTable(self.table_ptr, chunk_bytes=1000)
+        self.assertEqual(table.chunk_rows % 4, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
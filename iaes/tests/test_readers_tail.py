@@ -0,0 +1,86 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.core import param_dtype
+from iaes.readers.tail import TableTail
+
+
+append_code = """
+import sys
+import numpy as np
+from tables import openFile
+from iaes.readers.core import param_dtype
+h5file = openFile(sys.argv[1], 'a')
+rows = np.zeros((int(sys.argv[2]),), dtype=param_dtype)
+rows['block_id'] = h5file.root.parameters.nrows + np.arange(len(rows))
+h5file.root.parameters.append(rows)
+h5file.close()
+"""
+
+
+class TestTableTail(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'tail.h5')
+        h5file = openFile(self.filename, 'w')
+        params = np.zeros((10,), dtype=param_dtype)
+        params['block_id'] = np.arange(10)
+        h5file.createTable('/', 'parameters', params)
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def append(self, n):
+        # the writer must be another process, as during an acquisition
+        subprocess.check_call([sys.executable, '-c', append_code,
+                               self.filename, str(n)])
+
+    def testPoll(self):
+        tail = TableTail(self.filename, '/parameters')
+        try:
+            self.assertEqual(tail.poll(), None)
+            self.append(5)
+            new = tail.poll()
+            self.assertEqual(new, (10, 15))
+            np.testing.assert_array_equal(tail.read(*new)['block_id'],
+                                          np.arange(10, 15))
+            self.assertEqual(tail.poll(), None)
+            self.append(3)
+            self.assertEqual(tail.poll(), (15, 18))
+        finally:
+            tail.close()
+
+    def testStart(self):
+        tail = TableTail(self.filename, '/parameters', start=4)
+        try:
+            self.append(1)
+            self.assertEqual(tail.poll(), (4, 11))
+        finally:
+            tail.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
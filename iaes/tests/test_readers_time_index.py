@@ -0,0 +1,122 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.core import param_dtype
+from iaes.readers import time_index
+from iaes.readers.time_index import TimeIndex
+
+
+class TestTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'tidx.h5')
+        self.data = np.zeros((1000,), dtype=param_dtype)
+        self.data['block_id'] = np.arange(1000)
+        self.data['time_stamp'] = np.random.uniform(0, 100, size=1000)
+        h5file = openFile(self.filename, 'w')
+        h5file.createTable('/', 'unsorted', self.data)
+        self.data.sort(order='time_stamp')
+        h5file.createTable('/', 'sorted', self.data)
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected(self, t0, t1):
+        ts = self.data['time_stamp']
+        return np.sort(self.data['block_id'][(ts >= t0) & (ts < t1)])
+
+    def check(self, mode, name):
+        h5file = openFile(self.filename, mode)
+        try:
+            index = TimeIndex(h5file.getNode('/', name))
+            rows = index.between(20.0, 30.0)
+            np.testing.assert_array_equal(np.sort(rows['block_id']),
+                                          self.expected(20.0, 30.0))
+            self.assertEqual(len(index.coordinates(20.0, 30.0)), len(rows))
+            self.assertEqual(len(index.between(200.0, 300.0)), 0)
+            first, last = index.time_range()
+            self.assertEqual(first, self.data['time_stamp'][0])
+            self.assertEqual(last, self.data['time_stamp'][-1])
+            return index
+        finally:
+            h5file.close()
+
+    def testSidecarUnsorted(self):
+        self.check('r', 'unsorted')
+        self.assertTrue(os.path.exists(
+                        os.path.join(self.filename + '.iaes',
+                                     'unsorted.tidx.npz')))
+
+    def testSidecarSorted(self):
+        self.check('r', 'sorted')
+
+    def testCacheBounded(self):
+        h5file = openFile(self.filename, 'a')
+        try:
+            for i in range(time_index.MAX_SORTED + 3):
+                table = h5file.createTable('/', 'part%d' % i, self.data)
+                TimeIndex(table, create_index=False).between(20.0, 30.0)
+            self.assertEqual(len(time_index._sorted_cache),
+                             time_index.MAX_SORTED)
+            self.assertTrue((self.filename, '/part%d' % i)
+                            in time_index._sorted_cache)
+        finally:
+            h5file.close()
+
+    def testInOrderSkipsKeys(self):
+        self.check('r', 'sorted')
+        time_index._sorted_cache.clear()
+        time_index._order_flags.clear()
+        h5file = openFile(self.filename, 'r')
+        try:
+            index = TimeIndex(h5file.root.sorted)
+            self.assertEqual(index.sort_order(), None)
+            rows = index.read_sorted(100, 200)
+            np.testing.assert_array_equal(rows, self.data[100:200])
+            self.assertEqual(index.time_range(),
+                             (self.data['time_stamp'][0],
+                              self.data['time_stamp'][-1]))
+            # the flag of the sidecar was enough
+            self.assertEqual(len(time_index._sorted_cache), 0)
+
+            index = TimeIndex(h5file.root.unsorted)
+            order = index.sort_order()
+            time_index._sorted_cache.clear()
+            rows = index.read_sorted(100, 200, order)
+            np.testing.assert_array_equal(rows, self.data[100:200])
+            self.assertEqual(len(time_index._sorted_cache), 0)
+        finally:
+            h5file.close()
+
+    def testColumnIndex(self):
+        self.check('a', 'unsorted')
+        h5file = openFile(self.filename, 'r')
+        try:
+            self.assertTrue(h5file.root.unsorted.cols.time_stamp.is_indexed)
+        finally:
+            h5file.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.lod import MinMaxPyramid
+from iaes.readers.table_cache import ChunkedTable
+from iaes.readers.waveform import scaling, decoded_dtype, decode, \
+    decode_rows, encode, fit_scaling, read_raw
+
+
+row_dtype = np.dtype([('block_id', '<u8'),
+                      ('time_stamp', '<f8'),
+                      ('raw_data', '<i2', (256,))])
+
+
+class TestCodec(unittest.TestCase):
+
+    def testRoundTrip(self):
+        volts = np.random.normal(0.0, 0.3, size=(20, 256))
+        scale = fit_scaling(volts.min(), volts.max())
+        codes = encode(volts, '<i2', scale)
+        self.assertEqual(codes.dtype, np.int16)
+        self.assertEqual(codes.min(), -32768)
+        self.assertEqual(codes.max(), 32767)
+        error = np.abs(decode(codes, scale) - volts).max()
+        self.assertTrue(error <= scale[0] / 2 * (1 + 1e-9))
+
+    def testClip(self):
+        codes = encode([-1e6, 0.0, 1e6], '<i2', (1.0, 0.0))
+        self.assertEqual(codes.tolist(), [-32768, 0, 32767])
+
+    def testFloatType(self):
+        codes = np.array([[1, -2]], dtype=np.int16)
+        values = decode(codes, (0.5, 1.0), np.float32)
+        self.assertEqual(values.dtype, np.float32)
+        self.assertEqual(values.tolist(), [[1.5, 0.0]])
+        self.assertEqual(decoded_dtype(row_dtype, np.float32)['raw_data'],
+                         np.dtype(('<f4', (256,))))
+
+    def testRowsNotCopied(self):
+        rows = np.zeros((3,), dtype=[('block_id', '<u8'),
+                                     ('raw_data', '<f8', (4,))])
+        self.assertTrue(decode_rows(rows) is rows)
+        self.assertFalse(decode_rows(rows, (2.0, 0.0)) is rows)
+
+
+class TestCompactTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.h5file = openFile(os.path.join(self.tmpdir, 'compact.h5'),
+                               'w')
+        self.data = np.zeros((40,), dtype=row_dtype)
+        self.data['block_id'] = np.arange(40)
+        self.data['time_stamp'] = np.arange(40) * 0.5
+        self.data['raw_data'] = np.random.randint(-1000, 1000, (40, 256))
+        self.data['raw_data'][5, 17] = 30000
+        channel = self.h5file.createGroup('/', 'Ch0')
+        channel._v_attrs.raw_scale = -0.001
+        channel._v_attrs.raw_offset = 0.25
+        self.table_ptr = self.h5file.createTable(channel, 'rowdata',
+                                                 self.data, chunkshape=(4,))
+        self.volts = self.data['raw_data'] * -0.001 + 0.25
+
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmpdir)
+
+    def testScaling(self):
+        self.assertEqual(scaling(self.table_ptr), (-0.001, 0.25))
+        np.testing.assert_allclose(read_raw(self.table_ptr, 3, 6),
+                                   self.volts[3:6])
+
+    def testChunkedTable(self):
+        table = ChunkedTable(self.table_ptr, chunk_rows=8, max_chunks=2)
+        self.assertEqual(table.dtype['raw_data'].base, np.float64)
+        np.testing.assert_allclose(table[5]['raw_data'], self.volts[5])
+        np.testing.assert_allclose(table[10:30]['raw_data'],
+                                   self.volts[10:30])
+        np.testing.assert_allclose(table.take([33, 2])['raw_data'],
+                                   self.volts[[33, 2]])
+        self.assertRaises(ValueError, table.__getitem__, 'raw_data')
+        np.testing.assert_array_equal(table['block_id'], np.arange(40))
+        self.assertEqual(table[12]['block_id'], 12)
+        rows = table.between(2.0, 4.0)
+        self.assertEqual(rows['block_id'].tolist(), [4, 5, 6, 7])
+        np.testing.assert_allclose(rows['raw_data'], self.volts[4:8])
+        # the cache holds the stored codes
+        self.assertEqual(table.nbytes_cached, 2 * 8 * row_dtype.itemsize)
+
+    def testFloat32View(self):
+        table = ChunkedTable(self.table_ptr, chunk_rows=8,
+                             float_type=np.float32)
+        rows = table.read(0, 10)
+        self.assertEqual(rows['raw_data'].dtype, np.float32)
+        np.testing.assert_allclose(rows['raw_data'], self.volts[:10],
+                                   atol=1e-6)
+
+    def testPyramid(self):
+        pyramid = MinMaxPyramid(self.table_ptr, base_bin=64, cache=False)
+        top = pyramid.levels[-1][0]
+        # the negative scale turns the largest code into the minimum
+        self.assertAlmostEqual(top[0], self.volts.min(), 5)
+        self.assertAlmostEqual(top[1], self.volts.max(), 5)
+        np.testing.assert_allclose(pyramid.raw(256, 300),
+                                   self.volts.ravel()[256:300])
+
+
+if __name__ == "__main__":
+    unittest.main()
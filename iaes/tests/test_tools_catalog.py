@@ -0,0 +1,111 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from tables import openFile
+
+from iaes.tools.catalog import Catalog
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.environ.get('IAES_CACHE_DIR')
+        os.environ['IAES_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+        self.data = os.path.join(self.tmpdir, 'data')
+        os.makedirs(os.path.join(self.data, 'day2'))
+        self.run1 = write_synthetic(os.path.join(self.data, 'run1.h5'),
+                                    boards=1, channels=2, blocks=20,
+                                    block_size=256)
+        self.run2 = write_synthetic(os.path.join(self.data, 'day2', 'r2.h5'),
+                                    boards=2, channels=3, blocks=10,
+                                    block_size=256)
+        with open(os.path.join(self.data, 'broken.h5'), 'w') as fid:
+            fid.write('not hdf5')
+        self.catalog = Catalog(os.path.join(self.tmpdir, 'catalog.sqlite'))
+
+    def tearDown(self):
+        self.catalog.close()
+        if self.cache_dir is None:
+            del os.environ['IAES_CACHE_DIR']
+        else:
+            os.environ['IAES_CACHE_DIR'] = self.cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def testSearch(self):
+        h5file = openFile(self.run2, 'a')
+        h5file.root.Board1._v_attrs.board = 'B1'
+        h5file.close()
+        self.assertEqual(self.catalog.update([self.data], processes=2), 3)
+        # gain is 20, 30, 40 for Ch0, Ch1, Ch2
+        self.assertEqual(self.catalog.search(channel='Ch1',
+                                             attrs={'gain': 30}),
+                         [(self.run2, 'Board0', 'Ch1'),
+                          (self.run2, 'Board1', 'Ch1'),
+                          (self.run1, 'Board0', 'Ch1')])
+        self.assertEqual(self.catalog.files(attrs={'gain': '40'}),
+                         [self.run2])
+        self.assertEqual(self.catalog.files(board='Board1'), [self.run2])
+        self.assertEqual(self.catalog.files(kind='parameters', t0=1e9), [])
+        self.assertEqual(len(self.catalog.files(kind='parameters', t0=0)), 2)
+        self.assertEqual([p for p, e in self.catalog.errors()],
+                         [os.path.join(self.data, 'broken.h5')])
+        # board attributes
+        self.assertEqual(self.catalog.files(attrs={'serial': 'SYN-0001'}),
+                         [self.run2])
+        self.assertEqual(self.catalog.search(attrs={'serial': 'SYN-0001',
+                                                    'gain': 20}),
+                         [(self.run2, 'Board1', 'Ch0')])
+        # attributes named like the other criteria
+        self.assertEqual(self.catalog.search(board='Board1',
+                                             attrs={'board': 'B1'}),
+                         [(self.run2, 'Board1', 'Ch%d' % c)
+                          for c in range(3)])
+        self.assertEqual(self.catalog.files(board='Board0',
+                                            attrs={'board': 'B1'}), [])
+
+    def testScanWritesNothing(self):
+        self.catalog.update([self.data], processes=1)
+        self.assertFalse(os.path.exists(os.environ['IAES_CACHE_DIR']))
+        h5file = openFile(self.run1, 'r')
+        stamps = h5file.root.Board0.Ch0.rowdata.col('time_stamp')
+        h5file.close()
+        self.assertEqual(self.catalog.time_range(self.run1, 'Board0', 'Ch0',
+                                                 'rowdata'),
+                         (stamps.min(), stamps.max()))
+
+    def testRescanOnlyChanged(self):
+        self.catalog.update([self.data], processes=1)
+        self.assertEqual(self.catalog.update([self.data], processes=1), 0)
+        time.sleep(0.01)
+        h5file = openFile(self.run1, 'a')
+        h5file.root.Board0.Ch0._v_attrs.gain = 99
+        h5file.close()
+        self.assertEqual(self.catalog.update([self.data], processes=1), 1)
+        self.assertEqual(self.catalog.files(attrs={'gain': 99}),
+                         [self.run1])
+        os.remove(self.run2)
+        self.catalog.update([self.data], processes=1)
+        self.assertEqual(self.catalog.files(), [self.run1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile, Filters
+
+from iaes.analysis.features import compute_parameters
+from iaes.readers.table_cache import ChunkedTable
+from iaes.readers.waveform import scaling, read_raw
+from iaes.tools.compact import compact
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestCompact(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = write_synthetic(os.path.join(self.tmpdir, 'src.h5'),
+                                   boards=1, channels=2, blocks=50,
+                                   block_size=1024,
+                                   filters=Filters(complevel=0))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _raw(self, filename, path='/Board0/Ch1/rowdata'):
+        h5file = openFile(filename, 'r')
+        try:
+            table = h5file.getNode(path)
+            return table.coldtypes['raw_data'].base, scaling(table), \
+                read_raw(table), table.read(field='block_id')
+        finally:
+            h5file.close()
+
+    def testInt16(self):
+        dst = compact(self.src, os.path.join(self.tmpdir, 'int16.h5'))
+        sample, scale, raw, block_id = self._raw(dst)
+        _, _, expected, expected_id = self._raw(self.src)
+        self.assertEqual(sample, np.int16)
+        self.assertTrue(np.abs(raw - expected).max() <= scale[0] / 2 * 1.01)
+        np.testing.assert_array_equal(block_id, expected_id)
+        self.assertTrue(os.path.getsize(dst) < os.path.getsize(self.src) / 3)
+
+        h5file = openFile(dst, 'r')
+        try:
+            channel = h5file.root.Board0.Ch1
+            self.assertEqual(channel._v_attrs.gain, 30)
+            threshold = channel._v_attrs.threshold
+            rows = ChunkedTable(channel.rowdata).between(0.0, 0.5)
+            self.assertTrue(len(rows) > 0)
+            self.assertEqual(rows['raw_data'].dtype, np.float64)
+            np.testing.assert_allclose(rows['raw_data'],
+                                       expected[:len(rows)],
+                                       atol=scale[0])
+            params = np.concatenate(list(compute_parameters(
+                channel.rowdata, threshold)))
+            np.testing.assert_allclose(params['rms'],
+                                       channel.parameters.col('rms'),
+                                       atol=scale[0])
+        finally:
+            h5file.close()
+
+    def testGivenScale(self):
+        dst = compact(self.src, os.path.join(self.tmpdir, 'adc.h5'),
+                      scale=1e-4)
+        self.assertEqual(self._raw(dst)[1], (1e-4, 0.0))
+        self.assertRaises(ValueError, compact, self.src,
+                          os.path.join(self.tmpdir, 'small.h5'), scale=1e-9)
+
+    def testFloat32AndBack(self):
+        int16 = compact(self.src, os.path.join(self.tmpdir, 'int16.h5'))
+        dst = compact(int16, os.path.join(self.tmpdir, 'f4.h5'), 'float32')
+        sample, scale, raw, _ = self._raw(dst)
+        self.assertEqual(sample, np.float32)
+        self.assertEqual(scale, None)
+        np.testing.assert_allclose(raw, self._raw(int16)[2], atol=1e-6)
+
+    def testInPlace(self):
+        compact(self.src, sample_type='float32')
+        self.assertEqual(os.listdir(self.tmpdir), ['src.h5'])
+        self.assertEqual(self._raw(self.src)[0], np.float32)
+
+    def testUnknownType(self):
+        self.assertRaises(ValueError, compact, self.src, None, 'int8')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile
+
+from iaes.readers.waveform import read_raw
+from iaes.tools import export
+from iaes.tools.compact import compact
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = write_synthetic(os.path.join(self.tmpdir, 'run.h5'),
+                                   boards=1, channels=2, blocks=50,
+                                   block_size=256)
+        self.output = os.path.join(self.tmpdir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def testNodeMetadata(self):
+        h5file = openFile(self.src, 'r')
+        try:
+            nodes = export.node_metadata(
+                h5file.getNode('/Board0/Ch1/parameters'))
+        finally:
+            h5file.close()
+        self.assertEqual(sorted(nodes), ['/', '/Board0', '/Board0/Ch1',
+                                         '/Board0/Ch1/parameters'])
+        self.assertEqual(nodes['/Board0/Ch1']['gain'], 30)
+        self.assertEqual(nodes['/Board0/Ch1']['sampling_rate'], 1e6)
+        self.assertEqual(nodes['/Board0']['serial'], u'SYN-0000')
+        json.dumps(nodes)
+
+    def testJsonable(self):
+        self.assertEqual(export._jsonable(np.float32(1.5)), 1.5)
+        self.assertEqual(export._jsonable(np.arange(3)), [0, 1, 2])
+        self.assertEqual(export._jsonable(np.array(['a', 'b'])),
+                         [u'a', u'b'])
+
+    @unittest.skipIf(export.pa is None, 'pyarrow is not installed')
+    def testParquet(self):
+        written = export.export([self.src], self.output, 'parquet',
+                                chunk_bytes=4096, processes=2)
+        self.assertEqual(len(written), 4)
+        path = os.path.join(self.output, 'run', 'rowdata',
+                            'Board0.Ch1.parquet')
+        self.assertEqual(written[path], 50)
+        table = export.pq.read_table(path)
+        h5file = openFile(self.src, 'r')
+        try:
+            rowdata = h5file.getNode('/Board0/Ch1/rowdata').read()
+        finally:
+            h5file.close()
+        self.assertEqual(set(table.column('board').to_pylist()),
+                         set(['Board0']))
+        self.assertEqual(set(table.column('channel').to_pylist()),
+                         set(['Ch1']))
+        np.testing.assert_array_equal(
+            np.array(table.column('raw_data').to_pylist()),
+            rowdata['raw_data'])
+        np.testing.assert_array_equal(
+            table.column('block_id').to_pylist(), rowdata['block_id'])
+        meta = json.loads(table.schema.metadata[b'iaes'])
+        self.assertEqual(meta['table'], '/Board0/Ch1/rowdata')
+        self.assertTrue('/Board0/Ch1' in meta['nodes'])
+
+    @unittest.skipIf(export.pa is None, 'pyarrow is not installed')
+    def testCompactInVolts(self):
+        h5file = openFile(self.src, 'r')
+        try:
+            volts = read_raw(h5file.getNode('/Board0/Ch0/rowdata'))
+        finally:
+            h5file.close()
+        compact(self.src)
+        written = export.export([self.src], self.output, 'parquet',
+                                tables=['rowdata'], processes=1)
+        path = os.path.join(self.output, 'run', 'rowdata',
+                            'Board0.Ch0.parquet')
+        self.assertEqual(written[path], 50)
+        table = export.pq.read_table(path)
+        self.assertEqual(table.column('raw_data').type,
+                         export.pa.list_(export.pa.float64(), 256))
+        np.testing.assert_allclose(
+            np.array(table.column('raw_data').to_pylist()), volts,
+            atol=1e-4)
+
+    @unittest.skipIf(export.pa is None, 'pyarrow is not installed')
+    def testArrowOnlyParameters(self):
+        written = export.export([self.src], self.output, 'arrow',
+                                tables=['parameters'], processes=1)
+        self.assertEqual(sorted(os.path.basename(p) for p in written),
+                         ['Board0.Ch0.arrow', 'Board0.Ch1.arrow'])
+        path = os.path.join(self.output, 'run', 'parameters',
+                            'Board0.Ch0.arrow')
+        reader = export.pa.ipc.open_file(export.pa.memory_map(path))
+        table = reader.read_all()
+        self.assertEqual(table.num_rows, written[path])
+        self.assertEqual(table.schema.names[:2], ['board', 'channel'])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+#EOF
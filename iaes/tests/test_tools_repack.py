@@ -0,0 +1,80 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tables import openFile, Filters
+
+from iaes.tools.repack import repack, repack_report, chunk_rows
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestRepack(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = write_synthetic(os.path.join(self.tmpdir, 'src.h5'),
+                                   boards=1, channels=2, blocks=100,
+                                   block_size=1024,
+                                   filters=Filters(complevel=0))
+        h5file = openFile(self.src, 'a')
+        h5file.root.Board0.Ch1.parameters.cols.time_stamp.createCSIndex()
+        h5file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertSameContent(self, dst):
+        src = openFile(self.src, 'r')
+        out = openFile(dst, 'r')
+        try:
+            for path in ('/Board0/Ch0/rowdata', '/Board0/Ch1/parameters'):
+                a = src.getNode(path)
+                b = out.getNode(path)
+                np.testing.assert_array_equal(a.read(), b.read())
+                self.assertTrue(b.filters.complib.startswith('blosc'))
+                self.assertTrue(b.filters.shuffle)
+                self.assertEqual(b.chunkshape, (chunk_rows(b),))
+            self.assertEqual(out.root.Board0._v_attrs.serial, 'SYN-0000')
+            self.assertEqual(out.root.Board0.Ch1._v_attrs.gain, 30)
+            self.assertTrue(
+                out.root.Board0.Ch1.parameters.colindexed['time_stamp'])
+        finally:
+            src.close()
+            out.close()
+
+    def testRepack(self):
+        dst = repack(self.src, os.path.join(self.tmpdir, 'dst.h5'))
+        self.assertSameContent(dst)
+
+    def testReport(self):
+        report = repack_report(self.src, os.path.join(self.tmpdir, 'r.h5'))
+        self.assertTrue(report['size_after'] < report['size_before'])
+        self.assertTrue(report['read_mb_per_s_after'] > 0)
+
+    def testInPlace(self):
+        backup = os.path.join(self.tmpdir, 'backup.h5')
+        shutil.copy(self.src, backup)
+        repack(self.src)
+        self.assertEqual(os.listdir(self.tmpdir).count('src.h5'), 1)
+        self.src, dst = backup, self.src
+        self.assertSameContent(dst)
+
+
+if __name__ == "__main__":
+    unittest.main()
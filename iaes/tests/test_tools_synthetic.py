@@ -0,0 +1,64 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from iaes.readers.core import IAESFile, param_dtype
+from iaes.tools.benchmark import BENCHMARKS, run
+from iaes.tools.synthetic import write_synthetic
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = write_synthetic(os.path.join(self.tmpdir, 's.h5'),
+                                        boards=2, channels=3, blocks=300,
+                                        block_size=1024)
+        self.cache_dir = os.environ.get('IAES_CACHE_DIR')
+        os.environ['IAES_CACHE_DIR'] = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        if self.cache_dir is None:
+            del os.environ['IAES_CACHE_DIR']
+        else:
+            os.environ['IAES_CACHE_DIR'] = self.cache_dir
+        shutil.rmtree(self.tmpdir)
+
+    def testLayout(self):
+        with IAESFile(self.filename) as f:
+            self.assertEqual(f.boards(), ['Board0', 'Board1'])
+            self.assertEqual(f.channels('Board1'), ['Ch0', 'Ch1', 'Ch2'])
+            self.assertEqual(f.meta('Board0', 'Ch1')['gain'], 30)
+            rowdata = f.rowdata('Board1', 'Ch2').read()
+            params = f.parameters('Board1', 'Ch2').read()
+        self.assertEqual(rowdata['raw_data'].shape, (300, 1024))
+        self.assertEqual(params.dtype, param_dtype)
+        np.testing.assert_array_equal(params['block_id'], np.arange(300))
+        self.assertTrue(np.all(np.diff(params['time_stamp']) > 0))
+
+    def testBenchmarks(self):
+        results = run(self.filename, repeat=1)
+        self.assertEqual([r['name'] for r in results],
+                         [name for name, func in BENCHMARKS])
+        self.assertTrue(all(r['best'] >= 0 for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
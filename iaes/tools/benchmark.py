@@ -0,0 +1,272 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Reproducible performance benchmarks of the reader, run on a synthetic
+file of configurable size. Results are written as JSON so that runs of
+different versions can be compared:
+
+    python -m iaes.tools.benchmark --blocks 20000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+import numpy as np
+import tables
+
+from iaes.analysis.features import compute_parameters
+from iaes.analysis.similarity import SimilarityIndex
+from iaes.readers import time_index
+from iaes.readers.core import IAESFile, open_file, iter_boards, \
+    iter_channels, iter_tables, node_meta
+from iaes.readers.lod import MinMaxPyramid
+from iaes.readers.sidecar import sidecar_path
+from iaes.readers.time_index import TimeIndex
+from iaes.tools.synthetic import write_synthetic
+
+
+# (name, function) pairs in the order they are run
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """Register a benchmark. The function receives the Context, does the
+    timed work once and returns the number of bytes it processed (or
+    None)."""
+    def register(func):
+        BENCHMARKS.append((name, func))
+        return func
+    return register
+
+
+class Context(object):
+    """What the benchmarks run on: an open file and one of its channels.
+    """
+
+    def __init__(self, filename, seed=0):
+        self.filename = filename
+        self.f = IAESFile(filename)
+        self.board = self.f.boards()[0]
+        self.channel = self.f.channels(self.board)[0]
+        self.rowdata = self.f.table_ptr(self.board, self.channel, 'rowdata')
+        self.parameters = self.f.table_ptr(self.board, self.channel,
+                                           'parameters')
+        self.rng = np.random.RandomState(seed)
+
+    def close(self):
+        self.f.close()
+
+
+@benchmark('file_open')
+def bench_file_open(ctx):
+    open_file(ctx.filename).close()
+
+
+@benchmark('tree_build')
+def bench_tree_build(ctx):
+    h5file = open_file(ctx.filename)
+    try:
+        for board in iter_boards(h5file):
+            node_meta(board)
+            for channel in iter_channels(board):
+                node_meta(channel)
+                list(iter_tables(channel))
+    finally:
+        h5file.close()
+
+
+@benchmark('parameters_load')
+def bench_parameters_load(ctx):
+    return ctx.f.parameters(ctx.board, ctx.channel).read().nbytes
+
+
+@benchmark('rowdata_page')
+def bench_rowdata_page(ctx):
+    # 20 pages of 50 rows at random positions, as when scrolling a table
+    table = ctx.f.rowdata(ctx.board, ctx.channel)
+    nbytes = 0
+    for start in ctx.rng.randint(0, max(1, len(table) - 50), 20):
+        nbytes += table[start:start + 50].nbytes
+    return nbytes
+
+
+@benchmark('rowdata_page_mmap')
+def bench_rowdata_page_mmap(ctx):
+    # same as rowdata_page, served from the memory-mapped column cache
+    table = ctx.f.rowdata(ctx.board, ctx.channel, mmap_cache=True)
+    nbytes = 0
+    for start in ctx.rng.randint(0, max(1, len(table) - 50), 20):
+        nbytes += table[start:start + 50].nbytes
+    return nbytes
+
+
+@benchmark('time_index_build')
+def bench_time_index_build(ctx):
+    time_index._sorted_cache.clear()
+    time_index._order_flags.clear()
+    index = TimeIndex(ctx.parameters)
+    path = sidecar_path(ctx.parameters, 'tidx.npz')
+    if os.path.exists(path):
+        os.remove(path)
+    index.time_range()
+    return ctx.parameters.nrows * 8
+
+
+@benchmark('time_window_query')
+def bench_time_window_query(ctx):
+    # 20 windows of 1% of the time range each
+    index = TimeIndex(ctx.rowdata)
+    first, last = index.time_range()
+    span = 0.01 * (last - first)
+    nbytes = 0
+    for t0 in ctx.rng.uniform(first, last - span, 20):
+        nbytes += index.between(t0, t0 + span).nbytes
+    return nbytes
+
+
+@benchmark('feature_extraction')
+def bench_feature_extraction(ctx):
+    for params in compute_parameters(ctx.rowdata, 0.1):
+        pass
+    return ctx.rowdata.nrows * ctx.rowdata.rowsize
+
+
+@benchmark('lod_build')
+def bench_lod_build(ctx):
+    MinMaxPyramid(ctx.rowdata, cache=False).build()
+    return ctx.rowdata.nrows * ctx.rowdata.rowsize
+
+
+@benchmark('plot_prepare')
+def bench_plot_prepare(ctx):
+    # 20 views of random span drawn 1000 pixels wide
+    pyramid = MinMaxPyramid(ctx.rowdata)
+    pyramid.levels
+    n = pyramid.n_samples
+    nbytes = 0
+    for span in np.logspace(3, np.log10(n), 20).astype(int):
+        start = ctx.rng.randint(0, max(1, n - span))
+        x, y = pyramid.line(start, start + span, 1000)
+        nbytes += y.nbytes
+    return nbytes
+
+
+@benchmark('similarity_build')
+def bench_similarity_build(ctx):
+    SimilarityIndex(ctx.rowdata).build()
+    return ctx.rowdata.nrows * ctx.rowdata.rowsize
+
+
+@benchmark('similarity_search')
+def bench_similarity_search(ctx):
+    # 20 searches of the blocks like a random one
+    index = SimilarityIndex(ctx.rowdata).load()
+    for row in ctx.rng.randint(0, ctx.rowdata.nrows, 20):
+        index.search_row(row, k=50)
+    return 20 * index.vectors.nbytes
+
+
+def run(filename, repeat=3, names=None):
+    """Run the benchmarks on a file and return a list of results."""
+    ctx = Context(filename)
+    results = []
+    try:
+        for name, func in BENCHMARKS:
+            if names and name not in names:
+                continue
+            times = []
+            for i in range(repeat):
+                t = default_timer()
+                nbytes = func(ctx)
+                times.append(default_timer() - t)
+            result = {'name': name,
+                      'best': min(times),
+                      'mean': sum(times) / len(times),
+                      'repeat': repeat}
+            if nbytes:
+                result['bytes'] = int(nbytes)
+                result['mb_per_s'] = nbytes / 1e6 / max(min(times), 1e-9)
+            results.append(result)
+    finally:
+        ctx.close()
+    return results
+
+
+def environment():
+    return {'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'tables': tables.__version__,
+            'hdf5': tables.hdf5Version,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the IAES reader on a synthetic file.')
+    parser.add_argument('--boards', type=int, default=2)
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--blocks', type=int, default=5000,
+                        help='rowdata rows per channel')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--file',
+                        help='benchmark this file instead of a synthetic one')
+    parser.add_argument('--only', action='append',
+                        help='run only this benchmark (may be repeated)')
+    parser.add_argument('--output', help='JSON output file (default stdout)')
+    parser.add_argument('--keep', action='store_true',
+                        help='keep the synthetic file and its sidecars')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='iaes-bench-')
+    os.environ['IAES_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    try:
+        filename = args.file
+        config = {'file': filename}
+        if filename is None:
+            filename = os.path.join(workdir, 'synthetic.h5')
+            t = default_timer()
+            write_synthetic(filename, args.boards, args.channels,
+                            args.blocks)
+            config = {'boards': args.boards, 'channels': args.channels,
+                      'blocks': args.blocks,
+                      'generate_seconds': default_timer() - t}
+        config['file_bytes'] = os.path.getsize(filename)
+        report = {'environment': environment(),
+                  'config': config,
+                  'results': run(filename, args.repeat, args.only)}
+    finally:
+        if args.keep:
+            sys.stderr.write('kept %s\n' % workdir)
+        else:
+            shutil.rmtree(workdir)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fid:
+            fid.write(text + '\n')
+    else:
+        print text
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF
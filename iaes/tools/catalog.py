@@ -0,0 +1,423 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+SQLite catalog of the boards, channels, attributes, row counts and time
+ranges of many IAES files, to find the runs matching some criteria
+without opening every file.
+
+    python -m iaes.tools.catalog scan /data/campaign
+    python -m iaes.tools.catalog search --channel Ch1 --attr gain=30
+
+Files are scanned by a pool of worker processes and scanned again only
+when their size or modification time changed.
+"""
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from iaes.readers.core import open_file, iter_boards, iter_channels, \
+    iter_tables, table_kind, node_meta
+
+
+# Used when neither a path nor the IAES_CATALOG variable is given
+DEFAULT_PATH = os.path.join('~', '.iaes', 'catalog.sqlite')
+
+# Names of the files scanned in directories
+PATTERNS = ('*.h5', '*.hdf5')
+
+# Time stamps read at a time to find the time range of a table
+CHUNK_ROWS = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL,
+    size INTEGER,
+    scanned REAL,
+    error TEXT);
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    board TEXT NOT NULL,
+    channel TEXT);
+CREATE TABLE IF NOT EXISTS attrs (
+    node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT,
+    num REAL);
+CREATE TABLE IF NOT EXISTS tables (
+    node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    kind TEXT,
+    nrows INTEGER,
+    t_first REAL,
+    t_last REAL);
+CREATE INDEX IF NOT EXISTS nodes_file ON nodes(file_id);
+CREATE INDEX IF NOT EXISTS nodes_names ON nodes(board, channel);
+CREATE INDEX IF NOT EXISTS attrs_value ON attrs(name, value);
+CREATE INDEX IF NOT EXISTS attrs_num ON attrs(name, num);
+CREATE INDEX IF NOT EXISTS attrs_node ON attrs(node_id);
+CREATE INDEX IF NOT EXISTS tables_node ON tables(node_id);
+"""
+
+
+def _attr_value(value):
+    """Return the (text, number) stored for an attribute value."""
+    if isinstance(value, np.ndarray) and value.size == 1:
+        value = value.item()
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, long, float)):
+        return repr(value), float(value)
+    if isinstance(value, basestring):
+        try:
+            return value, float(value)
+        except ValueError:
+            return value, None
+    return repr(value), None
+
+
+def _attrs(node):
+    return [(name,) + _attr_value(value)
+            for name, value in sorted(node_meta(node).items())]
+
+
+def time_range(table, column='time_stamp', chunk_rows=CHUNK_ROWS):
+    """Return the (first, last) time stamps of a table, or None if it is
+    empty: from the column index if there is one, otherwise the min and
+    max of the column read a chunk at a time. Nothing is written, neither
+    in the file nor next to it.
+    """
+    n = table.nrows
+    if n == 0:
+        return None
+    if getattr(table.cols, column).is_indexed:
+        first = table.readSorted(column, field=column, start=0, stop=1)
+        last = table.readSorted(column, field=column, start=n - 1, stop=n)
+        return first[0], last[0]
+    first, last = np.inf, -np.inf
+    for start in range(0, n, chunk_rows):
+        values = table.read(start, min(start + chunk_rows, n), field=column)
+        first = min(first, values.min())
+        last = max(last, values.max())
+    return first, last
+
+
+def scan_file(path):
+    """Return what the catalog records of a file as a picklable dict:
+    {'path', 'mtime', 'size', 'boards': [...], 'error'}.
+    """
+    st = os.stat(path)
+    info = {'path': path, 'mtime': st.st_mtime, 'size': st.st_size,
+            'boards': [], 'error': None}
+    try:
+        h5file = open_file(path, 'r')
+    except Exception, e:
+        info['error'] = str(e)
+        return info
+    try:
+        for board in iter_boards(h5file):
+            channels = []
+            for channel in iter_channels(board):
+                tables = []
+                for table in iter_tables(channel):
+                    t_range = None
+                    if 'time_stamp' in table.colnames:
+                        t_range = time_range(table)
+                    t_first, t_last = t_range or (None, None)
+                    tables.append((table._v_name, table_kind(table),
+                                   int(table.nrows),
+                                   None if t_first is None else float(t_first),
+                                   None if t_last is None else float(t_last)))
+                channels.append({'name': channel._v_name,
+                                 'attrs': _attrs(channel),
+                                 'tables': tables})
+            info['boards'].append({'name': board._v_name,
+                                   'attrs': _attrs(board),
+                                   'channels': channels})
+    except Exception, e:
+        info['error'] = str(e)
+    finally:
+        h5file.close()
+    return info
+
+
+def find_files(paths, patterns=PATTERNS):
+    """Return the absolute names of the files below the given directories
+    (or the given files) matching one of the patterns.
+    """
+    found = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = [d for d in dirs if not d.endswith('.iaes')]
+            for name in files:
+                if any(fnmatch.fnmatch(name, p) for p in patterns):
+                    found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+class Catalog(object):
+    """SQLite catalog of IAES files.
+
+    >>> catalog = Catalog()
+    >>> catalog.update(['/data/campaign'])
+    >>> catalog.files(channel='Ch1', attrs={'gain': 30})
+    ['/data/campaign/run_0042.h5', ...]
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.environ.get('IAES_CATALOG') or DEFAULT_PATH
+        path = os.path.expanduser(path)
+        if path != ':memory:' and not os.path.isdir(os.path.dirname(
+                os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _stale(self, filenames):
+        known = dict((row[0], (row[1], row[2])) for row in
+                     self.db.execute('SELECT path, mtime, size FROM files'))
+        stale = []
+        for filename in filenames:
+            st = os.stat(filename)
+            if known.get(filename) != (st.st_mtime, st.st_size):
+                stale.append(filename)
+        return stale
+
+    def _store(self, info):
+        db = self.db
+        db.execute('DELETE FROM files WHERE path = ?', (info['path'],))
+        file_id = db.execute(
+            'INSERT INTO files (path, mtime, size, scanned, error) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (info['path'], info['mtime'], info['size'], time.time(),
+             info['error'])).lastrowid
+        for board in info['boards']:
+            node_id = db.execute(
+                'INSERT INTO nodes (file_id, board) VALUES (?, ?)',
+                (file_id, board['name'])).lastrowid
+            db.executemany('INSERT INTO attrs VALUES (?, ?, ?, ?)',
+                           [(node_id,) + a for a in board['attrs']])
+            for channel in board['channels']:
+                node_id = db.execute(
+                    'INSERT INTO nodes (file_id, board, channel) '
+                    'VALUES (?, ?, ?)',
+                    (file_id, board['name'], channel['name'])).lastrowid
+                db.executemany('INSERT INTO attrs VALUES (?, ?, ?, ?)',
+                               [(node_id,) + a for a in channel['attrs']])
+                db.executemany('INSERT INTO tables VALUES (?, ?, ?, ?, ?, ?)',
+                               [(node_id,) + t for t in channel['tables']])
+
+    def update(self, paths, processes=None, patterns=PATTERNS,
+               progress=None):
+        """Scan the new and changed files below the given directories and
+        forget the files that disappeared from them. Returns the number
+        of files scanned.
+
+        `processes` defaults to the number of CPUs, 1 scans in the current
+        process. `progress(done, total, path)` is called after each file.
+        """
+        filenames = find_files(paths, patterns)
+        roots = [os.path.abspath(p) for p in paths]
+        present = set(filenames)
+        for (path,) in list(self.db.execute('SELECT path FROM files')):
+            below = any(path == r or path.startswith(r.rstrip(os.sep) +
+                                                     os.sep) for r in roots)
+            if below and path not in present:
+                self.db.execute('DELETE FROM files WHERE path = ?', (path,))
+
+        stale = self._stale(filenames)
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        processes = max(1, min(processes, len(stale)))
+        pool = None
+        if processes == 1:
+            results = (scan_file(f) for f in stale)
+        else:
+            pool = multiprocessing.Pool(processes)
+            results = pool.imap_unordered(scan_file, stale)
+        try:
+            for done, info in enumerate(results):
+                self._store(info)
+                if progress is not None:
+                    progress(done + 1, len(stale), info['path'])
+            self.db.commit()
+            if pool is not None:
+                pool.close()
+        except:
+            self.db.rollback()
+            if pool is not None:
+                pool.terminate()
+            raise
+        finally:
+            if pool is not None:
+                pool.join()
+        return len(stale)
+
+    def search(self, board=None, channel=None, kind=None, t0=None, t1=None,
+               attrs=None):
+        """Return the sorted (path, board, channel) of the channels
+        matching all the given criteria: board and channel names (which
+        may use SQL LIKE wildcards), a table kind ('rowdata' or
+        'parameters'), data overlapping the time range [t0, t1) and
+        attribute values of the channel or of its board, given as a
+        dictionary, e.g. attrs={'gain': 30, 'serial': 'SYN-0001'}.
+        """
+        sql = ['SELECT DISTINCT f.path, n.board, n.channel FROM nodes n '
+               'JOIN files f ON f.id = n.file_id '
+               'LEFT JOIN nodes b ON b.file_id = n.file_id '
+               'AND b.board = n.board AND b.channel IS NULL '
+               'WHERE n.channel IS NOT NULL']
+        args = []
+        if board is not None:
+            sql.append('AND n.board LIKE ?')
+            args.append(board)
+        if channel is not None:
+            sql.append('AND n.channel LIKE ?')
+            args.append(channel)
+        if kind is not None or t0 is not None or t1 is not None:
+            cond = ['SELECT 1 FROM tables t WHERE t.node_id = n.id']
+            if kind is not None:
+                cond.append('AND t.kind = ?')
+                args.append(kind)
+            if t1 is not None:
+                cond.append('AND t.t_first < ?')
+                args.append(t1)
+            if t0 is not None:
+                cond.append('AND t.t_last >= ?')
+                args.append(t0)
+            sql.append('AND EXISTS (%s)' % ' '.join(cond))
+        for name, value in sorted((attrs or {}).items()):
+            text, num = _attr_value(value)
+            if num is not None:
+                sql.append('AND EXISTS (SELECT 1 FROM attrs a WHERE '
+                           'a.node_id IN (n.id, b.id) AND a.name = ? '
+                           'AND a.num = ?)')
+                args.extend([name, num])
+            else:
+                sql.append('AND EXISTS (SELECT 1 FROM attrs a WHERE '
+                           'a.node_id IN (n.id, b.id) AND a.name = ? '
+                           'AND a.value = ?)')
+                args.extend([name, text])
+        sql.append('ORDER BY f.path, n.board, n.channel')
+        return self.db.execute(' '.join(sql), args).fetchall()
+
+    def files(self, **criteria):
+        """Return the sorted names of the files having a channel matching
+        the criteria of search()."""
+        return sorted(set(row[0] for row in self.search(**criteria)))
+
+    def time_range(self, path, board, channel, name):
+        """Return the (first, last) time stamps recorded for a table, or
+        None if the catalog does not know it (or it is empty, or the file
+        changed since it was scanned).
+        """
+        path = os.path.abspath(path)
+        row = self.db.execute(
+            'SELECT t.t_first, t.t_last, f.mtime, f.size FROM tables t '
+            'JOIN nodes n ON n.id = t.node_id '
+            'JOIN files f ON f.id = n.file_id '
+            'WHERE f.path = ? AND n.board = ? AND n.channel = ? '
+            'AND t.name = ?',
+            (path, board, channel, name)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_mtime, st.st_size) != (row[2], row[3]):
+            return None
+        return row[0], row[1]
+
+    def errors(self):
+        """Return the (path, error) of the files that could not be read."""
+        return self.db.execute('SELECT path, error FROM files '
+                               'WHERE error IS NOT NULL '
+                               'ORDER BY path').fetchall()
+
+
+def _parse_attr(text):
+    name, _, value = text.partition('=')
+    if not _:
+        raise argparse.ArgumentTypeError('expected NAME=VALUE: %r' % text)
+    return name, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Catalog of the metadata of many IAES files.')
+    parser.add_argument('--db', help='catalog file (default $IAES_CATALOG '
+                                     'or %s)' % DEFAULT_PATH)
+    commands = parser.add_subparsers(dest='command')
+    scan = commands.add_parser('scan', help='add or update files')
+    scan.add_argument('paths', nargs='+')
+    scan.add_argument('--processes', type=int)
+    search = commands.add_parser('search', help='list matching channels')
+    search.add_argument('--board')
+    search.add_argument('--channel')
+    search.add_argument('--kind')
+    search.add_argument('--t0', type=float)
+    search.add_argument('--t1', type=float)
+    search.add_argument('--attr', type=_parse_attr, action='append',
+                        default=[],
+                        help='channel or board attribute NAME=VALUE')
+    search.add_argument('--files', action='store_true',
+                        help='only list the file names')
+    args = parser.parse_args(argv)
+
+    with Catalog(args.db) as catalog:
+        if args.command == 'scan':
+            n = catalog.update(args.paths, args.processes)
+            sys.stdout.write('%d files scanned\n' % n)
+            for path, error in catalog.errors():
+                sys.stderr.write('%s: %s\n' % (path, error))
+            return
+        criteria = dict(board=args.board, channel=args.channel,
+                        kind=args.kind, t0=args.t0, t1=args.t1,
+                        attrs=dict(args.attr))
+        if args.files:
+            for path in catalog.files(**criteria):
+                sys.stdout.write(path + '\n')
+        else:
+            for row in catalog.search(**criteria):
+                sys.stdout.write('%s\t%s\t%s\n' % row)
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF
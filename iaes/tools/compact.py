@@ -0,0 +1,178 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Rewrite IAES files with their waveforms stored compactly (see
+iaes.readers.waveform): 16 bit integers with a scale and an offset per
+channel, 4 times smaller than float64, or float32, 2 times smaller.
+Everything else is copied as by repack, which also sets the layout and
+the compression of the new file.
+
+    python -m iaes.tools.compact run1.h5 --sample-type int16 --output compact/
+
+Without --output the files are replaced in place, atomically. The int16
+scale is fitted to the range of the samples of each channel, the error
+being at most half of it; give the ADC step (--scale, volts per code)
+to store the codes of a 16 bit digitizer exactly.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from iaes.readers.core import table_kind, ROWDATA
+from iaes.readers.waveform import RAW_DATA, SCALE, OFFSET, scaling, \
+    decode, encode, fit_scaling
+from iaes.tools.repack import rewrite, _copy_table, CHUNK_BYTES, \
+    COPY_BYTES
+
+
+SAMPLE_TYPES = {'int16': '<i2', 'float32': '<f4', 'float64': '<f8'}
+
+
+def compact_dtype(dtype, sample_type):
+    """Return a rowdata dtype with its samples stored as `sample_type`."""
+    return np.dtype([(name, sample_type, dtype[name].shape)
+                     if name == RAW_DATA else (name, dtype[name])
+                     for name in dtype.names])
+
+
+def sample_range(table):
+    """Return the (min, max) volts of the waveforms of a rowdata table,
+    streaming it."""
+    scale = scaling(table)
+    step = max(1, COPY_BYTES // max(1, table.rowsize))
+    lo, hi = np.inf, -np.inf
+    for start in range(0, table.nrows, step):
+        raw = table.read(start, min(start + step, table.nrows),
+                         field=RAW_DATA)
+        values = decode(np.array([raw.min(), raw.max()]), scale)
+        lo = min(lo, values.min())
+        hi = max(hi, values.max())
+    if lo > hi:
+        return 0.0, 0.0
+    return float(lo), float(hi)
+
+
+def channel_scaling(table, sample_type, scale=None):
+    """Return the (scale, offset) storing the waveforms of a rowdata table
+    as integers of `sample_type`, None for floating point samples. With
+    `scale` (volts per code) the offset is 0 and the samples must fit.
+    """
+    sample_type = np.dtype(sample_type)
+    if sample_type.kind == 'f':
+        return None
+    lo, hi = sample_range(table)
+    if scale is None:
+        return fit_scaling(lo, hi, sample_type)
+    info = np.iinfo(sample_type)
+    if np.round(lo / scale) < info.min or np.round(hi / scale) > info.max:
+        raise ValueError('the samples of %s, in [%g, %g] V, do not fit %s '
+                         'codes of %g V' % (table._v_pathname, lo, hi,
+                                            sample_type, scale))
+    return float(scale), 0.0
+
+
+def _compact_table(src, parent, filters, chunk_bytes, sample_type,
+                   scale=None):
+    sample_type = np.dtype(sample_type)
+    if table_kind(src) != ROWDATA or RAW_DATA not in src.colnames:
+        return _copy_table(src, parent, filters, chunk_bytes)
+    old = scaling(src)
+    if src.coldtypes[RAW_DATA].base == sample_type and scale is None and \
+            (sample_type.kind == 'f' or old is not None):
+        # already stored so
+        return _copy_table(src, parent, filters, chunk_bytes)
+    new = channel_scaling(src, sample_type, scale)
+    dtype = compact_dtype(src.dtype, sample_type)
+    dst = parent._v_file.createTable(parent, src._v_name, dtype,
+                                     title=src._v_title, filters=filters,
+                                     expectedrows=max(1, src.nrows),
+                                     chunkshape=(max(1, chunk_bytes //
+                                                     dtype.itemsize),))
+    src._v_attrs._f_copy(dst)
+    step = max(1, COPY_BYTES // max(1, src.rowsize))
+    for start in range(0, src.nrows, step):
+        rows = src.read(start, min(start + step, src.nrows))
+        out = np.empty(rows.shape, dtype=dtype)
+        for name in dtype.names:
+            if name == RAW_DATA:
+                out[name] = encode(decode(rows[name], old), sample_type, new)
+            else:
+                out[name] = rows[name]
+        dst.append(out)
+    dst.flush()
+    for name in src.colnames:
+        if src.colindexed[name]:
+            getattr(dst.cols, name).createCSIndex()
+
+    # the channel attributes were copied with its group
+    attrs = parent._v_attrs
+    if new is None:
+        for name in (SCALE, OFFSET):
+            if name in attrs._f_list('user'):
+                delattr(attrs, name)
+    else:
+        setattr(attrs, SCALE, new[0])
+        setattr(attrs, OFFSET, new[1])
+    return dst
+
+
+def compact(src, dst=None, sample_type='int16', scale=None, filters=None,
+            chunk_bytes=CHUNK_BYTES):
+    """Rewrite the IAES file `src` into `dst` (by default replacing `src`)
+    with its waveforms stored as 'int16', 'float32' or 'float64' samples,
+    streaming every table. Returns the name of the written file.
+    """
+    if sample_type not in SAMPLE_TYPES:
+        raise ValueError('unknown sample type %r (one of %s)'
+                         % (sample_type, ', '.join(sorted(SAMPLE_TYPES))))
+    sample_type = SAMPLE_TYPES[sample_type]
+
+    def copy_table(table, parent, filters, chunk_bytes):
+        return _compact_table(table, parent, filters, chunk_bytes,
+                              sample_type, scale)
+    return rewrite(src, dst, filters, chunk_bytes, copy_table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rewrite IAES files with compact waveforms.')
+    parser.add_argument('filenames', nargs='+')
+    parser.add_argument('--output',
+                        help='directory of the rewritten files (default: '
+                             'replace the files in place)')
+    parser.add_argument('--sample-type', choices=sorted(SAMPLE_TYPES),
+                        default='int16')
+    parser.add_argument('--scale', type=float,
+                        help='int16 step in volts per code (default: '
+                             'fitted to each channel)')
+    args = parser.parse_args(argv)
+
+    if args.output and not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for filename in args.filenames:
+        dst = None
+        if args.output:
+            dst = os.path.join(args.output, os.path.basename(filename))
+        size_before = os.path.getsize(filename)
+        target = compact(filename, dst, args.sample_type, args.scale)
+        sys.stdout.write('%s: %.1f MB -> %.1f MB\n'
+                         % (target, size_before / 1e6,
+                            os.path.getsize(target) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF
@@ -0,0 +1,268 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Export of the tables of IAES files to columnar files that can be read
+without PyTables: Parquet or Arrow IPC (feather v2), through pyarrow.
+The tables are streamed a chunk of rows at a time, so memory use does
+not depend on their size, and channels are exported in parallel:
+
+    python -m iaes.tools.export run1.h5 --output exported/ --processes 4
+
+Every table of a channel becomes
+'<output>/<file>/<table>/<board>.<channel>.parquet', with the board and
+the channel as columns and waveforms as fixed size lists of float64
+volts, compact waveforms (see iaes.readers.waveform) being decoded. The
+attributes of the file, board, channel and table nodes are stored as
+JSON in the 'iaes' key of the file metadata.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from iaes.analysis.parallel import map_channels
+from iaes.readers.core import iter_tables, node_meta
+from iaes.readers.waveform import scaling, decode_rows, decoded_dtype
+
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Bytes of table rows converted and written at a time
+CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('exporting needs pyarrow (pip install pyarrow)')
+
+
+def _jsonable(value):
+    """Return an attribute value as something json can write."""
+    if isinstance(value, np.ndarray):
+        return [_jsonable(v) for v in value.tolist()] \
+            if value.dtype.kind not in 'biuf' else value.tolist()
+    if isinstance(value, np.generic):
+        return _jsonable(value.item())
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (bool, int, long, float, unicode)) or \
+            value is None:
+        return value
+    return repr(value)
+
+
+def node_metadata(table):
+    """Return {path: attributes} of a table and of the groups above it.
+    """
+    nodes = {}
+    node = table
+    while True:
+        nodes[node._v_pathname] = dict(
+            (name, _jsonable(value))
+            for name, value in node_meta(node).items())
+        if node._v_pathname == '/':
+            break
+        node = node._v_parent
+    return nodes
+
+
+def arrow_type(dtype):
+    """Return the Arrow type of a column: array columns (the waveforms)
+    are fixed size lists of samples, with no offsets to overflow."""
+    base = pa.from_numpy_dtype(dtype.base)
+    if dtype.shape:
+        return pa.list_(base, int(np.prod(dtype.shape)))
+    return base
+
+
+def table_schema(table, metadata=None):
+    """Return the Arrow schema of the export of a table, its waveforms
+    decoded to volts."""
+    dtype = decoded_dtype(table.dtype)
+    fields = [pa.field('board', pa.string()), pa.field('channel', pa.string())]
+    fields += [pa.field(name, arrow_type(dtype[name]))
+               for name in dtype.names]
+    return pa.schema(fields, metadata=metadata)
+
+
+def record_batch(rows, board, channel, schema):
+    """Convert a chunk of rows of a table to an Arrow RecordBatch, the
+    array columns without copying their samples.
+    """
+    n = len(rows)
+    arrays = [pa.array([board] * n, type=pa.string()),
+              pa.array([channel] * n, type=pa.string())]
+    for field in list(schema)[2:]:
+        column = rows[field.name]
+        if column.ndim > 1:
+            values = np.ascontiguousarray(column).reshape(-1)
+            arrays.append(pa.FixedSizeListArray.from_arrays(
+                pa.array(values), field.type.list_size))
+        else:
+            arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Writer(object):
+    """Writes RecordBatches to a Parquet or an Arrow IPC file."""
+
+    def __init__(self, path, schema, fmt, compression):
+        self.fmt = fmt
+        if fmt == 'parquet':
+            self.sink = None
+            self.writer = pq.ParquetWriter(path, schema,
+                                           compression=compression)
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, schema)
+
+    def write(self, batch):
+        if self.fmt == 'parquet':
+            # one row group per chunk of rows
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            if self.sink is not None:
+                self.sink.close()
+
+
+def export_table(table, path, fmt='parquet', compression='snappy',
+                 chunk_bytes=CHUNK_BYTES):
+    """Stream one table of an open IAES file to `path`, written
+    atomically. Returns the number of rows written.
+    """
+    _require_pyarrow()
+    channel = table._v_parent
+    metadata = {'iaes': json.dumps({
+        'source': os.path.abspath(table._v_file.filename),
+        'table': table._v_pathname,
+        'nodes': node_metadata(table)})}
+    schema = table_schema(table, metadata)
+    board_name = channel._v_parent._v_name
+    channel_name = channel._v_name
+    scale = scaling(table)
+    step = max(1, chunk_bytes // decoded_dtype(table.dtype).itemsize)
+
+    if not os.path.isdir(os.path.dirname(path)):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            # created by another worker in the meantime
+            if not os.path.isdir(os.path.dirname(path)):
+                raise
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    writer = _Writer(tmp, schema, fmt, compression)
+    try:
+        try:
+            for start in range(0, table.nrows, step):
+                rows = decode_rows(table.read(start, start + step), scale)
+                writer.write(record_batch(rows, board_name, channel_name,
+                                          schema))
+        finally:
+            writer.close()
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return table.nrows
+
+
+def export_channel(channel, output, fmt='parquet', tables=None,
+                   compression='snappy', chunk_bytes=CHUNK_BYTES):
+    """Export the tables of a channel group (all its rowdata and
+    parameters tables, or those named in `tables`). Returns {path: rows}.
+    """
+    stem = os.path.splitext(os.path.basename(channel._v_file.filename))[0]
+    written = {}
+    for table in iter_tables(channel):
+        if tables is not None and table._v_name not in tables:
+            continue
+        path = os.path.join(output, stem, table._v_name, '%s.%s%s'
+                            % (channel._v_parent._v_name, channel._v_name,
+                               FORMATS[fmt]))
+        written[path] = export_table(table, path, fmt, compression,
+                                     chunk_bytes)
+    return written
+
+
+def export(filenames, output, fmt='parquet', tables=None, channels=None,
+           compression='snappy', chunk_bytes=CHUNK_BYTES, processes=None,
+           progress=None):
+    """Export the channels of IAES files, in parallel processes (see
+    iaes.analysis.parallel.map_channels). Returns {path: rows}.
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError('unknown format %r (one of %s)'
+                         % (fmt, ', '.join(sorted(FORMATS))))
+    results = map_channels(export_channel, filenames,
+                           (output, fmt, tables, compression, chunk_bytes),
+                           processes=processes, progress=progress,
+                           channels=channels)
+    written = {}
+    for paths in results.values():
+        written.update(paths)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Export the tables of IAES files to Parquet or Arrow.')
+    parser.add_argument('filenames', nargs='+')
+    parser.add_argument('--output', required=True,
+                        help='directory of the exported files')
+    parser.add_argument('--format', choices=sorted(FORMATS),
+                        default='parquet')
+    parser.add_argument('--table', action='append', dest='tables',
+                        help='export only this table, e.g. parameters '
+                             '(may be repeated)')
+    parser.add_argument('--compression', default='snappy',
+                        help='Parquet compression codec')
+    parser.add_argument('--chunk-mb', type=int,
+                        default=CHUNK_BYTES // (1024 * 1024),
+                        help='rows converted at a time, in MiB')
+    parser.add_argument('--processes', type=int,
+                        help='worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    def progress(done, total, key):
+        sys.stderr.write('[%d/%d] %s %s/%s\n' % ((done, total) + key))
+
+    written = export(args.filenames, args.output, args.format, args.tables,
+                     compression=args.compression,
+                     chunk_bytes=args.chunk_mb * 1024 * 1024,
+                     processes=args.processes, progress=progress)
+    for path in sorted(written):
+        sys.stdout.write('%s: %d rows\n' % (path, written[path]))
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF
@@ -0,0 +1,212 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Rewrite IAES files with a layout suited to reading them back: chunks
+holding whole data blocks and sized for sequential scans, and a fast
+compressor (Blosc, with LZ4 when available, and byte shuffling). The
+board/channel layout, the attributes and the column indexes are kept.
+
+    python -m iaes.tools.repack run1.h5 run2.h5 --output repacked/
+
+Without --output the files are replaced in place, atomically.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from timeit import default_timer
+
+from tables import openFile, Filters, Table, Group
+from tables.filters import all_complibs
+
+from iaes.readers.core import open_file, ROWDATA
+
+
+# Target size, in bytes, of the HDF5 chunks of the repacked tables
+CHUNK_BYTES = 1024 * 1024
+
+# Bytes read at a time while copying or timing a table
+COPY_BYTES = 8 * 1024 * 1024
+
+
+def default_filters(complevel=5):
+    """Return the fastest Blosc based filters of the installed PyTables.
+    """
+    complib = 'blosc:lz4' if 'blosc:lz4' in all_complibs else 'blosc'
+    return Filters(complevel=complevel, complib=complib, shuffle=True)
+
+
+def chunk_rows(table, chunk_bytes=CHUNK_BYTES):
+    """Return the rows per chunk of a repacked table. A row of a 'rowdata'
+    table is a whole data block, so any number of rows is block aligned.
+    """
+    return max(1, chunk_bytes // max(1, table.rowsize))
+
+
+def _copy_rows(src, dst):
+    step = max(1, COPY_BYTES // max(1, src.rowsize))
+    for start in range(0, src.nrows, step):
+        dst.append(src.read(start, min(start + step, src.nrows)))
+    dst.flush()
+
+
+def _copy_table(src, parent, filters, chunk_bytes):
+    dst = parent._v_file.createTable(parent, src._v_name, src.description,
+                                     title=src._v_title, filters=filters,
+                                     expectedrows=max(1, src.nrows),
+                                     chunkshape=(chunk_rows(src,
+                                                            chunk_bytes),))
+    src._v_attrs._f_copy(dst)
+    _copy_rows(src, dst)
+    for name in src.colnames:
+        if src.colindexed[name]:
+            getattr(dst.cols, name).createCSIndex()
+    return dst
+
+
+def _copy_group(src, parent, filters, chunk_bytes, copy_table=_copy_table):
+    h5file = parent._v_file
+    for node in src._v_file.iterNodes(src):
+        if isinstance(node, Group):
+            group = h5file.createGroup(parent, node._v_name,
+                                       title=node._v_title)
+            node._v_attrs._f_copy(group)
+            _copy_group(node, group, filters, chunk_bytes, copy_table)
+        elif isinstance(node, Table):
+            copy_table(node, parent, filters, chunk_bytes)
+        else:
+            node._f_copy(parent, filters=filters)
+
+
+def rewrite(src, dst=None, filters=None, chunk_bytes=CHUNK_BYTES,
+            copy_table=_copy_table):
+    """Rewrite the IAES file `src` into `dst` (by default replacing `src`,
+    atomically), copying its tables with `copy_table(table, parent group,
+    filters, chunk_bytes)`. Returns the name of the written file.
+    """
+    if filters is None:
+        filters = default_filters()
+    target = os.path.abspath(dst or src)
+    fd, tmp = tempfile.mkstemp(suffix='.h5.tmp',
+                               dir=os.path.dirname(target))
+    os.close(fd)
+    try:
+        h5src = open_file(src, 'r')
+        try:
+            h5dst = openFile(tmp, 'w', title=h5src.title, filters=filters)
+            try:
+                h5src.root._v_attrs._f_copy(h5dst.root)
+                _copy_group(h5src.root, h5dst.root, filters, chunk_bytes,
+                            copy_table)
+            finally:
+                h5dst.close()
+        finally:
+            h5src.close()
+        shutil.copymode(src, tmp)
+        os.rename(tmp, target)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return target
+
+
+def repack(src, dst=None, filters=None, chunk_bytes=CHUNK_BYTES):
+    """Rewrite the IAES file `src` into `dst` (by default replacing `src`)
+    streaming every table, so memory use does not depend on the file size.
+    Returns the name of the written file.
+    """
+    return rewrite(src, dst, filters, chunk_bytes)
+
+
+def read_speed(filename, name=ROWDATA):
+    """Return (bytes, seconds) of a sequential read of every table called
+    `name` in a file.
+    """
+    nbytes = 0
+    seconds = 0.0
+    h5file = open_file(filename, 'r')
+    try:
+        for table in h5file.walkNodes('/', 'Table'):
+            if table._v_name != name:
+                continue
+            step = max(1, COPY_BYTES // max(1, table.rowsize))
+            t = default_timer()
+            for start in range(0, table.nrows, step):
+                nbytes += table.read(start,
+                                     min(start + step, table.nrows)).nbytes
+            seconds += default_timer() - t
+    finally:
+        h5file.close()
+    return nbytes, seconds
+
+
+def repack_report(src, dst=None, filters=None, chunk_bytes=CHUNK_BYTES):
+    """Repack a file and return a dictionary comparing the size and the
+    rowdata read speed before and after.
+    """
+    size_before = os.path.getsize(src)
+    nbytes, before = read_speed(src)
+    t = default_timer()
+    target = repack(src, dst, filters, chunk_bytes)
+    elapsed = default_timer() - t
+    nbytes, after = read_speed(target)
+    return {'file': target,
+            'size_before': size_before,
+            'size_after': os.path.getsize(target),
+            'read_mb_per_s_before': nbytes / 1e6 / max(before, 1e-9),
+            'read_mb_per_s_after': nbytes / 1e6 / max(after, 1e-9),
+            'repack_seconds': elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Rewrite IAES files with block aligned chunks and '
+                    'fast compression.')
+    parser.add_argument('filenames', nargs='+')
+    parser.add_argument('--output',
+                        help='directory of the repacked files (default: '
+                             'replace the files in place)')
+    parser.add_argument('--complevel', type=int, default=5)
+    parser.add_argument('--complib',
+                        help='compressor (default: %s)'
+                             % default_filters().complib)
+    parser.add_argument('--chunk-kb', type=int, default=CHUNK_BYTES // 1024,
+                        help='target chunk size in KiB')
+    args = parser.parse_args(argv)
+
+    filters = default_filters(args.complevel)
+    if args.complib:
+        filters = Filters(complevel=args.complevel, complib=args.complib,
+                          shuffle=True)
+    if args.output and not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for filename in args.filenames:
+        dst = None
+        if args.output:
+            dst = os.path.join(args.output, os.path.basename(filename))
+        report = repack_report(filename, dst, filters, args.chunk_kb * 1024)
+        sys.stdout.write(
+            '%s: %.1f MB -> %.1f MB, read %.0f -> %.0f MB/s (%.1f s)\n'
+            % (report['file'], report['size_before'] / 1e6,
+               report['size_after'] / 1e6,
+               report['read_mb_per_s_before'],
+               report['read_mb_per_s_after'],
+               report['repack_seconds']))
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF
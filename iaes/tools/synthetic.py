@@ -0,0 +1,132 @@
+"""
+@author:
+Eraldo Pomponi
+
+@copyright:
+2012 - Eraldo Pomponi
+eraldo.pomponi@gmail.com
+
+@license:
+All rights reserved
+
+Created on Oct 18, 2026
+
+Generator of synthetic IAES files: N boards x M channels, each with a
+'rowdata' table of AE hits (decaying bursts over noise) and the matching
+'parameters' table. Used by the tests and the benchmarks.
+"""
+import argparse
+
+import numpy as np
+from tables import openFile, Filters
+
+from iaes.analysis.features import compute_parameters
+from iaes.readers.core import data_block_dtype, param_dtype, ROWDATA, \
+    PARAMETERS
+
+
+# Rows generated and written at once
+CHUNK_ROWS = 256
+
+
+def block_dtype(block_size):
+    """Return data_block_dtype with `block_size` samples per block."""
+    if block_size == data_block_dtype['raw_data'].shape[0]:
+        return data_block_dtype
+    return np.dtype([('block_id', '<u8'),
+                     ('time_stamp', '<f8'),
+                     ('raw_data', '<f8', (block_size,))])
+
+
+def synthetic_blocks(rng, start, n, block_size, t0, rate=50.0,
+                     sampling_rate=1e6, noise=0.02):
+    """Return n rowdata rows starting at block_id `start` and time `t0`.
+
+    Hits arrive as a Poisson process of `rate` hits per second, each one a
+    decaying sinusoid of random amplitude, frequency and decay over white
+    noise.
+    """
+    rows = np.zeros((n,), dtype=block_dtype(block_size))
+    rows['block_id'] = np.arange(start, start + n)
+    rows['time_stamp'] = t0 + np.cumsum(rng.exponential(1.0 / rate, n))
+    t = np.arange(block_size) / sampling_rate
+    onset = rng.randint(0, block_size // 4, n)[:, None]
+    amplitude = rng.lognormal(-1.5, 1.0, n)[:, None]
+    freq = rng.uniform(50e3, 400e3, n)[:, None]
+    tau = rng.uniform(100e-6, 1e-3, n)[:, None]
+    dt = np.maximum(t[None, :] - onset / sampling_rate, 0.0)
+    burst = amplitude * np.exp(-dt / tau) * np.sin(2 * np.pi * freq * dt)
+    burst[np.arange(block_size)[None, :] < onset] = 0.0
+    rows['raw_data'] = burst + rng.normal(0.0, noise, (n, block_size))
+    return rows
+
+
+def write_synthetic(filename, boards=2, channels=4, blocks=1000,
+                    block_size=4096, threshold=0.1, rate=50.0,
+                    filters=None, parameters=True, seed=0):
+    """Write a synthetic IAES file and return its name.
+
+    Boards are named 'Board<i>' and channels 'Ch<j>'. Node attributes
+    record what a real acquisition would (serial, gain, threshold,
+    sampling rate). The file is written `CHUNK_ROWS` blocks at a time, so
+    any size can be generated in bounded memory.
+    """
+    rng = np.random.RandomState(seed)
+    if filters is None:
+        filters = Filters(complevel=1, complib='zlib', shuffle=True)
+    h5file = openFile(filename, 'w', title='Synthetic IAES file')
+    try:
+        for b in range(boards):
+            board = h5file.createGroup('/', 'Board%d' % b)
+            board._v_attrs.serial = 'SYN-%04d' % b
+            board._v_attrs.firmware = '1.0'
+            for c in range(channels):
+                channel = h5file.createGroup(board, 'Ch%d' % c)
+                channel._v_attrs.gain = 20 + 10 * (c % 3)
+                channel._v_attrs.threshold = threshold
+                channel._v_attrs.sampling_rate = 1e6
+                rowdata = h5file.createTable(channel, ROWDATA,
+                                             block_dtype(block_size),
+                                             filters=filters,
+                                             expectedrows=blocks)
+                t0 = 0.0
+                for start in range(0, blocks, CHUNK_ROWS):
+                    n = min(CHUNK_ROWS, blocks - start)
+                    rows = synthetic_blocks(rng, start, n, block_size, t0,
+                                            rate=rate)
+                    t0 = rows['time_stamp'][-1]
+                    rowdata.append(rows)
+                rowdata.flush()
+                if parameters:
+                    params = h5file.createTable(channel, PARAMETERS,
+                                                param_dtype,
+                                                filters=filters,
+                                                expectedrows=blocks)
+                    for chunk in compute_parameters(rowdata, threshold):
+                        params.append(chunk)
+                    params.flush()
+    finally:
+        h5file.close()
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Write a synthetic IAES .h5 file.')
+    parser.add_argument('filename')
+    parser.add_argument('--boards', type=int, default=2)
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--blocks', type=int, default=1000,
+                        help='rowdata rows per channel')
+    parser.add_argument('--block-size', type=int, default=4096)
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_synthetic(args.filename, args.boards, args.channels, args.blocks,
+                    args.block_size, args.threshold, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
+
+#EOF